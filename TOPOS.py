@@ -1,13 +1,25 @@
 import datetime
-from typing import List, Union
-from shapely.geometry import Polygon, MultiPolygon
-
-from custom_types import polyAsList, pointAsTuple
+import threading
+import numpy as np
+import shapely
+from typing import Callable, Dict, List, Tuple, Union
+from shapely.affinity import translate
+from shapely.geometry import Polygon
+from shapely.geometry.base import BaseGeometry
+
+from custom_types import polyAsList
 from reader import PolyReader
 from poly_func import PolyFunc
+from poly_store import PolyStore
+from part_order import PartOrder
 from nfp_assistant import NFPAssistant
+from nfp_method import NFPMethod
+from fixed_point import FixedPoint
 from plt_util import PltUtil
-from axis import Axis
+from plot_mode import PlotMode
+from scoring_criterion import ScoringCriterion
+from candidate_scoring import CandidateScoring
+from instrumentation import Instrumentation
 
 
 class Borders:
@@ -72,129 +84,253 @@ class TOPOS:
 
     Helper methods:
     update_bounds - updates outer boundary of current polygons
-    choose_feasible_point - selects feasible points based on current state
+    get_feasible_points - selects candidate points inside the current border box
+    (the best point is chosen by CandidateScoring according to criterion, all points at once)
+    get_forbidden_region - incrementally maintained union of NFPs of placed polygons the next polygon can reach
+    get_reachable_parts - finds placed polygons bordering free space large enough for a shape via STR-tree queries
+    choose_point - best scoring point not overlapping placed polygons left out of the forbidden region
     slide_to_bottom_left - slides polygons to bottom-left corner to optimize layout
-    show_result - plots final result of packing 
+    show_result - plots final result of packing, skipped or on a background thread depending on plot_mode
+
+    Parts are kept inside a strip container_width wide in x, anchored at the left edge of the first part,
+    the layout grows in y. A part with no candidate inside the strip is placed on top of the layout.
+    Raises ValueError if a polygon is wider than the strip.
+
+    NFPs are computed with nfp_method, on a grid of the given resolution for NFPMethod.orbital_fixed,
+    and only kept in memory unless store_path names a persistent NFP cache to load from and save to.
 
     """
 
-    def __init__(self, polygons: List[polyAsList], container_width: float):
-        self.polys: List[polyAsList] = polygons
-        self.active_polys: List[polyAsList] = []
-        self.width: float = container_width
-        self.NFPAssistant = NFPAssistant(self.polys, store_nfp=False, get_all_nfp=True, load_history=True)  
-        self.execute()
-
-    '''
-    todo: 
-    NFPAssistant.getDirectNFP
-    '''
+    TOLERANCE: float = 1e-9
+    GAP: float = 1e-6  # gaps between touching placed polygons up to twice this wide are rounding noise and closed for reachability queries
+
+    def __init__(self, polygons: Union[List[polyAsList], PolyStore, PartOrder], container_width: float, plot_mode: PlotMode = PlotMode.show, output_path: str = 'topos_result.png', criterion: Union[ScoringCriterion, Callable] = ScoringCriterion.border_overflow, store_path: str = None,
+                 nfp_method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION):
+        self.polys: PartOrder = PartOrder.from_polygons(polygons)  # pieces in placement order, stored once per distinct shape
+        self.width: float = container_width  # x-extent of the strip every placed part stays inside
+        self.strip_left: float = 0  # left edge of the strip, set when the first part is placed
+        self.criterion = criterion  # ScoringCriterion or callable, see CandidateScoring
+        self.plot_mode: PlotMode = plot_mode
+        self.output_path: str = output_path  # file written by PlotMode.background, .svg or any matplotlib image format
+        self.plot_thread: Union[None, threading.Thread] = None
+        self.active_polys: List[np.ndarray] = []
+        self.placed_geoms: List[Polygon] = []  # active_polys grown by 2 * GAP, so they intersect free space they border
+        self.placed_tree: Union[None, shapely.STRtree] = None  # STR-tree over placed_geoms, built on first query after a part is added
+        self.layout_geoms: List[Polygon] = []  # active_polys grown by GAP, unioned near each reachability query
+        self.forbidden_regions: Dict[int, Tuple[BaseGeometry, int, List[int]]] = {}  # shape index -> (NFP union, number of placed polygons covered, indices of those left out as unreachable)
+
+        # parts are placed by their top vertex, scoring needs their bounding box and centroid relative to it once per shape
+        self.reference_points: np.ndarray = np.array([shape[PolyFunc.get_max_y_idx(shape)] for shape in self.polys.shapes]).reshape(-1, 2)
+        self.extents: np.ndarray = self.polys.shapes.bounds - np.tile(self.reference_points, 2)
+        self.centroids: np.ndarray = self.polys.shapes.centroids - self.reference_points
+        shape_widths = self.extents[:, 2] - self.extents[:, 0]
+        if np.any(shape_widths > container_width + TOPOS.GAP):
+            raise ValueError(f'Polygon of width {shape_widths.max()} does not fit in strip of width {container_width}')
+        use_cache = store_path is not None
+        self.NFPAssistant = NFPAssistant(self.polys, store_nfp=use_cache, store_path=store_path, load_history=use_cache,
+                                         nfp_method=nfp_method, resolution=resolution)  # NFPs of pairs that meet are computed on first request
+        with Instrumentation.timer('topos.execute'):
+            self.execute()
+
     def execute(self):
-        self.active_polys.append(self.polys[0])  
+        self.add_part(self.polys[0])
+        self.strip_left = float(np.min(self.active_polys[0][:, 0]))
         self.borders = Borders()
 
-        for curr_poly in self.polys[1:]:
-            curr_poly_shapely = Polygon(curr_poly)
-
+        for shape in self.polys.piece_shapes[1:].tolist():
+            curr_poly = self.polys.shapes[shape]
             self.update_bounds()
 
-            # Polygon if contiguous, MultiPolygon otherwise.
-            feasible_border: Union[Polygon, MultiPolygon] = Polygon(self.active_polys[0])
-
-            for fixed_poly in self.active_polys:
-                nfp = self.NFPAssistant.get_direct_nfp(fixed_poly, curr_poly)
-                feasible_border = feasible_border.union(Polygon(nfp))
-
-            feasible_points: List[pointAsTuple] = self.get_feasible_points(feasible_border)
-
-            left_pt = PolyFunc.get_min_x_pt(curr_poly_shapely)
-            top_pt = PolyFunc.get_max_y_pt(curr_poly_shapely)
-            right_pt = PolyFunc.get_max_x_pt(curr_poly_shapely)
+            with Instrumentation.timer('topos.forbidden_region'):
+                forbidden_region: BaseGeometry = self.get_forbidden_region(shape)
+                candidates: np.ndarray = np.unique(shapely.get_coordinates(forbidden_region.boundary), axis=0)
+                candidates = self.get_strip_points(shape, candidates)
 
-            left_top_x_diff: float = top_pt[Axis.x] - left_pt[Axis.x]
-            right_top_x_diff: float = right_pt[Axis.x] - top_pt[Axis.x]
+            feasible_points: np.ndarray = self.get_feasible_points(candidates)
 
-            min_change: float = float('inf')
-            target_point: pointAsTuple = []
+            # no candidate inside the current border box, fall back to every candidate
+            if len(feasible_points) == 0:
+                feasible_points = candidates
 
-            for point in feasible_points:
-                
-                x, y = point
+            Instrumentation.count('topos.candidates', len(candidates))
+            Instrumentation.count('topos.points_scored', len(feasible_points))
 
-                change: float = min_change
+            with Instrumentation.timer('topos.scoring'):
+                target_point = self.choose_point(shape, feasible_points)
+                if target_point is None:
+                    target_point = self.choose_point(shape, candidates)
+                if target_point is None:
+                    target_point = self.get_top_point(shape)
 
-                if x - left_top_x_diff > self.borders.left and x + right_top_x_diff <= self.borders.right:
-                    change = self.borders.left - x
-                elif min_change > 0:
-                    change = max(self.borders.left - x + left_top_x_diff, x + right_top_x_diff - self.borders.right)
-
-            if change < min_change:
-                min_change = change
-                target_point = point
-
-            reference_point = curr_poly[PolyFunc.get_max_y_pt(curr_poly)]
-            self.active_polys.append(PolyFunc.shift_poly(curr_poly, target_point[Axis.x] - reference_point[Axis.x], target_point[Axis.y] - reference_point[Axis.y]))
+            self.add_part(curr_poly + (target_point - self.reference_points[shape]))
 
+        self.update_bounds()
         self.slide_to_bottom_left()
-        self.show_result()
+        with Instrumentation.timer('topos.show_result'):
+            self.show_result()
+
+    def add_part(self, poly: np.ndarray):
+        """
+        Place polygon and keep its geometry for reachability queries.
+        """
+        self.active_polys.append(poly)
+        self.placed_geoms.append(Polygon(poly).buffer(2 * TOPOS.GAP, join_style='mitre'))
+        self.placed_tree = None
+        self.layout_geoms.append(Polygon(poly).buffer(TOPOS.GAP, join_style='mitre'))
 
     def update_bounds(self):
         """
         Change bounds based on added polygon.
         """
-        left, bottom, right, top = self.active_polys[-1].bounds
+        (left, bottom), (right, top) = self.active_polys[-1].min(axis=0), self.active_polys[-1].max(axis=0)
         self.borders.update(left=left, right=right, top=top, bottom=bottom)
 
-    def get_feasible_points(self, border: Union[Polygon, MultiPolygon]) -> List[pointAsTuple]:
+    def get_placed_tree(self) -> shapely.STRtree:
+        """
+        Get STR-tree over the placed polygons grown by 2 * GAP, shared by all queries until the next part is added.
         """
-        Get all points in border within bounds of border box.
+        if self.placed_tree is None:
+            self.placed_tree = shapely.STRtree(self.placed_geoms)
+        return self.placed_tree
+
+    def get_forbidden_region(self, shape: int) -> BaseGeometry:
         """
-        res = []
+        Get union of NFPs of the shape with index shape with all placed polygons it can touch.
 
-        if border.isinstance(Polygon):
-            res.append(TOPOS.get_feasible_points_poly(border))
-            return res
-        
-        for poly in border:
-            res.append(TOPOS.get_feasible_points_poly(poly))
+        The region is cached per shape, so a shape seen before only unions in the NFPs of
+        polygons placed since; a new shape unions all NFPs in a single bulk operation.
+        Placed polygons the shape cannot reach are left out and remembered, free space only
+        shrinks inside the border box, so they stay unreachable for later placements.
+        """
+        curr_poly = self.polys.shapes[shape]
+        region, covered, skipped = self.forbidden_regions.get(shape, (None, 0, []))
 
-        return res
+        new_parts = np.arange(covered, len(self.active_polys))
+        reachable = self.get_reachable_parts(shape, new_parts)
+        skipped = skipped + new_parts[~reachable].tolist()
+        Instrumentation.count('topos.parts_skipped', int(np.count_nonzero(~reachable)))
 
-    def get_feasible_points_poly(self, poly: Polygon) -> List[pointAsTuple]:
+        new_nfps = [Polygon(self.NFPAssistant.get_direct_nfp(self.active_polys[i], curr_poly)) for i in new_parts[reachable]]
+        region = shapely.union_all(new_nfps if region is None else [region] + new_nfps)
+
+        self.forbidden_regions[shape] = (region, len(self.active_polys), skipped)
+        return region
+
+    def get_reachable_parts(self, shape: int, parts: np.ndarray) -> np.ndarray:
         """
-        Get all points in polygon within bounds of border box.
+        Check which of the placed polygons with indices parts the shape with index shape can touch without overlapping any placed polygon.
+
+        A part touching a placed polygon lies within the bounding box of that polygon grown by the
+        width and height of the part. Inside the union of these envelopes, the part fits only into
+        components of free space at least as large as its bounding box, so an STR-tree over the placed
+        polygons is queried with those components and polygons bordering only smaller pockets are
+        unreachable. Free space is the envelopes minus the placed polygons the STR-tree finds in them,
+        unioned in one bulk operation, so the cost of a query does not grow with polygons placed elsewhere.
+
+        Returns:
+        Boolean array, True for reachable polygons.
         """
-        res = []
+        width, height = self.extents[shape, 2:] - self.extents[shape, :2]
+        tree = self.get_placed_tree()
+        envelopes = shapely.box(*(shapely.bounds(tree.geometries[parts]) + np.array([-width, -height, width, height])).T)
 
-        for point in poly.exterior.coords:
-            x, y = point
+        nearby = np.unique(tree.query(envelopes)[1]).tolist()
+        layout = shapely.union_all([self.layout_geoms[k] for k in nearby])
+        free = shapely.get_parts(shapely.union_all(envelopes).difference(layout))
+        sizes = np.diff(shapely.bounds(free).reshape(-1, 2, 2), axis=1)[:, 0]
+        fits = np.all(sizes >= np.array([width, height]) - 2 * TOPOS.GAP, axis=1)
 
-            between_top_bottom: bool = self.borders.bottom < y < self.borders.top
-            within_width: bool = self.borders.left < x < self.borders.right
+        _, reachable = tree.query(free[fits], predicate='intersects')
+        return np.isin(parts, reachable)
 
-            if between_top_bottom and within_width:
-                res.append((x, y))
+    def choose_point(self, shape: int, points: np.ndarray) -> Union[None, np.ndarray]:
+        """
+        Get best scoring point at which the shape does not overlap placed polygons left out of its forbidden region.
 
-        return res
+        Points are checked in order of score, polygons left out lie in pockets too small for the
+        shape, so in practice the best point is taken. Returns None if every point overlaps one.
+        """
+        if len(points) == 0:
+            return None
+        curr_poly = self.polys.shapes[shape]
+        extents = self.extents[shape]
+        borders = np.array([self.borders.left, self.borders.bottom, self.borders.right, self.borders.top])
+        order = CandidateScoring.rank(points, extents, self.centroids[shape], borders, self.criterion)
+
+        skipped = np.array(self.forbidden_regions[shape][2], dtype=np.int64)
+        if not len(skipped):
+            return points[order[0]]
+
+        tree = self.get_placed_tree()
+        nfps: Dict[int, Polygon] = {}
+        for point in points[order]:
+            hits = tree.query(shapely.box(*(np.tile(point, 2) + extents)), predicate='intersects')
+            hits = hits[np.isin(hits, skipped)].tolist()
+            if not hits:
+                return point
+            for hit in hits:
+                if hit not in nfps:
+                    nfps[hit] = Polygon(self.NFPAssistant.get_direct_nfp(self.active_polys[hit], curr_poly))
+
+            # points inside an NFP by more than rounding noise overlap the placed polygon
+            hit_nfps = np.array([nfps[hit] for hit in hits], dtype=object)
+            pt = shapely.Point(point)
+            if not np.any(shapely.within(pt, hit_nfps) & (shapely.distance(pt, shapely.boundary(hit_nfps)) > TOPOS.TOLERANCE)):
+                return point
+        return None
+
+    def get_strip_points(self, shape: int, candidates: np.ndarray) -> np.ndarray:
+        """
+        Get candidate points at which the shape stays inside the strip, up to GAP of rounding noise.
+        """
+        left = candidates[:, 0] + self.extents[shape, 0]
+        right = candidates[:, 0] + self.extents[shape, 2]
+        inside = (left >= self.strip_left - TOPOS.GAP) & (right <= self.strip_left + self.width + TOPOS.GAP)
+        return candidates[inside]
+
+    def get_top_point(self, shape: int) -> np.ndarray:
+        """
+        Get the point placing the shape on top of the layout against the left edge of the strip.
+        """
+        return np.array([self.strip_left - self.extents[shape, 0], self.borders.top - self.extents[shape, 1]])
+
+    def get_feasible_points(self, candidates: np.ndarray) -> np.ndarray:
+        """
+        Get all candidate points within bounds of border box.
+        """
+        x, y = candidates[:, 0], candidates[:, 1]
+        between_top_bottom = (self.borders.bottom < y) & (y < self.borders.top)
+        within_width = (self.borders.left < x) & (x < self.borders.right)
+        return candidates[between_top_bottom & within_width]
 
     def slide_to_bottom_left(self):
         """
         Shift all placed polygons to bottom left of container.
         """
-        for poly in self.active_polys:
-            PolyFunc.shift_poly(poly, -self.border.left, -self.border.right)
+        self.active_polys = [PolyFunc.shift_poly(poly, -self.borders.left, -self.borders.bottom) for poly in self.active_polys]
+        self.placed_geoms = [translate(geom, -self.borders.left, -self.borders.bottom) for geom in self.placed_geoms]
+        self.placed_tree = None
+        self.layout_geoms = [translate(geom, -self.borders.left, -self.borders.bottom) for geom in self.layout_geoms]
 
     def show_result(self):
         """
-        Display result using plotting util.
+        Display result using plotting util according to plot_mode.
+
+        PlotMode.background renders to output_path on plot_thread and returns immediately,
+        join plot_thread to wait for the file.
         """
-        for poly in self.active_polys:
-            PltUtil.add_polygon(poly)
+        if self.plot_mode == PlotMode.skip:
+            return
+        if self.plot_mode == PlotMode.background:
+            self.plot_thread = threading.Thread(target=PltUtil.save_layout, args=(list(self.active_polys), self.output_path))
+            self.plot_thread.start()
+            return
+        PltUtil.add_polygons(self.active_polys)
         PltUtil.show_plot()
 
 if __name__=='__main__':
     starttime = datetime.datetime.now()
-    data: List[polyAsList] = PolyReader.read_polygons_from_csv('blaz.csv')  
+    data: PartOrder = PolyReader.read_part_order_from_csv('blaz.csv')
     app = TOPOS(data, 1000)  
     endtime = datetime.datetime.now()
     print ("total time: ",endtime - starttime)
\ No newline at end of file
@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import numpy as np
+import shapely
+import matplotlib
+matplotlib.use('Agg')  # benchmarks run headless, plots must not block
+
+import genetic_algorithm
+from typing import Callable, Dict, List
+from custom_types import polyAsList
+from reader import PolyReader
+from nfp import NFP
+from nfp_method import NFPMethod
+from nfp_assistant import NFPAssistant
+from TOPOS import TOPOS
+from plot_mode import PlotMode
+
+class Benchmark:
+    """
+    Functional class for timing NFP generation, placement and GA throughput on fixed datasets.
+
+    Datasets are blaz.csv and generated convex, concave and high vertex count sets. Generated
+    sets are seeded, so every run packs the same parts, and like real orders they repeat a
+    limited number of distinct shapes. Results are written as JSON and can be compared
+    against a previous run to catch performance regressions.
+
+    ### Examples:
+    >>> python benchmark.py --sizes 10 100 --output bench.json
+    >>> python benchmark.py --sizes 10 100 --compare bench.json
+    """
+
+    DATASETS: List[str] = ['blaz', 'convex', 'concave', 'high_vertex']
+    SIZES: List[int] = [10, 100, 1000]
+    MAX_SHAPES: int = 10  # distinct shapes per generated set
+    NFP_SAMPLE_PAIRS: int = 50  # pairs timed for NFP throughput
+    GA_MAX_PARTS: int = 100  # larger sets skip the GA benchmark
+    GA_GENERATIONS: int = 3
+    WIDTH: float = 1000
+    SEED: int = 0
+
+    @staticmethod
+    def generate_convex(n_shapes: int, rng: np.random.Generator) -> List[polyAsList]:
+        """
+        Returns convex polygons with 3 to 10 vertices on random ellipses.
+        """
+        shapes = []
+        for _ in range(n_shapes):
+            n = rng.integers(3, 11)
+            angles = np.sort(rng.uniform(0, 2 * np.pi, n))
+            a, b = rng.uniform(5, 60, 2)
+            shapes.append(np.column_stack((a * np.cos(angles), b * np.sin(angles))))
+        return Benchmark._validate(shapes)
+
+    @staticmethod
+    def generate_concave(n_shapes: int, rng: np.random.Generator) -> List[polyAsList]:
+        """
+        Returns star-shaped polygons with 8 to 24 vertices alternating between an inner and outer radius.
+        """
+        shapes = []
+        for _ in range(n_shapes):
+            n = 2 * rng.integers(4, 13)
+            angles = 2 * np.pi * (np.arange(n) + rng.uniform(0.1, 0.9, n)) / n
+            outer = rng.uniform(20, 60)
+            radii = np.where(np.arange(n) % 2 == 0, outer, outer * rng.uniform(0.3, 0.7, n))
+            shapes.append(np.column_stack((radii * np.cos(angles), radii * np.sin(angles))))
+        return Benchmark._validate(shapes)
+
+    @staticmethod
+    def generate_high_vertex(n_shapes: int, rng: np.random.Generator, vertices: int = 64) -> List[polyAsList]:
+        """
+        Returns arc-heavy outlines (rounded slots with a notch) with vertices points each, as produced by DXF export.
+        """
+        shapes = []
+        t = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+        for _ in range(n_shapes):
+            a, b = rng.uniform(20, 60, 2)
+            exponent = rng.uniform(2.5, 5)
+            x = a * np.sign(np.cos(t)) * np.abs(np.cos(t)) ** (2 / exponent)
+            y = b * np.sign(np.sin(t)) * np.abs(np.sin(t)) ** (2 / exponent)
+            notch = np.abs(t - np.pi / 2) < 0.3
+            y[notch] *= 0.5
+            shapes.append(np.column_stack((x, y)))
+        return Benchmark._validate(shapes)
+
+    @staticmethod
+    def _validate(shapes: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Rounds generated shapes like CSV input and checks they are simple polygons.
+
+        Raises:
+        - ValueError if a shape is self-intersecting.
+        """
+        shapes = [np.round(shape, 3) for shape in shapes]
+        for shape in shapes:
+            if not shapely.Polygon(shape).is_valid:
+                raise ValueError(f"Generated shape is not a simple polygon: {shape.tolist()}")
+        return shapes
+
+    @staticmethod
+    def get_dataset(name: str, size: int, seed: int = SEED) -> List[polyAsList]:
+        """
+        Returns parts of a dataset, blaz.csv ignores size.
+
+        Raises:
+        - ValueError if name is not a known dataset.
+        """
+        if name == 'blaz':
+            return PolyReader.read_polygons_from_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blaz.csv'))
+
+        generators: Dict[str, Callable] = {
+            'convex': Benchmark.generate_convex,
+            'concave': Benchmark.generate_concave,
+            'high_vertex': Benchmark.generate_high_vertex,
+        }
+        if name not in generators:
+            raise ValueError(f"Unknown dataset {name}")
+
+        rng = np.random.default_rng(seed)
+        shapes = generators[name](min(size, Benchmark.MAX_SHAPES), rng)
+        picks = np.concatenate((np.arange(len(shapes)), rng.integers(0, len(shapes), max(0, size - len(shapes)))))
+        return [shapes[k].tolist() for k in picks[:size]]
+
+    @staticmethod
+    def time_nfp_pairs(polys: List[polyAsList], method: NFPMethod) -> float:
+        """
+        Returns NFPs computed per second over a fixed sample of distinct shape pairs.
+        """
+        shapes = NFPAssistant.delete_redundancy(polys)
+        pairs = [(i, j) for i in range(len(shapes)) for j in range(len(shapes))][:Benchmark.NFP_SAMPLE_PAIRS]
+        start = time.perf_counter()
+        for i, j in pairs:
+            NFP.get_nfp(shapes[i], shapes[j], method)
+        return len(pairs) / (time.perf_counter() - start)
+
+    @staticmethod
+    def time_get_all_nfp(polys: List[polyAsList], method: NFPMethod, workers: int) -> float:
+        """
+        Returns seconds spent building an NFPAssistant with NFPs of all shape pairs.
+        """
+        start = time.perf_counter()
+        NFPAssistant(polys, get_all_nfp=True, nfp_method=method, workers=workers)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def time_topos(polys: List[polyAsList], width: float) -> float:
+        """
+        Returns seconds spent packing polygons with TOPOS, NFP generation included and plotting skipped.
+        """
+        start = time.perf_counter()
+        TOPOS(polys, width, plot_mode=PlotMode.skip)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def time_ga(polys: List[polyAsList], width: float, workers: int) -> float:
+        """
+        Returns GA generations per second, NFPs of all pairs computed beforehand.
+        """
+        nfp_assistant = NFPAssistant(polys, get_all_nfp=True, workers=workers)
+        start = time.perf_counter()
+        genetic_algorithm.GeneticAlgorithm(width, polys, nfp_assistant, generations=Benchmark.GA_GENERATIONS, workers=workers, seed=Benchmark.SEED)
+        return Benchmark.GA_GENERATIONS / (time.perf_counter() - start)
+
+    @staticmethod
+    def run(datasets: List[str] = DATASETS, sizes: List[int] = SIZES, method: NFPMethod = NFPMethod.orbital, workers: int = 1, log: Callable[[str], None] = print) -> dict:
+        """
+        Runs all benchmarks on every dataset and size.
+
+        Parameters:
+        - datasets: Names of datasets to run.
+        - sizes: Part counts of generated datasets.
+        - method: NFP engine.
+        - workers: Number of processes for get_all_nfp and the GA.
+        - log: Called with a line for every finished measurement.
+
+        Returns:
+        Report with run metadata and a list of measurements.
+        """
+        results = []
+        measured_shape_sets = set()
+
+        def record(dataset: str, polys: List[polyAsList], metric: str, value: float, unit: str, higher_is_better: bool):
+            entry = {'dataset': dataset, 'parts': len(polys), 'shapes': len(NFPAssistant.delete_redundancy(polys)),
+                     'vertices': sum(len(poly) for poly in polys), 'metric': metric, 'value': value, 'unit': unit,
+                     'higher_is_better': higher_is_better}
+            results.append(entry)
+            log(f"{dataset:12} {len(polys):5} parts  {metric:22} {value:12.4f} {unit}")
+
+        for dataset in datasets:
+            for size in ([None] if dataset == 'blaz' else sizes):
+                polys = Benchmark.get_dataset(dataset, size)
+                # larger sets repeat the same shapes, NFP throughput is measured once per shape set
+                shape_set = (dataset, len(NFPAssistant.delete_redundancy(polys)))
+                if shape_set not in measured_shape_sets:
+                    measured_shape_sets.add(shape_set)
+                    record(dataset, polys, 'nfp_pairs_per_sec', Benchmark.time_nfp_pairs(polys, method), 'pairs/s', True)
+                    record(dataset, polys, 'get_all_nfp_time', Benchmark.time_get_all_nfp(polys, method, workers), 's', False)
+                record(dataset, polys, 'topos_time', Benchmark.time_topos(polys, Benchmark.WIDTH), 's', False)
+                if len(polys) <= Benchmark.GA_MAX_PARTS:
+                    record(dataset, polys, 'ga_generations_per_sec', Benchmark.time_ga(polys, Benchmark.WIDTH, workers), 'generations/s', True)
+
+        meta = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'shapely': shapely.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'nfp_method': method.name,
+            'workers': workers,
+            'seed': Benchmark.SEED,
+        }
+        return {'meta': meta, 'results': results}
+
+    @staticmethod
+    def compare(report: dict, baseline: dict, threshold: float = 0.2) -> List[dict]:
+        """
+        Returns measurements that got worse than the baseline by more than threshold (relative).
+        """
+        base_values = {(r['dataset'], r['parts'], r['metric']): r['value'] for r in baseline['results']}
+        regressions = []
+        for r in report['results']:
+            base = base_values.get((r['dataset'], r['parts'], r['metric']))
+            if not base:
+                continue
+            change = (r['value'] - base) / base
+            if (-change if r['higher_is_better'] else change) > threshold:
+                regressions.append(dict(r, baseline=base, change=change))
+        return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark NFP generation, placement and GA throughput.')
+    parser.add_argument('--datasets', nargs='+', default=Benchmark.DATASETS, choices=Benchmark.DATASETS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=Benchmark.SIZES)
+    parser.add_argument('--method', default=NFPMethod.orbital.name, choices=[m.name for m in NFPMethod])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', default='benchmark.json', help='path of JSON report')
+    parser.add_argument('--compare', help='JSON report of a previous run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as regression')
+    args = parser.parse_args()
+
+    report = Benchmark.run(args.datasets, args.sizes, NFPMethod[args.method], args.workers)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = Benchmark.compare(report, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['dataset']} {r['parts']} parts {r['metric']}: {r['baseline']:.4f} -> {r['value']:.4f} {r['unit']}")
+        sys.exit(1 if regressions else 0)
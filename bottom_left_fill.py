@@ -0,0 +1,226 @@
+import numpy as np
+import shapely
+
+import nfp_assistant
+from typing import Dict, List, Tuple
+from custom_types import polyAsList
+from poly_func import PolyFunc
+from segment_func import SegmentFunc
+from instrumentation import Instrumentation
+
+class BottomLeftFill:
+    """
+    Bottom-left-fill placement of polygons in a strip of fixed width along y and open length along x.
+
+    Polygons are placed one at a time in the given order, each at the leftmost (then lowest)
+    position inside the strip where it does not overlap any placed polygon. Feasible positions
+    form the inner-fit rectangle of the part minus the interiors of its NFPs with the placed
+    polygons. The interiors are shrunk by TOLERANCE, so positions where the part exactly fits
+    between neighbours survive as thin slivers, and removed from the rectangle with one union
+    and one difference in GEOS; the leftmost vertex of what remains is then snapped to the
+    nearest exact NFP vertex or edge crossing, so placement errors do not add up.
+
+    Placed polygons never move, so positions found infeasible for a shape stay infeasible.
+    Every shape remembers where its last copy went; later copies only consider positions
+    after it and ignore NFPs that end left of it, which keeps the work per part near the
+    growing right end of the layout instead of growing with the number of placed parts.
+
+    ### Parameters:
+    - width: Width of the strip.
+    - polygons: Polygons in placement order, in list or array format or a PartOrder.
+    - NFPAssistant: NFPAssistant serving NFPs of the polygons, one computing NFPs on demand is built if None.
+
+    ### Attributes:
+    - placed: Placed polygons as (n, 2) arrays, in placement order.
+    - length: Length of strip used by the placed polygons.
+
+    ### Raises:
+    - ValueError if a polygon is taller than the strip is wide.
+
+    ### Examples:
+    >>> blf = BottomLeftFill(1000, polygons, NFPAssistant=nfp_assistant)
+    >>> blf.get_length()
+    412.5
+    """
+
+    TOLERANCE: float = 1e-6
+    SNAP_DISTANCE: float = 16 * TOLERANCE  # shrunk interiors move vertices by up to the mitre limit times TOLERANCE
+    SNAP_GROWTH: float = 16.0
+    SNAP_STEPS: int = 4
+
+    def __init__(self, width: float, polygons: List[polyAsList], NFPAssistant: 'nfp_assistant.NFPAssistant' = None):
+        self.width = width
+        self.nfp_assistant = NFPAssistant if NFPAssistant is not None else nfp_assistant.NFPAssistant(polygons)
+
+        self.placed: List[np.ndarray] = []
+        self.fingerprints: List[bytes] = []
+        self.positions: List[np.ndarray] = []  # translation of every placed polygon moved to offset (0, 0)
+        self.rights: List[float] = []  # largest x of every placed polygon, also the right end of its NFP with any shape at offset (0, 0)
+        self.shape_ids: List[int] = []  # index into shape_fingerprints of every placed polygon
+        self.shape_fingerprints: List[bytes] = []  # distinct placed shapes, in order of first placement
+        self.shape_index: Dict[bytes, int] = {}  # shape fingerprint -> index into shape_fingerprints
+        self.shape_polys: List[np.ndarray] = []  # first placed copy of every distinct shape
+        self.frontier: Dict[bytes, np.ndarray] = {}  # shape fingerprint -> position of its last placed copy
+        self.length: float = 0.0
+
+        with Instrumentation.timer('blf.place_all'):
+            for poly in polygons:
+                self.place(poly)
+
+    def place(self, poly: polyAsList) -> np.ndarray:
+        """
+        Places polygon at the leftmost, then lowest, feasible position.
+
+        Returns:
+        Position of the lower left corner of the bounding box of the placed polygon.
+
+        Raises:
+        - ValueError if the polygon is taller than the strip is wide.
+        """
+        position = self.find_position(poly)
+        self.add(poly, position)
+        return position
+
+    def find_position(self, poly: polyAsList) -> np.ndarray:
+        """
+        Returns leftmost, then lowest, feasible position of the lower left corner of the bounding box of polygon, without placing it.
+
+        Raises:
+        - ValueError if the polygon is taller than the strip is wide.
+        """
+        fingerprint, offset = PolyFunc.get_fingerprint(poly)
+        size = np.asarray(poly, dtype=np.float64).reshape(-1, 2).max(axis=0) - offset
+        top = self.width - size[1]
+        if top < -BottomLeftFill.TOLERANCE:
+            raise ValueError(f"Polygon of height {size[1]} does not fit in strip of width {self.width}")
+        return np.zeros(2) if not self.placed else self.get_position(fingerprint, poly, max(top, 0.0))
+
+    def add(self, poly: polyAsList, position: np.ndarray):
+        """
+        Places polygon with the lower left corner of its bounding box at position, which should come from find_position.
+        """
+        fingerprint, offset = PolyFunc.get_fingerprint(poly)
+        normalized = np.asarray(poly, dtype=np.float64).reshape(-1, 2) - offset
+
+        self.placed.append(normalized + position)
+        self.fingerprints.append(fingerprint)
+        self.positions.append(position)
+        self.rights.append(position[0] + normalized[:, 0].max())
+        if fingerprint not in self.shape_index:
+            self.shape_index[fingerprint] = len(self.shape_fingerprints)
+            self.shape_fingerprints.append(fingerprint)
+            self.shape_polys.append(self.placed[-1])
+        self.shape_ids.append(self.shape_index[fingerprint])
+        self.frontier[fingerprint] = position
+        self.length = max(self.length, self.rights[-1])
+
+    def get_position(self, fingerprint: bytes, poly: polyAsList, top: float) -> np.ndarray:
+        """
+        Returns leftmost, then lowest, translation of the polygon moved to offset (0, 0) that keeps it
+        inside the strip and outside all placed polygons.
+
+        Parameters:
+        - fingerprint: Fingerprint of the polygon.
+        - poly: The polygon, used to compute NFPs of shapes the NFPAssistant does not know.
+        - top: Largest y translation keeping the polygon inside the strip.
+        """
+        lowest = self.frontier.get(fingerprint, np.array([-np.inf, -np.inf]))
+        left = max(lowest[0], 0.0)
+
+        # the NFP of a placed polygon ends where the polygon does, NFPs ending left of the last copy of the shape cannot block any position still considered
+        rights = np.asarray(self.rights)
+        placed = np.flatnonzero(rights >= left - BottomLeftFill.TOLERANCE)
+        if len(placed) == 0:
+            return np.array([left, 0.0])
+        right = max(left, rights[placed].max())
+        positions = np.asarray(self.positions)[placed]
+
+        # interiors are looked up once per distinct placed shape and repeated at the position of every copy
+        shapes, inverse = np.unique(np.asarray(self.shape_ids)[placed], return_inverse=True)
+        shape_rings = [self.nfp_assistant.get_interior(self.shape_fingerprints[s], fingerprint, BottomLeftFill.TOLERANCE, self.shape_polys[s], poly)[0] for s in shapes]
+        counts = np.array([len(ring_list) for ring_list in shape_rings], dtype=np.int64)[inverse]
+        rings = [ring for s in inverse for ring in shape_rings[s]]
+        ring_coords, ring_offsets = BottomLeftFill._concatenate(rings, np.repeat(positions, counts, axis=0))
+        interiors = shapely.polygons(shapely.linearrings(ring_coords, indices=np.repeat(np.arange(len(ring_offsets) - 1), np.diff(ring_offsets))))
+
+        # everything right of the NFPs is feasible, so the inner-fit rectangle ends there
+        feasible = shapely.box(left, 0.0, right + 1.0, top).difference(shapely.union_all(interiors))
+        candidates = BottomLeftFill._sort_after(shapely.get_coordinates(feasible), lowest)
+        Instrumentation.count('blf.candidates', len(candidates))
+        if len(candidates) == 0:
+            return np.array([right, 0.0])
+
+        shape_nfps = [self.nfp_assistant.get_translation_nfp(self.shape_fingerprints[s], fingerprint, self.shape_polys[s], poly) for s in shapes]
+        nfps = [shape_nfps[s] for s in inverse]
+        return self._snap(candidates[0], nfps, positions, interiors, lowest, left, top)
+
+    def _snap(self, approx: np.ndarray, nfps: List[np.ndarray], positions: List[np.ndarray], interiors: np.ndarray, lowest: np.ndarray, left: float, top: float) -> np.ndarray:
+        """
+        Returns leftmost, then lowest, feasible NFP vertex or crossing of NFP and inner-fit rectangle edges
+        close to approx, approx if there is none.
+
+        Shrunk edges meeting at a shallow angle cross far from where the exact edges do, so the
+        search window grows by SNAP_GROWTH up to SNAP_STEPS times until a feasible point is found.
+        """
+        coords, offsets = BottomLeftFill._concatenate(nfps, positions)
+        all_starts, all_ends = coords, coords[BottomLeftFill._get_next_index(offsets)]
+        tree = shapely.STRtree(interiors)
+
+        snap = BottomLeftFill.SNAP_DISTANCE
+        for _ in range(BottomLeftFill.SNAP_STEPS):
+            near = np.all((np.minimum(all_starts, all_ends) <= approx + snap) & (np.maximum(all_starts, all_ends) >= approx - snap), axis=1)
+            starts, ends = all_starts[near], all_ends[near]
+            # left, bottom and top edge of the inner-fit rectangle around approx
+            lines_starts = np.concatenate((starts, [[left, approx[1] - snap], [approx[0] - snap, 0.0], [approx[0] - snap, top]]))
+            lines_ends = np.concatenate((ends, [[left, approx[1] + snap], [approx[0] + snap, 0.0], [approx[0] + snap, top]]))
+            _, _, crossings, _ = SegmentFunc.get_intersections(starts, ends, lines_starts, lines_ends)
+
+            candidates = np.concatenate((starts, crossings, [[left, 0.0], [left, top]]))
+            candidates = candidates[np.all(np.abs(candidates - approx) <= snap, axis=1) & (candidates[:, 1] > -BottomLeftFill.TOLERANCE)
+                                    & (candidates[:, 1] < top + BottomLeftFill.TOLERANCE)]
+            candidates = BottomLeftFill._sort_after(candidates, lowest)
+
+            feasible = np.ones(len(candidates), dtype=bool)
+            feasible[tree.query(shapely.points(candidates), predicate='intersects')[0]] = False
+            if np.any(feasible):
+                return np.clip(candidates[np.argmax(feasible)], [0.0, 0.0], [np.inf, top])
+            snap *= BottomLeftFill.SNAP_GROWTH
+
+        Instrumentation.count('blf.snap_misses')
+        return np.clip(approx, [0.0, 0.0], [np.inf, top])
+
+    @staticmethod
+    def _sort_after(candidates: np.ndarray, lowest: np.ndarray) -> np.ndarray:
+        """
+        Returns candidates not before lowest sorted leftmost first, then lowest first, with x equal up to tolerance.
+        """
+        tol = BottomLeftFill.TOLERANCE
+        x_keys = np.round(candidates[:, 0] / tol)
+        lowest_key = np.round(lowest[0] / tol)
+        keep = (x_keys > lowest_key) | ((x_keys == lowest_key) & (candidates[:, 1] > lowest[1] - tol))
+        candidates, x_keys = candidates[keep], x_keys[keep]
+        return candidates[np.lexsort((candidates[:, 1], x_keys))]
+
+    @staticmethod
+    def _concatenate(polys: List[np.ndarray], positions: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns polygons shifted by their positions concatenated into one coordinate array, with start offsets per polygon.
+        """
+        sizes = np.array([len(poly) for poly in polys], dtype=np.int64)
+        offsets = np.zeros(len(polys) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(sizes)
+        if not polys:
+            return np.empty((0, 2)), offsets
+        return np.concatenate(polys) + np.repeat(np.reshape(positions, (-1, 2)), sizes, axis=0), offsets
+
+    @staticmethod
+    def _get_next_index(offsets: np.ndarray) -> np.ndarray:
+        """
+        Returns index of the next vertex of every vertex of polygons stored back to back.
+        """
+        next_idx = np.arange(1, offsets[-1] + 1)
+        next_idx[offsets[1:] - 1] = offsets[:-1]
+        return next_idx
+
+    def get_length(self) -> float:
+        return self.length
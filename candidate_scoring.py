@@ -0,0 +1,101 @@
+import numpy as np
+
+from typing import Callable, Union
+from scoring_criterion import ScoringCriterion
+
+class CandidateScoring:
+    """
+    Functional class scoring all feasible placement points of a part in one vectorized pass.
+
+    A part is placed by moving its reference vertex onto a point, so everything a criterion
+    needs follows from the points and a few per-shape constants: the bounding box and the
+    centroid of the part relative to its reference vertex. Lower scores are better; ties go
+    to the leftmost, then lowest, point, so the choice does not depend on candidate order.
+
+    Custom criteria are callables with the signature of the built-in score functions,
+    (points, extents, centroid, borders) -> scores.
+
+    ### Examples:
+    >>> idx = CandidateScoring.select(points, extents, centroid, borders, ScoringCriterion.gravity_center)
+    >>> points[idx]
+    array([412.5, 0.])
+    """
+
+    @staticmethod
+    def select(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray, criterion: Union[ScoringCriterion, Callable] = ScoringCriterion.border_overflow) -> int:
+        """
+        Returns index of the best point.
+
+        Parameters:
+        - points: (n, 2) array of candidate positions of the reference vertex, n > 0.
+        - extents: (min x, min y, max x, max y) of the part relative to its reference vertex.
+        - centroid: Centroid of the part relative to its reference vertex.
+        - borders: (left, bottom, right, top) of the placed parts.
+        - criterion: ScoringCriterion or callable returning scores.
+        """
+        return int(CandidateScoring.rank(points, extents, centroid, borders, criterion)[0])
+
+    @staticmethod
+    def rank(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray, criterion: Union[ScoringCriterion, Callable] = ScoringCriterion.border_overflow) -> np.ndarray:
+        """
+        Returns indices of the points from best to worst, parameters as in select.
+        """
+        scores = CandidateScoring.get_scores(points, extents, centroid, borders, criterion)
+        return np.lexsort((points[:, 1], points[:, 0], scores))
+
+    @staticmethod
+    def get_scores(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray, criterion: Union[ScoringCriterion, Callable] = ScoringCriterion.border_overflow) -> np.ndarray:
+        """
+        Returns (n,) array of scores of the points, lower is better.
+
+        Raises:
+        - ValueError if criterion is neither a ScoringCriterion nor callable.
+        """
+        if criterion == ScoringCriterion.border_overflow:
+            return CandidateScoring.border_overflow(points, extents, centroid, borders)
+        if criterion == ScoringCriterion.bounding_length:
+            return CandidateScoring.bounding_length(points, extents, centroid, borders)
+        if criterion == ScoringCriterion.gravity_center:
+            return CandidateScoring.gravity_center(points, extents, centroid, borders)
+        if criterion == ScoringCriterion.border_overlap:
+            return CandidateScoring.border_overlap(points, extents, centroid, borders)
+        if callable(criterion):
+            return np.asarray(criterion(points, extents, centroid, borders), dtype=np.float64)
+        raise ValueError(f"Invalid scoring criterion {criterion}")
+
+    @staticmethod
+    def border_overflow(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray) -> np.ndarray:
+        """
+        Scores points keeping the part between the left and right border by how far right they are,
+        if there are none, scores all points by how far the part sticks out past either border.
+        """
+        x = points[:, 0]
+        left, right = borders[0], borders[2]
+        inside = (x + extents[0] > left) & (x + extents[2] <= right)
+        if np.any(inside):
+            return np.where(inside, left - x, np.inf)
+        return np.maximum(left - x - extents[0], x + extents[2] - right)
+
+    @staticmethod
+    def bounding_length(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray) -> np.ndarray:
+        """
+        Scores points by length along x of the bounding box of the layout with the part added.
+        """
+        x = points[:, 0]
+        return np.maximum(x + extents[2], borders[2]) - np.minimum(x + extents[0], borders[0])
+
+    @staticmethod
+    def gravity_center(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray) -> np.ndarray:
+        """
+        Scores points by height of the centroid of the placed part.
+        """
+        return points[:, 1] + centroid[1]
+
+    @staticmethod
+    def border_overlap(points: np.ndarray, extents: np.ndarray, centroid: np.ndarray, borders: np.ndarray) -> np.ndarray:
+        """
+        Scores points by area of the bounding box of the placed part lying outside the borders.
+        """
+        low, high = points + extents[:2], points + extents[2:]
+        overlap = np.clip(np.minimum(high, borders[2:]) - np.maximum(low, borders[:2]), 0, None)
+        return np.prod(high - low, axis=1) - np.prod(overlap, axis=1)
@@ -7,3 +7,4 @@ Custom types for storing 2D geometric data
 pointAsTuple = Tuple[float, float]
 polyAsList = List[pointAsTuple]
 lineAsList = List[pointAsTuple] # should have len 2
+placementAsTuple = Tuple[int, int, pointAsTuple, float] # part id, sheet, translation, rotation in degrees
@@ -0,0 +1,77 @@
+import hashlib
+import numpy as np
+
+from collections import OrderedDict
+from typing import List, Union
+
+class FitnessCache:
+    """
+    In-memory store of packing lengths evaluated by the genetic algorithm.
+
+    Entries are keyed by a digest of the (sequence, rotations, width) triple, so a lookup
+    costs one hash regardless of how many arrangements were evaluated before. Once more
+    than max_entries lengths are stored the least recently used ones are evicted.
+
+    ### Parameters:
+    - max_entries: Maximum number of stored lengths.
+
+    ### Attributes:
+    - hits, misses: Lookup counters.
+
+    ### Examples:
+    >>> cache = FitnessCache()
+    >>> cache.put([2, 0, 1], [0, 90, 0], 1000, 512.0)
+    >>> cache.get([2, 0, 1], [0, 90, 0], 1000)
+    512.0
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lengths: OrderedDict[bytes, float] = OrderedDict()
+
+    @staticmethod
+    def get_key(sequence: List[int], rotations: Union[None, List[float]], width: float) -> bytes:
+        """
+        Returns compact digest of a (sequence, rotations, width) triple.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.asarray(sequence, dtype=np.int64).tobytes())
+        digest.update(b'|')
+        if rotations is not None:
+            digest.update(np.asarray(rotations, dtype=np.float64).tobytes())
+        digest.update(b'|')
+        digest.update(np.float64(width).tobytes())
+        return digest.digest()
+
+    def get(self, sequence: List[int], rotations: Union[None, List[float]], width: float) -> Union[None, float]:
+        """
+        Returns stored length of arrangement, None if it was not evaluated yet.
+        """
+        key = FitnessCache.get_key(sequence, rotations, width)
+        length = self._lengths.get(key)
+        if length is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._lengths.move_to_end(key)
+        return length
+
+    def put(self, sequence: List[int], rotations: Union[None, List[float]], width: float, length: float):
+        """
+        Stores length of arrangement and evicts the least recently used entry above the size cap.
+        """
+        key = FitnessCache.get_key(sequence, rotations, width)
+        self._lengths[key] = length
+        self._lengths.move_to_end(key)
+        if len(self._lengths) > self.max_entries:
+            self._lengths.popitem(last=False)
+
+    def clear(self):
+        self._lengths.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
@@ -0,0 +1,124 @@
+import numpy as np
+
+class FixedPoint:
+
+    """
+    Functional class for exact geometric predicates on coordinates snapped to an integer grid.
+
+    Coordinates are stored as int64 multiples of a grid resolution. Keeping them below
+    MAX_COORD grid units bounds coordinate differences by 2**31 and cross products by 2**63,
+    so orientation, on-segment and intersection tests are exact and never depend on a
+    tolerance. All predicates work elementwise on broadcastable (..., 2) int64 arrays.
+    """
+
+    RESOLUTION: float = 1e-6  # default grid spacing in length units
+    MAX_COORD: int = 2 ** 30  # exclusive bound of grid coordinates keeping cross products inside int64
+
+    @staticmethod
+    def to_grid(coords, resolution: float = RESOLUTION) -> np.ndarray:
+        """
+        Snaps coordinates to the nearest grid points.
+
+        Parameters:
+        - coords: Point, polygon or array of coordinates in length units.
+        - resolution: Grid spacing in length units.
+
+        Returns:
+        int64 array of the same shape in grid units.
+
+        Raises:
+        - ValueError if a coordinate is too large to be represented at this resolution.
+        """
+        grid = np.rint(np.asarray(coords, dtype=np.float64) / resolution)
+        if grid.size and not np.abs(grid).max() < FixedPoint.MAX_COORD:
+            raise ValueError(f"Coordinates exceed {FixedPoint.MAX_COORD * resolution} at grid resolution {resolution}, use a coarser resolution")
+        return grid.astype(np.int64)
+
+    @staticmethod
+    def from_grid(grid: np.ndarray, resolution: float = RESOLUTION) -> np.ndarray:
+        """
+        Converts grid coordinates back to float coordinates in length units.
+        """
+        return np.asarray(grid, dtype=np.float64) * resolution
+
+    @staticmethod
+    def snap(coords, resolution: float = RESOLUTION) -> np.ndarray:
+        """
+        Returns float coordinates moved to the nearest grid points.
+        """
+        return FixedPoint.from_grid(FixedPoint.to_grid(coords, resolution), resolution)
+
+    @staticmethod
+    def cross(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+        """
+        Exact z component of the cross product of broadcastable arrays of 2D grid vectors.
+        """
+        return v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
+
+    @staticmethod
+    def dot(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+        """
+        Exact dot product of broadcastable arrays of 2D grid vectors.
+        """
+        return v1[..., 0] * v2[..., 0] + v1[..., 1] * v2[..., 1]
+
+    @staticmethod
+    def orientation(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """
+        Elementwise orientation of point triples.
+
+        Returns:
+        int8 array, 1 where c lies left of the line from a to b, -1 where it lies right of it, 0 where the points are collinear.
+        """
+        return np.sign(FixedPoint.cross(b - a, c - a)).astype(np.int8)
+
+    @staticmethod
+    def equal(pts1: np.ndarray, pts2: np.ndarray, slack: int = 0) -> np.ndarray:
+        """
+        Elementwise check whether pairs of grid points are at most slack grid units apart on both axes.
+        """
+        return np.all(np.abs(pts1 - pts2) <= slack, axis=-1)
+
+    @staticmethod
+    def on_segment(pts: np.ndarray, starts: np.ndarray, ends: np.ndarray, slack: int = 0) -> np.ndarray:
+        """
+        Elementwise check whether points lie on closed segments.
+
+        Parameters:
+        - pts: (..., 2) int64 array of points.
+        - starts, ends: (..., 2) int64 arrays describing the segments.
+        - slack: Grid units a point may lie off the segment, 0 for an exact test. Points within
+        slack / sqrt(2) are always accepted and points further than slack never are.
+
+        Returns:
+        Boolean array.
+        """
+        d = ends - starts
+        # distance to the line is |cross| / |d|, and |d| lies between max(|dx|, |dy|) and sqrt(2) times that
+        on_line = np.abs(FixedPoint.cross(d, pts - starts)) <= slack * np.abs(d).max(axis=-1)
+        within = np.all((pts >= np.minimum(starts, ends) - slack) & (pts <= np.maximum(starts, ends) + slack), axis=-1)
+        return on_line & within
+
+    @staticmethod
+    def segments_intersect(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray) -> np.ndarray:
+        """
+        Elementwise check whether pairs of closed segments share a point, touching and collinear overlaps included.
+
+        Parameters:
+        - starts1, ends1: (..., 2) int64 arrays describing the first segments.
+        - starts2, ends2: (..., 2) int64 arrays describing the second segments.
+
+        Returns:
+        Boolean array.
+        """
+        o1 = FixedPoint.orientation(starts1, ends1, starts2)
+        o2 = FixedPoint.orientation(starts1, ends1, ends2)
+        o3 = FixedPoint.orientation(starts2, ends2, starts1)
+        o4 = FixedPoint.orientation(starts2, ends2, ends1)
+
+        # endpoints of each segment on opposite sides of the other, or an endpoint lying on the other segment
+        crossing = (o1 * o2 < 0) & (o3 * o4 < 0)
+        touching = ((o1 == 0) & FixedPoint.on_segment(starts2, starts1, ends1)) | ((o2 == 0) & FixedPoint.on_segment(ends2, starts1, ends1)) \
+            | ((o3 == 0) & FixedPoint.on_segment(starts1, starts2, ends2)) | ((o4 == 0) & FixedPoint.on_segment(ends1, starts2, ends2))
+        return crossing | touching
+
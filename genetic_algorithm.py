@@ -1,70 +1,238 @@
+import os
 import numpy as np
-from typing import List
+import multiprocessing
+import multiprocessing.pool
+import matplotlib.pyplot as plt
+from shapely.errors import GEOSException
+from typing import List, Tuple, Union
 
 from packing_tools import Point, Polygon
+from custom_types import polyAsList
+from fitness_cache import FitnessCache
+from poly_func import PolyFunc
+from nfp_assistant import NFPAssistant
+from part_order import PartOrder
+from bottom_left_fill import BottomLeftFill
+
+# individual of the population: order of polygon indices and rotation of each placed polygon (None if rotation is disabled)
+individual = Tuple[List[int], Union[None, List[float]]]
 
 '''
     Returns length of bounding box of polygons in a certain arrangement
     Serves as a metric to evaluate the efficiency of a certain arrangement
+    Arrangements are identified by the order of polygon indices and their rotations, lengths
+    of arrangements evaluated before are served from fitness_cache
+    Pieces of a PartOrder are identified by their shape, so swapping identical pieces hits the cache
 '''
-def get_packing_length(polygons: List[Polygon], history_index_list, history_length_list, width, **kw) -> int:
+def get_packing_length(polygons: Union[List[polyAsList], PartOrder], sequence: List[int], width: float, fitness_cache: FitnessCache, rotations: List[float] = None, **kw) -> float:
 
-    polygons = PolyListProcessor.getPolyVertices(polygons)
-    index_list = PolyListProcessor.getPolyIndex(poly_list)
-    check_index = PolyListProcessor.getIndex(index_list, history_index_list)
+    key_sequence = polygons.get_shape_sequence(sequence) if isinstance(polygons, PartOrder) else sequence
+    length = fitness_cache.get(key_sequence, rotations, width)
+    if length is not None:
+        return length
 
-    if check_index >= 0:
-        return history_length_list[check_index]
+    ordered = [polygons[i] if rotations is None else PolyFunc.rotate_poly(polygons[i], rotations[k]) for k, i in enumerate(sequence)]
 
-    try: # no idea what this does
+    try:
         if 'NFPAssistant' in kw:
-            blf = BottomLeftFill(width, polygons, NFPAssistant = kw['NFPAssistant'])
+            blf = BottomLeftFill(width, ordered, NFPAssistant = kw['NFPAssistant'])
         else:
-            blf = BottomLeftFill(width, polygons)
-    
-    except: # self intersection (??)
+            blf = BottomLeftFill(width, ordered)
+        length = blf.get_length()
+
+    except GEOSException: # self-intersecting parts make GEOS overlays fail, rank the arrangement last
         length = 99999
-    
-    history_index_list.append(index_list)
-    history_length_list.append(length)
+
+    fitness_cache.put(key_sequence, rotations, width, length)
     return length
 
+# state of pool worker processes, set once per worker by _init_worker
+_worker_polygons: PartOrder = None
+_worker_width: float = None
+_worker_nfp_assistant: NFPAssistant = None
+_worker_fitness_cache: FitnessCache = None
+
+def _init_worker(polygons: PartOrder, width: float, nfp_assistant: NFPAssistant):
+    global _worker_polygons, _worker_width, _worker_nfp_assistant, _worker_fitness_cache
+    _worker_polygons = polygons
+    _worker_width = width
+    _worker_nfp_assistant = nfp_assistant
+    _worker_fitness_cache = FitnessCache()
+
+def _evaluate_individual(ind: individual) -> float:
+    sequence, rotations = ind
+    return get_packing_length(_worker_polygons, sequence, _worker_width, _worker_fitness_cache, rotations, NFPAssistant = _worker_nfp_assistant)
+
 class GeneticAlgorithm:
+    """
+    Searches for the placement order and rotations of polygons that minimize packing length.
 
-    def __init__(self, width, polygons: List[np.array], nfp_assistant=None, generations = 10, population_size = 20): # not sure what nfp asst is, why no height
+    Each generation keeps the elite_size shortest arrangements and fills the rest of the
+    population with their ordered crossovers, mutated by swapping positions and rotations.
+    With several workers the arrangements of a generation are evaluated on a process pool
+    whose workers receive the polygons and NFPs once at startup; results are gathered in
+    population order, so runs with the same seed give the same result.
+
+    ### Parameters:
+    - width: Width of the sheet.
+    - polygons: List of polygons in list or array format, or a PartOrder carrying allowed rotations per shape.
+    - nfp_assistant: NFPAssistant holding NFPs of the polygons at the allowed rotations, one with all NFPs is built if None.
+    - generations: Number of generations.
+    - population_size: Number of arrangements per generation.
+    - minimal_rotation: Step between allowed rotations in degrees for a list of polygons, 360 disables rotation.
+    - workers: Number of processes evaluating arrangements, all cores if None, serial if 1.
+    - seed: Seed of the random generator.
+
+    ### Attributes:
+    - global_best_sequence: Shortest arrangement found as (sequence, rotations).
+    - global_lowest_length: Its packing length.
+    - length_record: Shortest length of every generation.
+    - lowest_length_record: Shortest length found up to every generation.
+    """
+
+    def __init__(self, width, polygons: Union[List[np.array], PartOrder], nfp_assistant=None, generations = 10, population_size = 20, minimal_rotation: float = 360, workers: int = 1, seed: int = None):
         self.width = width
-        self.minimal_rotation = 360 # what does this mean
+        self.minimal_rotation = minimal_rotation # step between allowed rotations in degrees, 360 disables rotation
+        self.polygons: PartOrder = PartOrder.from_polygons(polygons, self.get_allowed_rotations())
 
         self.elite_size = 10 # number of 'elite' inviduals
-        self.mutate_rate = .1 # see what this actually means
+        self.mutate_rate = .1 # probability of mutating each position of a child
         self.generations = generations
         self.population_size = population_size
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.fitness_cache = FitnessCache()
 
-        self.nfp_assitant = nfp_assistant if nfp_assistant is not None else NFPAssitant(PolyListProcessor.getPolyVertices(poly_list), get_all_nfp = True) # not sure what this default assistant does
+        self.nfp_assistant = nfp_assistant if nfp_assistant is not None else NFPAssistant(self.polygons, get_all_nfp = True, workers = workers)
 
         self.genetic_algorithm()
         self.plot_record()
 
-    def geneticAlgorithm(self):
-        self.population = []
+    def genetic_algorithm(self):
+        self.population: List[individual] = [self.random_individual() for _ in range(self.population_size)]
         self.length_record = []
         self.lowest_length_record = []
-        self.global_best_sequence = []
-        self.global_lowest_length = None
+        self.global_best_sequence: individual = None
+        self.global_lowest_length = np.inf
+
+        pool = None
+        self.pool_size = 1  # processes evaluating arrangements, resolved when the pool is created
+        if self.workers != 1:
+            self.pool_size = self.workers or os.cpu_count()
+            pool = multiprocessing.Pool(self.pool_size, initializer=_init_worker, initargs=(self.polygons, self.width, self.nfp_assistant))
+
+        try:
+            for _ in range(0, self.generations):
+                self.get_length_ranked(pool)
+                best_idx, best_length = self.fitness_ranked[0]
+                self.length_record.append(best_length)
+
+                if best_length < self.global_lowest_length:
+                    self.global_lowest_length = best_length
+                    self.global_best_sequence = self.population[best_idx]
+                self.lowest_length_record.append(self.global_lowest_length)
+
+                self.get_next_generation()
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def get_length_ranked(self, pool: multiprocessing.pool.Pool = None):
+        """
+        Evaluates population and sorts (index, length) pairs from shortest to longest.
+        """
+        lengths = self.evaluate_population(self.population, pool)
+        # stable sort keeps ties in population order
+        self.fitness_ranked = sorted(enumerate(lengths), key=lambda item: item[1])
+
+    def evaluate_population(self, population: List[individual], pool: multiprocessing.pool.Pool = None) -> List[float]:
+        """
+        Returns packing length of every individual, evaluating arrangements not in the fitness cache on the pool if given.
+        """
+        if pool is None:
+            return [get_packing_length(self.polygons, sequence, self.width, self.fitness_cache, rotations, NFPAssistant = self.nfp_assistant)
+                    for sequence, rotations in population]
+
+        shape_sequences = [self.polygons.get_shape_sequence(sequence) for sequence, _ in population]
+        lengths = [self.fitness_cache.get(shape_sequence, rotations, self.width) for shape_sequence, (_, rotations) in zip(shape_sequences, population)]
+
+        # send every new arrangement once, even if several individuals share it
+        pending = {}
+        for k, (_, rotations) in enumerate(population):
+            if lengths[k] is None:
+                pending.setdefault(FitnessCache.get_key(shape_sequences[k], rotations, self.width), []).append(k)
+        tasks = [population[ks[0]] for ks in pending.values()]
+
+        # map returns results in task order regardless of which worker finished first
+        chunk_size = max(1, len(tasks) // (4 * self.pool_size))
+        for ks, length in zip(pending.values(), pool.map(_evaluate_individual, tasks, chunk_size)):
+            self.fitness_cache.put(shape_sequences[ks[0]], population[ks[0]][1], self.width, length)
+            for k in ks:
+                lengths[k] = length
+        return lengths
+
+    def get_next_generation(self):
+        """
+        Replaces population by its elite and mutated crossovers of elite pairs.
+        """
+        elite = [self.population[k] for k, _ in self.fitness_ranked[:min(self.elite_size, self.population_size)]]
+        children = list(elite)
+        while len(children) < self.population_size:
+            parent1, parent2 = self.rng.choice(len(elite), 2, replace=len(elite) < 2)
+            children.append(self.mutate(self.crossover(elite[parent1], elite[parent2])))
+        self.population = children
+
+    def random_individual(self) -> individual:
+        sequence = self.rng.permutation(len(self.polygons)).tolist()
+        if not self.polygons.is_rotatable():
+            return sequence, None
+        return sequence, [float(self.rng.choice(self.polygons.get_rotations(i))) for i in sequence]
+
+    def get_allowed_rotations(self) -> List[float]:
+        """
+        Returns rotations allowed by minimal_rotation, used for polygons not given as a PartOrder.
+        """
+        return np.arange(0, 360, self.minimal_rotation).tolist()
+
+    def crossover(self, parent1: individual, parent2: individual) -> individual:
+        """
+        Ordered crossover: keeps a random slice of parent1 in place and fills the rest in the order of parent2.
+        Polygons keep the rotation they have in the parent they are taken from.
+        """
+        sequence1, rotations1 = parent1
+        sequence2, rotations2 = parent2
+        start, end = sorted(self.rng.choice(len(sequence1) + 1, 2, replace=False))
 
-        for _ in range(0, self.generations):
-            self.getLengthRanked() # not sure what 'length' actually refers to
-            self.getNextGeneration()
+        middle = sequence1[start:end]
+        taken = set(middle)
+        rest = [i for i in sequence2 if i not in taken]
+        sequence = rest[:start] + middle + rest[start:]
 
-            self.length_record.append(self.fitness_ranked[0][1]) # most fit ??
-            
-            if self.fitness_ranked[0][1] < self.global_lowest_length: # best (not sure why min)
-                self.global_lowest_length = self.fitness_ranked[0][1]
-                self.global_best_sequence = self.pop[self.fitness_ranked[0][0]]
-            self.lowest_length_record.append(self.global_lowest_length)
+        if rotations1 is None:
+            return sequence, None
+        rotation_of = dict(zip(sequence2, rotations2))
+        rotation_of.update(zip(middle, rotations1[start:end]))
+        return sequence, [rotation_of[i] for i in sequence]
 
-            blf = BottomLeftFill(self.width, PolyListProcessor.getPolysVertices(self.global_best_sequence), NFPAssitant = self.NFPAssistant)
-            blf.showAll() # i'm assuming this is the sorting / optimization function
+    def mutate(self, ind: individual) -> individual:
+        """
+        Swaps each position with a random one and redraws its rotation with probability mutate_rate.
+        """
+        sequence, rotations = list(ind[0]), None if ind[1] is None else list(ind[1])
+        for k in range(len(sequence)):
+            if self.rng.random() < self.mutate_rate:
+                other = self.rng.integers(len(sequence))
+                sequence[k], sequence[other] = sequence[other], sequence[k]
+                if rotations is not None:
+                    rotations[k], rotations[other] = rotations[other], rotations[k]
+            if rotations is not None and self.rng.random() < self.mutate_rate:
+                rotations[k] = float(self.rng.choice(self.polygons.get_rotations(sequence[k])))
+        return sequence, rotations
 
-        
-    
+    def plot_record(self):
+        plt.plot(self.length_record, label='generation best')
+        plt.plot(self.lowest_length_record, label='overall best')
+        plt.xlabel('generation')
+        plt.ylabel('packing length')
+        plt.legend()
+        plt.show()
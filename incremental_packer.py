@@ -0,0 +1,119 @@
+import collections
+import numpy as np
+
+from typing import Deque, Iterator, List, Tuple, Union
+from custom_types import polyAsList, placementAsTuple
+from poly_func import PolyFunc
+from poly_store import PolyStore
+from part_order import PartOrder
+import nfp_assistant
+from bottom_left_fill import BottomLeftFill
+from instrumentation import Instrumentation
+
+class IncrementalPacker:
+    """
+    Packs parts arriving over time into sheets of fixed width and length, one placement at a time.
+
+    Parts are queued by add_parts and placed in arrival order with bottom-left fill, at the
+    allowed rotation giving the leftmost, then lowest, position on the current sheet. A part
+    that fits nowhere on the current sheet closes it and opens a new one. Closed sheets never
+    change, so they can be cut while later parts are still being placed. NFPs and shrunk NFP
+    interiors stay cached between calls and across sheets.
+
+    A placement (part id, sheet, translation, rotation) means the part rotated counterclockwise
+    around the origin by rotation degrees and then moved by translation.
+
+    ### Parameters:
+    - width: Width of the sheets.
+    - sheet_length: Length of the sheets, a single open-ended strip if None.
+    - NFPAssistant: NFPAssistant shared by all sheets, one computing NFPs on demand is built if None.
+
+    ### Attributes:
+    - sheets: BottomLeftFill of every opened sheet, the last one is still being filled.
+    - n_parts: Number of parts added so far, part ids count up from 0.
+
+    ### Raises:
+    - ValueError if a part does not fit on an empty sheet at any of its allowed rotations.
+
+    ### Examples:
+    >>> packer = IncrementalPacker(1000, sheet_length=2000)
+    >>> packer.add_parts(first_batch, allowed_rotations=[0, 90])
+    [0, 1, 2]
+    >>> for part_id, sheet, translation, rotation in packer.placements():
+    ...     cut(part_id, sheet, translation, rotation)
+    """
+
+    def __init__(self, width: float, sheet_length: float = None, NFPAssistant: 'nfp_assistant.NFPAssistant' = None):
+        self.width = width
+        self.sheet_length = sheet_length
+        self.nfp_assistant = NFPAssistant if NFPAssistant is not None else nfp_assistant.NFPAssistant([])
+        self.sheets: List[BottomLeftFill] = [BottomLeftFill(width, [], NFPAssistant=self.nfp_assistant)]
+        self.n_parts: int = 0
+        self.queue: Deque[Tuple[int, np.ndarray, List[float]]] = collections.deque()  # (part id, polygon, allowed rotations) waiting for placement
+
+    def add_parts(self, polygons: Union[List[polyAsList], PolyStore, PartOrder], allowed_rotations: Union[None, List[float], List[List[float]]] = None) -> List[int]:
+        """
+        Queues parts for placement and returns their part ids.
+
+        Parameters:
+        - polygons: List of polygons in list format, PolyStore or PartOrder.
+        - allowed_rotations: Rotations in degrees shared by all parts or a list per part, only unrotated placement if None.
+        Ignored for a PartOrder, which carries the allowed rotations of its shapes.
+        """
+        order = PartOrder.from_polygons(polygons, allowed_rotations)
+        self.nfp_assistant.add_polygons(order)
+
+        part_ids = list(range(self.n_parts, self.n_parts + len(order)))
+        for k, part_id in enumerate(part_ids):
+            self.queue.append((part_id, order[k], order.get_rotations(k)))
+        self.n_parts += len(order)
+        return part_ids
+
+    def placements(self) -> Iterator[placementAsTuple]:
+        """
+        Places queued parts one at a time and yields each placement as soon as it is made.
+
+        Parts added while iterating are placed by the same generator. It stops once the queue is empty.
+        """
+        while self.queue:
+            part_id, poly, rotations = self.queue.popleft()
+            yield self.place(part_id, poly, rotations)
+
+    def place(self, part_id: int, poly: polyAsList, rotations: List[float] = (0,)) -> placementAsTuple:
+        """
+        Places a part on the current sheet, or on a new sheet if it does not fit there.
+
+        Raises:
+        - ValueError if the part does not fit on an empty sheet at any of the rotations.
+        """
+        with Instrumentation.timer('packer.place'):
+            fit = self._fit(self.sheets[-1], poly, rotations)
+            if fit is None:
+                self.sheets.append(BottomLeftFill(self.width, [], NFPAssistant=self.nfp_assistant))
+                Instrumentation.count('packer.sheets')
+                fit = self._fit(self.sheets[-1], poly, rotations)
+                if fit is None:
+                    raise ValueError(f"Part {part_id} does not fit on an empty sheet of width {self.width} and length {self.sheet_length}")
+
+            rotated, position, rotation = fit
+            self.sheets[-1].add(rotated, position)
+            translation = position - rotated.min(axis=0)
+            return part_id, len(self.sheets) - 1, (float(translation[0]), float(translation[1])), rotation
+
+    def _fit(self, sheet: BottomLeftFill, poly: polyAsList, rotations: List[float]) -> Union[None, Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        Returns (rotated polygon, position, rotation) of the leftmost, then lowest, feasible position on sheet over all rotations, None if there is none.
+        """
+        best = None
+        for rotation in rotations:
+            rotated = PolyFunc.rotate_poly(np.asarray(poly, dtype=np.float64).reshape(-1, 2), rotation)
+            try:
+                position = sheet.find_position(rotated)
+            except ValueError:
+                continue  # too wide for the sheet at this rotation
+            length = rotated[:, 0].max() - rotated[:, 0].min()
+            if self.sheet_length is not None and position[0] + length > self.sheet_length + BottomLeftFill.TOLERANCE:
+                continue
+            if best is None or (position[0], position[1]) < (best[1][0], best[1][1]):
+                best = (rotated, position, rotation)
+        return best
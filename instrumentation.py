@@ -0,0 +1,118 @@
+import json
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Dict, Iterator
+
+class Instrumentation:
+    """
+    Functional class collecting opt-in counters and stage timers from the packing pipeline.
+
+    Hooks in NFP, NFPAssistant and TOPOS call count and timer unconditionally; while
+    instrumentation is disabled (the default) both return after a single flag check, so
+    production runs pay next to nothing. Counts are collected in the current process only,
+    work done in pool workers is not included.
+
+    ### Attributes:
+    - enabled: Flag for collecting data.
+    - counters: Accumulated counter values by name.
+    - timers: Accumulated seconds by stage name.
+    - timer_calls: Number of timed sections by stage name.
+
+    ### Examples:
+    >>> with Instrumentation.record(path='report.json'):
+    ...     TOPOS(polygons, 1000)
+    >>> Instrumentation.report()['counters']['nfp.orbit_steps']
+    1843
+    """
+
+    enabled: bool = False
+    counters: Dict[str, int] = {}
+    timers: Dict[str, float] = {}
+    timer_calls: Dict[str, int] = {}
+
+    _NULL_TIMER: ContextManager = nullcontext()
+
+    @staticmethod
+    def enable():
+        Instrumentation.enabled = True
+
+    @staticmethod
+    def disable():
+        Instrumentation.enabled = False
+
+    @staticmethod
+    def reset():
+        """
+        Clears all collected counters and timers.
+        """
+        Instrumentation.counters.clear()
+        Instrumentation.timers.clear()
+        Instrumentation.timer_calls.clear()
+
+    @staticmethod
+    def count(name: str, value: int = 1):
+        """
+        Adds value to a counter, does nothing while disabled.
+        """
+        if Instrumentation.enabled:
+            Instrumentation.counters[name] = Instrumentation.counters.get(name, 0) + value
+
+    @staticmethod
+    def timer(name: str) -> ContextManager:
+        """
+        Returns context manager adding the time spent inside it to a stage timer, a shared no-op while disabled.
+        """
+        if not Instrumentation.enabled:
+            return Instrumentation._NULL_TIMER
+        return Instrumentation._timer(name)
+
+    @staticmethod
+    @contextmanager
+    def _timer(name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Instrumentation.timers[name] = Instrumentation.timers.get(name, 0.0) + time.perf_counter() - start
+            Instrumentation.timer_calls[name] = Instrumentation.timer_calls.get(name, 0) + 1
+
+    @staticmethod
+    def report() -> dict:
+        """
+        Returns collected data as a JSON-serializable dictionary.
+        """
+        return {
+            'counters': dict(sorted(Instrumentation.counters.items())),
+            'timers': {name: {'seconds': seconds, 'calls': Instrumentation.timer_calls[name]}
+                       for name, seconds in sorted(Instrumentation.timers.items())},
+        }
+
+    @staticmethod
+    def export_json(path: str):
+        """
+        Writes report to a JSON file.
+        """
+        with open(path, 'w') as f:
+            json.dump(Instrumentation.report(), f, indent=2)
+
+    @staticmethod
+    @contextmanager
+    def record(callback: Callable[[dict], None] = None, path: str = None) -> Iterator[None]:
+        """
+        Collects data for one run: resets and enables instrumentation on entry, disables it on exit.
+
+        Parameters:
+        - callback: Called with the report when the run ends.
+        - path: Location of JSON file the report is written to when the run ends.
+        """
+        Instrumentation.reset()
+        Instrumentation.enable()
+        try:
+            yield
+        finally:
+            Instrumentation.disable()
+            if callback is not None:
+                callback(Instrumentation.report())
+            if path is not None:
+                Instrumentation.export_json(path)
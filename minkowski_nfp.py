@@ -0,0 +1,198 @@
+import shapely
+from shapely.geometry import Polygon, MultiPolygon
+from typing import List, Dict, Tuple
+from custom_types import polyAsList, pointAsTuple
+from poly_func import PolyFunc
+
+class MinkowskiNFP:
+    """
+    Class that computes NFP between two polygons as a Minkowski sum.
+
+    The NFP of a sliding polygon B around a stationary polygon A is A ⊕ (-B), shifted so
+    that it traces the top (maximum y) vertex of B, matching the output of the orbital NFP.
+    Convex pairs are summed with a linear edge merge; non-convex polygons are decomposed
+    into convex pieces whose pairwise sums are unioned.
+
+    ### Parameters:
+    - poly1: Stationary polygon in list or array format.
+    - poly2: Sliding polygon in list or array format.
+
+    ### Attributes:
+    - nfp: Outer boundary of the NFP as list of points in counterclockwise order.
+    - error: Always 1, the computation has no iteration limit.
+    """
+
+    TOLERANCE: float = 1e-9
+
+    def __init__(self, poly1: polyAsList, poly2: polyAsList):
+        self.stationary = [(float(x), float(y)) for x, y in PolyFunc.to_ccw(poly1)]
+        self.sliding = [(float(x), float(y)) for x, y in PolyFunc.to_ccw(poly2)]
+        self.error = 1
+        self.compute_nfp()
+
+    def compute_nfp(self):
+        """
+        Main method for computing nfp of two polygons.
+        """
+        reference = PolyFunc.get_max_y_pt(self.sliding)
+        negated = [(reference[0] - x, reference[1] - y) for x, y in self.sliding]
+
+        if MinkowskiNFP.is_convex(self.stationary) and MinkowskiNFP.is_convex(negated):
+            self.nfp = [list(pt) for pt in MinkowskiNFP.convex_sum(self.stationary, negated)]
+            return
+
+        sums = [Polygon(MinkowskiNFP.convex_sum(p, q))
+                for p in MinkowskiNFP.convex_decomposition(self.stationary)
+                for q in MinkowskiNFP.convex_decomposition(negated)]
+        union = shapely.union_all(sums).simplify(0)
+
+        if isinstance(union, MultiPolygon):
+            union = max(union.geoms, key=lambda poly: poly.area)
+        self.nfp = [list(pt) for pt in PolyFunc.to_ccw(list(union.exterior.coords)[:-1])]
+
+    @staticmethod
+    def convex_sum(p: polyAsList, q: polyAsList) -> polyAsList:
+        """
+        Returns Minkowski sum of two convex counterclockwise polygons by merging their edges by angle.
+
+        Parameters:
+        - p: Convex polygon in list format.
+        - q: Convex polygon in list format.
+
+        Returns:
+        Sum as list of points in counterclockwise order.
+        """
+        p = MinkowskiNFP._rotate_to_bottom(p)
+        q = MinkowskiNFP._rotate_to_bottom(q)
+        p, q = p + p[:2], q + q[:2]
+
+        res = []
+        i = j = 0
+        while i < len(p) - 2 or j < len(q) - 2:
+            res.append((p[i][0] + q[j][0], p[i][1] + q[j][1]))
+            cross = MinkowskiNFP._cross(p[i], p[i + 1], q[j], q[j + 1])
+            if cross >= 0 and i < len(p) - 2:
+                i += 1
+            if cross <= 0 and j < len(q) - 2:
+                j += 1
+        return res
+
+    @staticmethod
+    def convex_decomposition(poly: polyAsList) -> List[polyAsList]:
+        """
+        Splits a simple counterclockwise polygon into convex pieces.
+
+        Triangulates by ear clipping, then removes diagonals whose adjacent pieces
+        stay convex when merged (Hertel-Mehlhorn).
+
+        Parameters:
+        - poly: Polygon in list format.
+
+        Returns:
+        List of convex polygons in list format.
+        """
+        poly = MinkowskiNFP._remove_collinear(poly)
+        if MinkowskiNFP.is_convex(poly):
+            return [poly]
+
+        triangles, diagonals = MinkowskiNFP._ear_clip(poly)
+
+        pieces: Dict[int, List[int]] = dict(enumerate(triangles))
+        edge_owner: Dict[Tuple[int, int], int] = {}
+        for piece_id, piece in pieces.items():
+            for k, a in enumerate(piece):
+                edge_owner[(a, piece[(k + 1) % len(piece)])] = piece_id
+
+        for a, b in diagonals:
+            p_id, q_id = edge_owner[(a, b)], edge_owner[(b, a)]
+            p, q = pieces[p_id], pieces[q_id]
+
+            # walk p from b around to a, then q from a around to b, dropping the shared edge
+            p_start = p.index(b)
+            q_start = q.index(a)
+            merged = p[p_start:] + p[:p_start]
+            q_rot = q[q_start:] + q[:q_start]
+            merged = merged + q_rot[1:-1]
+
+            if not MinkowskiNFP.is_convex([poly[k] for k in merged]):
+                continue
+
+            del pieces[q_id], edge_owner[(a, b)], edge_owner[(b, a)]
+            pieces[p_id] = merged
+            for k, c in enumerate(merged):
+                edge_owner[(c, merged[(k + 1) % len(merged)])] = p_id
+
+        return [[poly[k] for k in piece] for piece in pieces.values()]
+
+    @staticmethod
+    def is_convex(poly: polyAsList) -> bool:
+        """
+        Checks if counterclockwise polygon has no reflex vertices.
+        """
+        n = len(poly)
+        return all(MinkowskiNFP._cross(poly[i - 1], poly[i], poly[i], poly[(i + 1) % n]) >= -MinkowskiNFP.TOLERANCE for i in range(n))
+
+    @staticmethod
+    def _ear_clip(poly: polyAsList) -> Tuple[List[List[int]], List[Tuple[int, int]]]:
+        """
+        Triangulates counterclockwise polygon by ear clipping.
+
+        Returns:
+        Tuple of triangles as vertex index lists and diagonals as index pairs.
+        """
+        remaining = list(range(len(poly)))
+        triangles, diagonals = [], []
+
+        while len(remaining) > 3:
+            n = len(remaining)
+            for k in range(n):
+                prev, curr, nxt = remaining[k - 1], remaining[k], remaining[(k + 1) % n]
+                if MinkowskiNFP._cross(poly[prev], poly[curr], poly[curr], poly[nxt]) <= MinkowskiNFP.TOLERANCE:
+                    continue
+                if any(MinkowskiNFP._in_triangle(poly[other], poly[prev], poly[curr], poly[nxt])
+                       for other in remaining if other not in (prev, curr, nxt)):
+                    continue
+                break
+            else:
+                # no clean ear due to numerical noise, clip the most convex vertex
+                k = max(range(n), key=lambda k: MinkowskiNFP._cross(poly[remaining[k - 1]], poly[remaining[k]], poly[remaining[k]], poly[remaining[(k + 1) % n]]))
+                prev, curr, nxt = remaining[k - 1], remaining[k], remaining[(k + 1) % n]
+
+            triangles.append([prev, curr, nxt])
+            diagonals.append((nxt, prev))
+            remaining.pop(k)
+
+        triangles.append(remaining)
+        return triangles, diagonals
+
+    @staticmethod
+    def _in_triangle(pt: pointAsTuple, a: pointAsTuple, b: pointAsTuple, c: pointAsTuple) -> bool:
+        """
+        Checks if point lies inside or on counterclockwise triangle abc.
+        """
+        tol = -MinkowskiNFP.TOLERANCE
+        return MinkowskiNFP._cross(a, b, a, pt) >= tol and MinkowskiNFP._cross(b, c, b, pt) >= tol and MinkowskiNFP._cross(c, a, c, pt) >= tol
+
+    @staticmethod
+    def _remove_collinear(poly: polyAsList) -> polyAsList:
+        """
+        Drops vertices lying on the line between their neighbours.
+        """
+        n = len(poly)
+        res = [poly[i] for i in range(n) if abs(MinkowskiNFP._cross(poly[i - 1], poly[i], poly[i], poly[(i + 1) % n])) > MinkowskiNFP.TOLERANCE]
+        return res if len(res) >= 3 else poly
+
+    @staticmethod
+    def _rotate_to_bottom(poly: polyAsList) -> polyAsList:
+        """
+        Rotates vertex list to start at the lowest (then leftmost) vertex.
+        """
+        start = min(range(len(poly)), key=lambda i: (poly[i][1], poly[i][0]))
+        return poly[start:] + poly[:start]
+
+    @staticmethod
+    def _cross(a1: pointAsTuple, a2: pointAsTuple, b1: pointAsTuple, b2: pointAsTuple) -> float:
+        """
+        z component of the cross product of vectors a1->a2 and b1->b2.
+        """
+        return (a2[0] - a1[0]) * (b2[1] - b1[1]) - (a2[1] - a1[1]) * (b2[0] - b1[0])
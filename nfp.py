@@ -1,9 +1,14 @@
-import copy
+import numpy as np
 from enum import Enum
-from shapely import Polygon, LineString
+from shapely import Polygon
 from typing import Tuple, List, Union
 from custom_types import polyAsList, lineAsList, pointAsTuple
 from poly_func import PolyFunc
+from segment_func import SegmentFunc
+from fixed_point import FixedPoint
+from nfp_method import NFPMethod
+from minkowski_nfp import MinkowskiNFP
+from instrumentation import Instrumentation
 
 class LineRelationship(Enum):
     """
@@ -13,193 +18,417 @@ class LineRelationship(Enum):
     cw = 1
     parallel = 2
 
-class Intersection:
+class Intersections:
     """
-    Class to represent an interesction of two edges.
+    Class to represent all intersections between edges of two polygons as compact arrays.
 
     ### Parameters:
-    - edge1: edge stored as list.
-    - edge2: edge stored as list.
-    - vector1: vector representation of edge1.
-    - vector2: vector representation of edge2.
-    - edge1_start: Flag indicating if the intersection point is the start of edge1.
-    - edge2_start: Flag indicating if the intersection point is the start of edge2.
-    - edge1_end: Flag indicating if the intersection point is the end of edge1.
-    - edge2_end: Flag indicating if the intersection point is the end of edge2.
-    =
+    - stationary_edges: (starts, ends) arrays of stationary polygon edges.
+    - sliding_edges: (starts, ends) arrays of sliding polygon edges.
+    - edge1_idx: index of the stationary edge for each intersection.
+    - edge2_idx: index of the sliding edge for each intersection.
+    - pts: (k, 2) array of intersection points.
+    - grid: ((starts1, ends1), (starts2, ends2), pts) of both polygons and the intersection points snapped to the grid
+    in fixed-point mode, endpoint flags are then exact grid comparisons with NFP.GRID_SLACK.
+
+    ### Attributes:
+    - edge1_start: Flags indicating if the intersection point is the start of edge1.
+    - edge2_start: Flags indicating if the intersection point is the start of edge2.
+    - edge1_end: Flags indicating if the intersection point is the end of edge1.
+    - edge2_end: Flags indicating if the intersection point is the end of edge2.
+    - vector1, vector2: (k, 2) arrays with vector representations of edge1 and edge2.
+    - grid_vector1, grid_vector2: (k, 2) int64 arrays of the same vectors in grid units in fixed-point mode, None otherwise.
     """
-    def __init__(self, edge1: lineAsList, edge2: lineAsList, vector1, vector2, edge1_start: bool, edge2_start: bool, edge1_end: bool, edge2_end: bool, pt: pointAsTuple):
-        self.edge1 = edge1
-        self.edge2 = edge2
-        self.vector1 = vector1
-        self.vector2 = vector2
-        self.edge1_start = edge1_start
-        self.edge2_start = edge2_start
-        self.edge1_end = edge1_end
-        self.edge2_end = edge2_end
-        self.pt = pt
+    def __init__(self, stationary_edges: Tuple[np.ndarray, np.ndarray], sliding_edges: Tuple[np.ndarray, np.ndarray], edge1_idx: np.ndarray, edge2_idx: np.ndarray, pts: np.ndarray,
+                 grid: Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray], np.ndarray] = None):
+        starts1, ends1 = stationary_edges
+        starts2, ends2 = sliding_edges
+        self.edge1_idx = edge1_idx
+        self.edge2_idx = edge2_idx
+        self.pts = pts
+        self.edge1 = np.stack((starts1[edge1_idx], ends1[edge1_idx]), axis=1)
+        self.edge2 = np.stack((starts2[edge2_idx], ends2[edge2_idx]), axis=1)
+        self.vector1 = self.edge1[:, 1] - self.edge1[:, 0]
+        self.vector2 = self.edge2[:, 1] - self.edge2[:, 0]
+        if grid is None:
+            self.grid_vector1 = self.grid_vector2 = None
+            endpoints = (self.edge1[:, 0], self.edge2[:, 0], self.edge1[:, 1], self.edge2[:, 1])
+            flags = [SegmentFunc.almost_equal(endpoint, pts) for endpoint in endpoints]
+        else:
+            (grid_starts1, grid_ends1), (grid_starts2, grid_ends2), grid_pts = grid
+            grid_edge1 = (grid_starts1[edge1_idx], grid_ends1[edge1_idx])
+            grid_edge2 = (grid_starts2[edge2_idx], grid_ends2[edge2_idx])
+            self.grid_vector1 = grid_edge1[1] - grid_edge1[0]
+            self.grid_vector2 = grid_edge2[1] - grid_edge2[0]
+            endpoints = (grid_edge1[0], grid_edge2[0], grid_edge1[1], grid_edge2[1])
+            flags = [FixedPoint.equal(endpoint, grid_pts, NFP.GRID_SLACK) for endpoint in endpoints]
+        self.edge1_start, self.edge2_start, self.edge1_end, self.edge2_end = flags
+
+    def __len__(self) -> int:
+        return len(self.pts)
 
 class NFP:
     """
     Class that computes NFP between two polygons.
 
     ### Parameters:
-    - poly1: Stationary polygon in list format.
-    - poly2: Sliding polygon in list format.
+    - poly1: Stationary polygon in list or array format.
+    - poly2: Sliding polygon in list or array format.
+    - resolution: Grid spacing of the opt-in fixed-point mode, None for floating point tolerances.
+
+    In fixed-point mode both polygons are snapped to a grid of the given resolution, so their
+    edge vectors are exact integers in grid units however far the sliding polygon moves. Every
+    decision of the orbit is then made by exact int64 predicates of FixedPoint: touching
+    vertices and edges on a snapshot of the current position, turning and reversal on edge
+    vectors. The only tolerance left is the grid itself, GRID_SLACK units, where floating point
+    mode combines several tolerances of different magnitude that can contradict each other.
+    Moves stay in floating point, so contacts are found where they are and not on the grid.
+    Polygons are snapped around a local origin, the bottom vertex of the stationary polygon, so
+    grid coordinates only span the size of the polygons and not their distance from (0, 0).
+
+    ### Attributes:
+    - nfp: Locus of the top (maximum y) vertex of the sliding polygon as it orbits the stationary one.
+    - error: 1 on success, -1 if the iteration limit was reached.
+    - origin: Point the orbit is computed around in fixed-point mode, stationary and sliding are relative to it, (0, 0) otherwise.
     """
 
-    def __init__(self, poly1: polyAsList, poly2: polyAsList):
-        self.stationary = copy.deepcopy(poly1)
-        self.sliding = copy.deepcopy(poly2)
+    OVERLAP_TOLERANCE: float = 1e-6
+    FEASIBILITY_STEP: float = 1e-3  # length of probing move used to test feasibility of a vector
+    ANGLE_TOLERANCE: float = 1e-9  # sine of the angle under which a move counts as parallel to an edge
+    PROBE_SLACKS: int = 4  # shortest probing move in multiples of the coincidence tolerance
+    MIN_ITERATIONS: int = 75  # lower bound of the orbit step limit
+    GRID_SLACK: int = 1  # grid units points may be apart and still touch in fixed-point mode, covers rounding of both polygons
+
+    def __init__(self, poly1: polyAsList, poly2: polyAsList, resolution: float = None):
+        self.resolution = resolution
+        self.tolerance = SegmentFunc.TOLERANCE if resolution is None else resolution * NFP.GRID_SLACK
+        self.origin = np.zeros(2)
+        if resolution is not None:
+            # the sliding polygon is moved to the start of the orbit anyway, snap it around its top vertex
+            self.origin = np.asarray(PolyFunc.get_min_y_pt(poly1), dtype=np.float64)
+            poly1 = FixedPoint.snap(np.asarray(poly1, dtype=np.float64) - self.origin, resolution)
+            poly2 = FixedPoint.snap(np.asarray(poly2, dtype=np.float64) - PolyFunc.get_max_y_pt(poly2), resolution)
+        self.stationary = [[float(x), float(y)] for x, y in PolyFunc.to_ccw(poly1)]
+        self.sliding = [[float(x), float(y)] for x, y in PolyFunc.to_ccw(poly2)]
+        # the stationary polygon never moves, its grid coordinates are computed once
+        self.stationary_grid = None if resolution is None else FixedPoint.to_grid(self.stationary, resolution)
 
         self.starting_point_index = PolyFunc.get_min_y_idx(self.stationary)
-        self.starting_point = PolyFunc.get_min_y_pt(self.stationary)
+        self.starting_point = list(PolyFunc.get_min_y_pt(self.stationary))
 
         self.locus_index = PolyFunc.get_max_y_idx(self.sliding)
 
+        # sliding polygon starts with its top vertex touching the bottom vertex of the stationary one
+        locus = self.sliding[self.locus_index]
+        self.slide_polygon([self.starting_point[0] - locus[0], self.starting_point[1] - locus[1]])
+
+        self.nfp: polyAsList = [list(self.starting_point)]
+        self.last_vector = None
+        self.error = 1
+
         self.compute_nfp()
+        if resolution is not None:
+            self.nfp = (np.asarray(self.nfp) + self.origin).tolist()
     
+    @staticmethod
+    def get_nfp(poly1: polyAsList, poly2: polyAsList, method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION) -> polyAsList:
+        """
+        Computes NFP of two polygons with the selected engine.
+
+        Parameters:
+        - poly1: Stationary polygon in list format.
+        - poly2: Sliding polygon in list format.
+        - method: NFPMethod.orbital, NFPMethod.orbital_fixed or NFPMethod.minkowski.
+        - resolution: Grid spacing of NFPMethod.orbital_fixed, ignored by the other engines.
+
+        Returns:
+        NFP in list format, tracing the top vertex of the sliding polygon.
+
+        Raises:
+        - ValueError if method is invalid.
+        """
+        if method == NFPMethod.orbital:
+            with Instrumentation.timer('nfp.orbital'):
+                return NFP(poly1, poly2).nfp
+        if method == NFPMethod.orbital_fixed:
+            with Instrumentation.timer('nfp.orbital_fixed'):
+                return NFP(poly1, poly2, resolution).nfp
+        if method == NFPMethod.minkowski:
+            with Instrumentation.timer('nfp.minkowski'):
+                return MinkowskiNFP(poly1, poly2).nfp
+        raise ValueError(f"Invalid NFP method {method}")
+
     def compute_nfp(self):
         """
         Main method for computing nfp of two polygons.
         """
 
-        max_iterations: int = 75
+        # the NFP of two non-convex polygons can have up to n * m vertices
+        max_iterations: int = max(NFP.MIN_ITERATIONS, len(self.stationary) * len(self.sliding))
 
         i = 0
-        while not self.reached_end() and i < max_iterations:
-            touching_edges: List[Intersection] = NFP.get_all_intersections(self.stationary, self.sliding)
+        while i < max_iterations:
+            touching_edges: Intersections = NFP.get_all_intersections(self.stationary, self.sliding, self.resolution, self.stationary_grid)
 
-            potential_vectors = self.get_potential_vectors(touching_edges)
+            potential_vectors = self.get_potential_vectors(touching_edges, self.resolution)
             if not potential_vectors: 
                 break
 
-            feasible_vector = self.get_feasible_vector(touching_edges, potential_vectors)
-            if not feasible_vector:
-                break
-
-            trimmed_vector = self.trim_vector(feasible_vector)
-            if trimmed_vector == [0, 0]:
+            trimmed_vector = self.get_feasible_vector(touching_edges, potential_vectors)
+            if not trimmed_vector or self._coincide(trimmed_vector, [0, 0]):
                 break
 
             self.slide_polygon(trimmed_vector)
-            self.nfp.append(list(self.sliding[self.locus_index]))
+            self.last_vector = trimmed_vector
             i += 1
 
-            if Polygon(self.sliding).intersects(Polygon(self.stationary)):
+            if self.reached_end():
+                break
+            self.nfp.append(list(self.sliding[self.locus_index]))
+
+            if Polygon(self.sliding).intersection(Polygon(self.stationary)).area > NFP.OVERLAP_TOLERANCE:
                 break
 
         if i == max_iterations:
             self.error = -1 # add enum
+            Instrumentation.count('nfp.iteration_limit')
+        Instrumentation.count('nfp.orbit_steps', i)
 
     def reached_end(self) -> bool:
         """
         Locus index of sliding polygon equal to starting point (full loop completed).
         """
-        return NFP._almost_equal(self.sliding[self.locus_index], self.starting_point)
+        return self._coincide(self.sliding[self.locus_index], self.starting_point)
+
+    def _coincide(self, p1: pointAsTuple, p2: pointAsTuple) -> bool:
+        """
+        Checks if two points coincide, within 1e-6 or within GRID_SLACK grid units in fixed-point mode.
+        """
+        if self.resolution is None:
+            return NFP._almost_equal(p1, p2)
+        return bool(FixedPoint.equal(FixedPoint.to_grid(p1, self.resolution), FixedPoint.to_grid(p2, self.resolution), NFP.GRID_SLACK))
+
+    def slide_polygon(self, vector: pointAsTuple):
+        """
+        Translates sliding polygon in place.
+        """
+        for pt in self.sliding:
+            pt[0] += vector[0]
+            pt[1] += vector[1]
     
     @staticmethod
-    def get_all_intersections(p1: polyAsList, p2: polyAsList) -> List[Intersection]:
-        """
-        Returns list of TouchingEdge objects describing nature of found intersections. 
-        """
-        touching_edges = []
-        stationary_edges: List[lineAsList] = NFP.get_all_edges(p1)
-        sliding_edges: List[lineAsList] = NFP.get_all_edges(p2)
-        for edge1 in stationary_edges: # optimize this trash complexity
-            for edge2 in sliding_edges:
-                intersection_pt: pointAsTuple = NFP.get_intersection(edge1, edge2)
-                if intersection_pt is None: 
-                    continue
-                edge1_start: bool = NFP._almost_equal(edge1[0], intersection_pt)
-                edge2_start: bool = NFP._almost_equal(edge2[0], intersection_pt)
-                edge1_end: bool = NFP._almost_equal(edge1[1], intersection_pt) 
-                edge2_end: bool = NFP._almost_equal(edge2[1], intersection_pt) 
-                intersection_obj = Intersection(edge1, edge2, NFP.edge_to_vector(edge1), NFP.edge_to_vector(edge2), edge1_start, edge2_start, edge1_end, edge2_end, intersection_pt)
-                touching_edges.append(intersection_obj)
-        return touching_edges
+    def get_all_intersections(p1: polyAsList, p2: polyAsList, resolution: float = None, grid1: np.ndarray = None) -> Intersections:
+        """
+        Returns Intersections object describing all touching points between edges of p1 and p2.
+
+        In fixed-point mode (resolution set) polygons touch only at vertices lying on edges of the
+        other polygon, which are found with exact predicates on both polygons snapped to the grid.
+        grid1 is p1 already snapped to the grid, computed if None.
+        """
+        stationary_edges = SegmentFunc.get_edges(p1)
+        sliding_edges = SegmentFunc.get_edges(p2)
+        Instrumentation.count('nfp.edge_pairs_tested', len(stationary_edges[0]) * len(sliding_edges[0]))
+        if resolution is None:
+            edge1_idx, edge2_idx, pts, _ = SegmentFunc.get_intersections(*stationary_edges, *sliding_edges)
+            return Intersections(stationary_edges, sliding_edges, edge1_idx, edge2_idx, pts)
+
+        starts1 = FixedPoint.to_grid(p1, resolution) if grid1 is None else grid1
+        starts2 = FixedPoint.to_grid(p2, resolution)
+        ends1, ends2 = np.roll(starts1, -1, axis=0), np.roll(starts2, -1, axis=0)
+        # stationary vertex i on sliding edge j, and sliding vertex j on stationary edge i
+        idx2_a, idx1_a = NFP._get_vertex_contacts(starts1, starts2, ends2)
+        idx1_b, idx2_b = NFP._get_vertex_contacts(starts2, starts1, ends1)
+        # coincident vertices are found by both tests and reported once
+        keep = ~(FixedPoint.equal(starts1[idx1_b], starts2[idx2_b], NFP.GRID_SLACK)
+                 & FixedPoint.on_segment(starts1[idx1_b], starts2[idx2_b], ends2[idx2_b], NFP.GRID_SLACK))
+        idx1_b, idx2_b = idx1_b[keep], idx2_b[keep]
+
+        edge1_idx, edge2_idx = np.concatenate((idx1_a, idx1_b)), np.concatenate((idx2_a, idx2_b))
+        pts = np.concatenate((stationary_edges[0][idx1_a], sliding_edges[0][idx2_b]))
+        grid_pts = np.concatenate((starts1[idx1_a], starts2[idx2_b]))
+        order = np.lexsort((np.arange(len(edge1_idx)), edge2_idx, edge1_idx))
+        return Intersections(stationary_edges, sliding_edges, edge1_idx[order], edge2_idx[order], pts[order], ((starts1, ends1), (starts2, ends2), grid_pts[order]))
+
+    @staticmethod
+    def _get_vertex_contacts(vertices: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (edge index, vertex index) arrays of all grid vertices lying on grid edges within GRID_SLACK.
+        """
+        if len(vertices) * len(starts) <= SegmentFunc.DENSE_PAIRS:
+            edge_idx, vertex_idx = np.divmod(np.arange(len(starts) * len(vertices)), len(vertices))
+        else:
+            # vertices are zero length segments for the broadphase
+            edge_idx, vertex_idx = SegmentFunc.get_candidate_pairs(starts, ends, vertices, vertices, NFP.GRID_SLACK)
+        hit = FixedPoint.on_segment(vertices[vertex_idx], starts[edge_idx], ends[edge_idx], NFP.GRID_SLACK)
+        return edge_idx[hit], vertex_idx[hit]
 
     @staticmethod
-    def get_potential_vectors(touching_edges: List[Intersection]):
+    def get_potential_vectors(touching_edges: Intersections, resolution: float = None) -> List[pointAsTuple]:
         """
-        Determine possible translation vectors.
+        Determine possible translation vectors, snapped to the grid in fixed-point mode.
+
+        Fixed-point mode takes edge vectors and their turns from the grid vectors of all contacts at once.
         """
+        if resolution is not None:
+            turns = np.sign(FixedPoint.cross(touching_edges.grid_vector1, touching_edges.grid_vector2)).tolist()
+            forward_vectors = FixedPoint.from_grid(touching_edges.grid_vector1, resolution).tolist()
+            reverse_vectors = FixedPoint.from_grid(-touching_edges.grid_vector2, resolution).tolist()
+
         all_vectors = []
-        for touching in touching_edges:
-            aim_edge = []
-            line_rel = NFP.judge_position(touching.edge1, touching.edge2)
-            
-            # intersection at starting point of both edges
-            if touching.edge1_start and touching.edge2_start:
-                aim_edge = [touching.edge2[1], touching.edge2[0]] if line_rel == LineRelationship.ccw else touching.edge1
+        for k in range(len(touching_edges)):
+            edge1_start = touching_edges.edge1_start[k]
+            edge2_start = touching_edges.edge2_start[k]
 
-            # interesction at starting point of static edge
-            elif touching.edge1_start:
-                aim_edge = touching.edge1 if line_rel == LineRelationship.ccw else []
-            
-            # interesction at starting point of orbital edge
-            elif touching.edge2_start:
-                line_rel = NFP.judge_position(touching.edge2, touching.edge1)
-                aim_edge = [touching.edge2[1], touching.edge2[0]] if line_rel == LineRelationship.cw else []
+            # touching at the end of an edge is handled by the start of the following edge
+            if (touching_edges.edge1_end[k] and not edge1_start) or (touching_edges.edge2_end[k] and not edge2_start):
+                continue
 
-            # intersection none or somewhere in between ??
+            if resolution is None:
+                edge1 = touching_edges.edge1[k].tolist()
+                edge2 = touching_edges.edge2[k].tolist()
+                line_rel = NFP.judge_position(edge1, edge2)
+                forward, reverse = NFP.edge_to_vector(edge1), NFP.edge_to_vector([edge2[1], edge2[0]])
             else:
-                aim_edge = touching.edge1 if line_rel == LineRelationship.ccw else []
+                line_rel = {1: LineRelationship.ccw, -1: LineRelationship.cw}.get(turns[k], LineRelationship.parallel)
+                forward, reverse = tuple(forward_vectors[k]), tuple(reverse_vectors[k])
+
+            aim_vectors = []
+
+            # intersection at starting point of both edges: both edges are candidates, the
+            # preferred one first, feasibility testing picks the one that does not overlap
+            if edge1_start and edge2_start:
+                aim_vectors = [reverse, forward] if line_rel == LineRelationship.ccw else [forward, reverse]
+
+            # vertex of static polygon touching orbital edge: slide along orbital edge in reverse
+            elif edge1_start:
+                aim_vectors = [reverse]
+            
+            # vertex of orbital polygon touching static edge: slide along static edge
+            elif edge2_start:
+                aim_vectors = [forward]
 
-            if aim_edge:
-                vector = NFP.edge_to_vector(aim_edge)
+            for vector in aim_vectors:
                 if vector not in all_vectors:
                     all_vectors.append(vector)
 
         return all_vectors
     
-    @staticmethod
-    def get_feasible_vector():
-        pass
+    def get_feasible_vector(self, touching_edges: Intersections, potential_vectors: List[pointAsTuple]) -> Union[None, pointAsTuple]:
+        """
+        Returns first potential vector that neither reverses the previous move nor pushes the sliding polygon into the stationary one,
+        trimmed to the first new contact.
 
-    @staticmethod
-    def trim_vector():
-        min_distance = float('inf')
-        for edge in 
+        The probing move is kept shorter than the trimmed vector, so gaps narrower than
+        FEASIBILITY_STEP ahead of the sliding polygon are not mistaken for overlap. On coarse
+        grids it spans at least PROBE_SLACKS times the grid slack, so it is never taken for a standstill.
+        """
+        stationary = Polygon(self.stationary)
 
-    @staticmethod
-    def edge_to_vector(edge: lineAsList) -> pointAsTuple:
+        # vertices touching the interior of an edge of the other polygon must not cross to its inner (left) side
+        on_sliding_edge = touching_edges.edge1_start & ~touching_edges.edge2_start & ~touching_edges.edge2_end
+        on_stationary_edge = touching_edges.edge2_start & ~touching_edges.edge1_start & ~touching_edges.edge1_end
+        fixed = self.resolution is not None
+        sliding_edge_dirs = (touching_edges.grid_vector2 if fixed else touching_edges.vector2)[on_sliding_edge]
+        stationary_edge_dirs = (touching_edges.grid_vector1 if fixed else touching_edges.vector1)[on_stationary_edge]
+
+        for vector in potential_vectors:
+            if self.last_vector is not None and NFP._is_reverse(vector, self.last_vector, self.resolution):
+                continue
+
+            v = FixedPoint.to_grid(vector, self.resolution) if fixed else np.asarray(vector)
+            if np.any(self._get_turns(sliding_edge_dirs, v) < 0) or np.any(self._get_turns(stationary_edge_dirs, v) > 0):
+                continue
+
+            trimmed = self.trim_vector(vector)
+            probe_length = min(max(NFP.FEASIBILITY_STEP, NFP.PROBE_SLACKS * self.tolerance), (trimmed[0] ** 2 + trimmed[1] ** 2) ** .5 / 2)
+            if probe_length <= self.tolerance:
+                continue
+
+            step = probe_length / (vector[0] ** 2 + vector[1] ** 2) ** .5
+            probe = Polygon([(x + vector[0] * step, y + vector[1] * step) for x, y in self.sliding])
+            overlap = probe.intersection(stationary).area
+
+            if overlap <= probe_length ** 2 * 1e-3:
+                return trimmed
+        return None
+
+    def _get_turns(self, directions: np.ndarray, vector: np.ndarray) -> np.ndarray:
         """
-        Turns a line into vector form.
+        Returns 1 where vector turns left of each direction, -1 where it turns right and 0 where they are parallel.
+
+        Floating point mode counts angles with sine under ANGLE_TOLERANCE as parallel, fixed-point
+        mode takes directions and vector in grid units and compares them exactly.
         """
-        return (edge[1][0] - edge[0][0], edge[1][1] - edge[0][1])
+        if self.resolution is not None:
+            return np.sign(FixedPoint.cross(directions, vector))
+        cross = SegmentFunc._cross(directions, vector)
+        tolerance = NFP.ANGLE_TOLERANCE * np.hypot(*directions.T) * np.hypot(*vector)
+        return np.where(cross > tolerance, 1, np.where(cross < -tolerance, -1, 0))
 
-    @staticmethod
-    def get_all_edges(p: polyAsList) -> List:
+    def trim_vector(self, vector: pointAsTuple) -> pointAsTuple:
         """
-        Turns polygon into list of edges.
+        Shortens vector so that sliding along it stops at the first new contact between the polygons.
+
+        Every vertex of the sliding polygon is projected along the vector and every vertex
+        of the stationary polygon against it, and all projections are intersected with the
+        other polygon's edges in one batched pass.
         """
-        return [[p[i], p[i+1%len(p)]] for i, _ in enumerate(p)]
+        vector = np.asarray(vector, dtype=np.float64)
+        stationary = np.asarray(self.stationary, dtype=np.float64)
+        sliding = np.asarray(self.sliding, dtype=np.float64)
+
+        Instrumentation.count('nfp.trim_pairs_tested', 2 * len(stationary) * len(sliding))
+        min_t = 1.0
+        for vertices, edges, direction in ((sliding, SegmentFunc.get_edges(stationary), vector),
+                                            (stationary, SegmentFunc.get_edges(sliding), -vector)):
+            _, _, _, t = SegmentFunc.get_intersections(vertices, vertices + direction, *edges, self.tolerance)
+            length = np.hypot(*vector)
+            t = t[t * length > self.tolerance]
+            if len(t):
+                min_t = min(min_t, float(t.min()))
 
-    @staticmethod 
-    def get_intersection(edge1: lineAsList, edge2: lineAsList) -> Union[None, pointAsTuple]:
+        return (float(vector[0] * min_t), float(vector[1] * min_t))
+
+    @staticmethod
+    def edge_to_vector(edge: lineAsList) -> pointAsTuple:
         """
-        Returns coordinates of intersection if it exists, None if it does not.
+        Turns a line into vector form.
         """
-        edge1, edge2 = LineString(edge1), LineString(edge2)
-        intersection = edge1.intersection(edge2)
-        if intersection.is_empty:
-            return None
-        return tuple(intersection.coords)[0]
+        return (edge[1][0] - edge[0][0], edge[1][1] - edge[0][1])
 
     @staticmethod
-    def judge_position(edge1: lineAsList, edge2: lineAsList) -> LineRelationship:
+    def judge_position(edge1: lineAsList, edge2: lineAsList, resolution: float = None) -> LineRelationship:
         """
-        Determine if edge1 is ccw, cw, or parallel relative to edge2.
+        Determine if edge1 is ccw, cw, or parallel relative to edge2, exactly on the grid if resolution is set.
         """
         v1 = NFP.edge_to_vector(edge1)
         v2 = NFP.edge_to_vector(edge2)
-        cross_product = NFP.cross_product(v1, v2)
+        if resolution is None:
+            cross_product = NFP.cross_product(v1, v2)
+        else:
+            cross_product = int(FixedPoint.cross(FixedPoint.to_grid(v1, resolution), FixedPoint.to_grid(v2, resolution)))
         return {
             cross_product > 0: LineRelationship.ccw,
             cross_product < 0: LineRelationship.cw,
         }.get(True, LineRelationship.parallel)
 
+    @staticmethod
+    def cross_product(v1: pointAsTuple, v2: pointAsTuple) -> float:
+        """
+        z component of the cross product of two 2D vectors.
+        """
+        return v1[0] * v2[1] - v1[1] * v2[0]
+
+    @staticmethod
+    def _is_reverse(v1: pointAsTuple, v2: pointAsTuple, resolution: float = None) -> bool:
+        """
+        Checks if v1 points in the opposite direction of v2, exactly on the grid if resolution is set.
+        """
+        if resolution is not None:
+            g1, g2 = FixedPoint.to_grid(v1, resolution), FixedPoint.to_grid(v2, resolution)
+            return bool(FixedPoint.cross(g1, g2) == 0 and FixedPoint.dot(g1, g2) < 0)
+        return abs(NFP.cross_product(v1, v2)) < 1e-9 and v1[0] * v2[0] + v1[1] * v2[1] < 0
+
     @staticmethod
     def _almost_equal(p1: polyAsList, p2: polyAsList, tolerance: float = 1e-6) -> bool:
         """
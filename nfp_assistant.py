@@ -1,95 +1,401 @@
 import os
-import copy
-from shapely.geometry import Polygon
+import multiprocessing
+import multiprocessing.pool
+import numpy as np
+import shapely
 
-from point_func import PointFunc
+from nfp import NFP
+from nfp_cache import NFPCache
+from nfp_store import NFPStore
+from nfp_method import NFPMethod
+from fixed_point import FixedPoint
+from instrumentation import Instrumentation
 from poly_func import PolyFunc
+from poly_store import PolyStore
+from part_order import PartOrder
 
-from typing import List, Tuple, Any
-from custom_types import polyAsList
+from typing import Dict, Iterable, List, Tuple, Iterator, Union
+from custom_types import polyAsList, pointAsTuple
+
+# state of pool worker processes, set once per worker by _init_worker
+_worker_polygons: PolyStore = None
+_worker_method: NFPMethod = NFPMethod.orbital
+_worker_resolution: float = FixedPoint.RESOLUTION
+
+def _init_worker(polygons: PolyStore, method: NFPMethod, resolution: float):
+    global _worker_polygons, _worker_method, _worker_resolution
+    _worker_polygons = polygons
+    _worker_method = method
+    _worker_resolution = resolution
+
+def _compute_nfp_chunk(tasks: List[Tuple[int, int, float]]) -> List[Tuple[int, int, float, polyAsList]]:
+    return [(i, j, rotation, NFP.get_nfp(_worker_polygons[i], PolyFunc.rotate_poly(_worker_polygons[j], rotation), _worker_method, _worker_resolution))
+            for i, j, rotation in tasks]
 
 
 class NFPAssistant:
 
     """
     Stores data for optimizing NFP generation process.
+
+    Rotating both polygons by the same angle rotates their NFP by that angle, so NFPs are
+    stored once per pair and relative rotation of the sliding polygon. NFPs of rotated
+    copies are served by rotating the stored outline, which keeps the cost of rotated
+    nesting at one NFP per relative rotation instead of one per pair of orientations.
+
+    NFPs are computed on first request unless get_all_nfp is set, and kept in an NFPStore
+    holding only the pairs used so far. With max_nfp_bytes set, least recently used NFPs
+    are dropped once the budget is exceeded and computed again if requested later.
+
+    ### Parameters:
+    - polygons: List of polygons in list format, PolyStore or PartOrder.
+    - allowed_rotations: Rotations in degrees each polygon may be placed at, either one list shared by
+    all polygons or a list per polygon. Only unrotated placement is allowed if None. Ignored for a
+    PartOrder, which carries the allowed rotations of its shapes.
+    - store_nfp: Flag for saving computed NFPs to the persistent cache.
+    - store_path: Location of the persistent NFP cache, needed if store_nfp or load_history is set.
+    - get_all_nfp: Flag for computing NFPs of all polygon pairs up front.
+    - load_history: Flag for warming NFPs of all polygon pairs from the persistent cache.
+    - workers: Number of processes used when computing all NFPs up front.
+    - nfp_method: Engine used for NFP computation, orbital by default.
+    - resolution: Grid spacing of NFPMethod.orbital_fixed, ignored by the other engines.
+    - max_nfp_bytes: Memory budget of NFPs held in memory, unbounded if None.
+    - prefetch: Flag for computing NFPs of all polygon pairs on a background process pool with workers processes.
+
+    ### Attributes:
+    - nfps: NFPStore of computed NFPs, of NFPs served by fingerprint and of their shrunk interiors.
+    - prefetch_pool: Pool computing NFPs in the background, None if not prefetching.
     """
 
-    def __init__(self, polygons: List[polyAsList], store_nfp=False, store_path=None, get_all_nfp=False):
+    def __init__(self, polygons: Union[List[polyAsList], PolyStore, PartOrder], store_nfp=False, store_path=None, get_all_nfp=False, load_history=False, nfp_method: NFPMethod = NFPMethod.orbital, workers: int = 1, allowed_rotations: Union[None, List[float], List[List[float]]] = None, max_nfp_bytes: int = None, prefetch: bool = False, resolution: float = FixedPoint.RESOLUTION):
+
+        # duplicates of a shape share one entry, their allowed rotations are merged
+        order = PartOrder.from_polygons(polygons, allowed_rotations)
+        # own store and rotation lists, shapes added later must not change the order
+        self.polygons: PolyStore = PolyStore(order.shapes.coords, order.shapes.offsets)
+        self.rotations: List[List[float]] = [list(angles) for angles in order.rotations]
 
-        self.polygons = self.delete_redundancy(copy.deepcopy(polygons))
+        self.index: Dict[bytes, int] = {}
+        self.offset_list: List[pointAsTuple] = []
+        self.centroid_list: List[tuple] = [tuple(centroid) for centroid in self.polygons.centroids.tolist()]
 
-        self.area_list: List[int] = []
-        self.first_vec_list: List[List[float]] = []
-        self.centroid_list: List[tuple] = []
+        # index polygons by translation-normalized fingerprint, NFPs are stored relative to the offset
+        for i, poly in enumerate(self.polygons):
+            fingerprint, offset = PolyFunc.get_fingerprint(poly)
+            self.index[fingerprint] = i
+            self.offset_list.append(offset)
 
-        # save polygons by area, first vector, and centroid
-        for poly_list in polygons:
-            poly = Polygon(poly_list)
-            self.centroid_list.append(PointFunc.point_as_tuple(poly.centroid))
-            self.area_list.append(int(poly.area)) 
-            self.first_vec_list.append(PolyFunc.get_first_vec(poly))
+        # rotated copies are recognized by fingerprint as (polygon index, rotation, offset of the rotated copy)
+        self.variants: Dict[bytes, Tuple[int, float, pointAsTuple]] = {}
+        for i, poly in enumerate(self.polygons):
+            for angle in [0] + self.rotations[i]:
+                fingerprint, offset = PolyFunc.get_fingerprint(PolyFunc.rotate_poly(poly, angle))
+                self.variants.setdefault(fingerprint, (i, angle, offset))
 
-        # store list of nfps for impoved calculation time
-        self.nfp_list = [[0] * len(self.polygons) for _ in range(len(self.polygons))]
+        # computed NFPs keyed (i, j, relative rotation of polygon j) and traced by the origin of polygon j,
+        # NFPs of shape pairs moved to offset (0, 0) as requested by callers, keyed ('translation', NFP method, both fingerprints),
+        # and their shrunk interiors, keyed ('interior', NFP method, shrink distance, both fingerprints)
+        self.nfps: NFPStore = NFPStore(max_nfp_bytes)
+        self.prefetch_pool: Union[None, multiprocessing.pool.Pool] = None
 
+        if (store_nfp or load_history) and store_path is None:
+            raise ValueError("A store_path is needed to save or load NFPs")
         self.store_nfp = store_nfp
         self.store_path = store_path
+        self.load_history = load_history
+        self.nfp_method = nfp_method
+        self.resolution = resolution
+
+        self.cache = NFPCache(self.store_path) if store_nfp or load_history else None
+
+        if load_history:
+            self.load_nfp_history()
 
         if get_all_nfp:
-            self.get_all_nfp()
+            self.get_all_nfp(workers)
+
+        if prefetch:
+            self.prefetch(workers)
 
     @staticmethod
-    def delete_redundancy(polys: List[polyAsList]) -> List[polyAsList]:
-        unique_polys = []
+    def delete_redundancy(polys: Union[List[polyAsList], PolyStore]) -> List[polyAsList]:
+        """
+        Removes polygons whose shape already occurs in the list, including translated copies.
+        """
+        unique_polys = {}
         for poly in polys:
-            if poly not in unique_polys:
-                unique_polys.append(poly)
-        return unique_polys
+            unique_polys.setdefault(PolyFunc.get_fingerprint(poly)[0], poly)
+        return list(unique_polys.values())
+
+    def add_polygons(self, polygons: Union[List[polyAsList], PolyStore, PartOrder], allowed_rotations: Union[None, List[float], List[List[float]]] = None):
+        """
+        Registers shapes arriving after construction, so their rotated copies share NFPs like those of the initial polygons.
+
+        Known shapes get the new allowed rotations added. Stored NFPs stay valid, new shapes are
+        appended to the store without repacking the known ones.
+        """
+        order = PartOrder.from_polygons(polygons, allowed_rotations)
+        new_shapes = []
+        for poly, angles in zip(order.shapes, order.rotations):
+            fingerprint, offset = PolyFunc.get_fingerprint(poly)
+            i = self.index.get(fingerprint)
+            if i is None:
+                i = self.index[fingerprint] = len(self.polygons) + len(new_shapes)
+                new_shapes.append(poly)
+                self.offset_list.append(offset)
+                self.rotations.append([])
+            else:
+                # variant offsets are relative to the stored copy of the shape
+                poly = self.polygons[i]
+            new_angles = [angle for angle in angles if angle not in self.rotations[i]]
+            self.rotations[i] = sorted(self.rotations[i] + new_angles)
+            for angle in [0] + new_angles:
+                variant_fingerprint, variant_offset = PolyFunc.get_fingerprint(PolyFunc.rotate_poly(poly, angle))
+                self.variants.setdefault(variant_fingerprint, (i, angle, variant_offset))
+
+        added = PolyStore.from_polygons(new_shapes)
+        self.polygons.append(added)
+        self.centroid_list.extend(tuple(centroid) for centroid in added.centroids.tolist())
 
     def get_poly_index(self, target: polyAsList) -> int:
         """
-        Gets index of polygon from list based on area and first vector if multiple of same area are found
+        Gets index of the polygon with the same shape as target, -1 if there is none.
         """
-        area = int(Polygon(target).area)
-        first_vec = PolyFunc.get_first_vec(Polygon(target))
-        area_indices = NFPAssistant._get_index_multi(area, self.area_list) 
+        return self.index.get(PolyFunc.get_fingerprint(target)[0], -1)
 
-        if len(area_indices) == 1:
-            return area_indices[0]
-        
-        vec_indices = NFPAssistant._get_index_multi(first_vec, self.first_vec_list)
-        index = [x for x in area_indices if x in vec_indices]
+    def get_relative_rotations(self, i: int, j: int) -> List[float]:
+        """
+        Returns rotations of polygon j relative to polygon i occurring between their allowed rotations.
+        """
+        return sorted({PartOrder.normalize_angle(beta - alpha) for alpha in self.rotations[i] for beta in self.rotations[j]})
 
-        return index[0] if len(index) > 0 else -1
+    def get_missing(self, shapes: List[int] = None) -> List[Tuple[int, int, float]]:
+        """
+        Returns (i, j, relative rotation) triples whose NFP is not known yet.
 
-    @staticmethod
-    def _get_index_multi(target: Any, list: List[Any]) -> List[int]:
-        res = []
-        for i, item in enumerate(list):
-            if item == target:
-                res.append(i)
-        return res
-
-    def get_all_nfp(self):
-        for i, poly1 in enumerate(self.polygons):
-            for j, poly2 in enumerate(self.polygons):
-                nfp = NFP(poly1, poly2).nfp
-                self.nfp_list[i][j] = PolyFunc.shift_poly(nfp, -self.centroid_list[i][0], -self.centroid_list[i][1])
-
-    def get_direct_nfp(self, poly1: polyAsList, poly2: polyAsList):
-        i = self.get_poly_index(poly1)
-        j = self.get_poly_index(poly2)
-        centroid = PointFunc.point_as_tuple(Polygon(poly1).centroid)
-
-        if self.nfp_list[i][j] == 0:
-            nfp = NFP(poly1, poly2).nfp
-            return nfp
-
-        return PolyFunc.shift_poly(self.nfp_list[i][j], centroid[0], centroid[1])
-
-    def get_direct_nfp(self, poly1: polyAsList, poly2: polyAsList):
-        i = self.get_poly_index(poly1)
-        j = self.get_poly_index(poly2)
-        centroid = PointFunc.point_as_tuple(Polygon(poly1).centroid)
-        
+        Shapes are numbered by first appearance, so triples are ordered by the later of the two
+        shapes: pairs needed early in a placement in input order come first.
+
+        Parameters:
+        - shapes: Indices of polygons whose pairs are considered, all polygons if None.
+        """
+        shapes = range(len(self.polygons)) if shapes is None else sorted(set(shapes))
+        missing = [(i, j, rotation) for i in shapes for j in shapes for rotation in self.get_relative_rotations(i, j)
+                   if (i, j, rotation) not in self.nfps]
+        return sorted(missing, key=lambda task: max(task[0], task[1]))
+
+    def _store(self, i: int, j: int, rotation: float, nfp: polyAsList) -> np.ndarray:
+        """
+        Stores NFP of polygon j rotated by rotation sliding around polygon i at its original position, traced by the origin.
+        """
+        locus = np.asarray(nfp, dtype=np.float64) - PolyFunc.get_max_y_pt(PolyFunc.rotate_poly(self.polygons[j], rotation))
+        self.nfps.put((i, j, rotation), locus)
+        return locus
+
+    def load_nfp_history(self, shapes: List[int] = None):
+        """
+        Fills NFPs of polygon pairs and relative rotations found in the persistent cache, all pairs among shapes if given.
+        """
+        missing = self.get_missing(shapes)
+        stored = self.cache.get_many(((self.polygons[i], self.polygons[j], rotation) for i, j, rotation in missing), self.nfp_method, self.resolution)
+        for (i, j, rotation), nfp in zip(missing, stored):
+            if nfp is not None:
+                self._store(i, j, rotation, nfp)
+
+    def get_all_nfp(self, workers: int = 1, chunk_size: int = 8, timeout: float = None):
+        """
+        Computes NFPs of all polygon pairs at all relative rotations not already known.
+
+        Parameters:
+        - workers: Number of worker processes, all cores if None, serial if 1.
+        - chunk_size: Number of NFPs sent to a worker at once.
+        - timeout: Seconds to wait for the next chunk before abandoning the remaining ones.
+        Abandoned NFPs are left to be computed on demand by get_direct_nfp.
+        """
+        with Instrumentation.timer('nfp_assistant.get_all_nfp'):
+            tasks = self.get_missing()
+            Instrumentation.count('nfp_assistant.precomputed', len(tasks))
+
+            if workers == 1:
+                results = ((i, j, rotation, NFP.get_nfp(self.polygons[i], PolyFunc.rotate_poly(self.polygons[j], rotation), self.nfp_method, self.resolution))
+                           for i, j, rotation in tasks)
+            else:
+                results = self._compute_parallel(tasks, workers or os.cpu_count(), chunk_size, timeout)
+
+            self.add_nfps(results)
+
+    def add_nfps(self, results: Iterable[Tuple[int, int, float, polyAsList]]):
+        """
+        Stores (i, j, relative rotation, nfp) results computed elsewhere, and saves them to the persistent cache in one transaction if store_nfp is set.
+        """
+        new_entries = []
+        for i, j, rotation, nfp in results:
+            new_entries.append((self.polygons[i], self.polygons[j], rotation, nfp))
+            self._store(i, j, rotation, nfp)
+
+        if self.store_nfp:
+            self.cache.put_many(new_entries, self.nfp_method, self.resolution)
+
+    def _compute_parallel(self, tasks: List[Tuple[int, int, float]], workers: int, chunk_size: int, timeout: float) -> Iterator[Tuple[int, int, float, polyAsList]]:
+        """
+        Yields (i, j, rotation, nfp) results from a process pool as soon as each chunk of tasks finishes.
+        """
+        chunks = [tasks[k:k + chunk_size] for k in range(0, len(tasks), chunk_size)]
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self.polygons, self.nfp_method, self.resolution))
+        try:
+            results = pool.imap_unordered(_compute_nfp_chunk, chunks)
+            for _ in chunks:
+                try:
+                    chunk_result = results.next(timeout)
+                except multiprocessing.TimeoutError:
+                    break
+                yield from chunk_result
+        finally:
+            # stops workers stuck on a pathological pair
+            pool.terminate()
+
+    def prefetch(self, workers: int = 1, chunk_size: int = 8, tasks: List[Tuple[int, int, float]] = None):
+        """
+        Starts computing NFPs on a background process pool and returns immediately.
+
+        NFPs are stored as they arrive. Requests for an NFP still in flight compute it in the
+        calling process. Prefetched NFPs are not written to the persistent cache.
+
+        Parameters:
+        - workers: Number of worker processes, all cores if None.
+        - chunk_size: Number of NFPs sent to a worker at once.
+        - tasks: (i, j, relative rotation) triples to compute, all unknown ones in order of likely use if None.
+        """
+        self.stop_prefetch()
+        tasks = self.get_missing() if tasks is None else [task for task in tasks if task not in self.nfps]
+        if not tasks:
+            return
+        Instrumentation.count('nfp_assistant.prefetched', len(tasks))
+
+        self.prefetch_pool = multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(self.polygons, self.nfp_method, self.resolution))
+        for k in range(0, len(tasks), chunk_size):
+            self.prefetch_pool.apply_async(_compute_nfp_chunk, (tasks[k:k + chunk_size],), callback=self._store_prefetched)
+        # workers exit once all chunks are done
+        self.prefetch_pool.close()
+
+    def _store_prefetched(self, results: List[Tuple[int, int, float, polyAsList]]):
+        """
+        Stores NFPs of a finished prefetch chunk, called on the result thread of the pool.
+        """
+        for i, j, rotation, nfp in results:
+            if (i, j, rotation) not in self.nfps:
+                self._store(i, j, rotation, nfp)
+
+    def stop_prefetch(self):
+        """
+        Stops background prefetching, NFPs received so far stay stored.
+        """
+        if self.prefetch_pool is not None:
+            self.prefetch_pool.terminate()
+            self.prefetch_pool = None
+
+    def __getstate__(self):
+        # the cache connection and prefetch pool cannot be pickled, copies sent to other processes only carry computed NFPs
+        state = self.__dict__.copy()
+        state.update(cache=None, store_nfp=False, load_history=False, prefetch_pool=None)
+        return state
+
+    def get_direct_nfp(self, poly1: polyAsList, poly2: polyAsList) -> np.ndarray:
+        """
+        Returns NFP of poly2 sliding around poly1 at the position of poly1, computing and storing it on first request.
+
+        Polygons may be rotated copies of stored polygons, their NFP is the stored NFP at their
+        relative rotation turned by the rotation of poly1.
+        """
+        fingerprint1, offset1 = PolyFunc.get_fingerprint(poly1)
+        fingerprint2, offset2 = PolyFunc.get_fingerprint(poly2)
+        translations = self.get_translation_nfp(fingerprint1, fingerprint2, poly1, poly2)
+
+        # rotation can reorder vertices of equal height, trace the top vertex of poly2 as the caller finds it
+        return translations + offset1 + np.subtract(PolyFunc.get_max_y_pt(poly2), offset2)
+
+    def get_translation_nfp(self, fingerprint1: bytes, fingerprint2: bytes, poly1: polyAsList = None, poly2: polyAsList = None) -> np.ndarray:
+        """
+        Returns NFP of two shapes moved to offset (0, 0), as the translations of the second shape
+        that make it touch the first, computing and storing it on first request.
+
+        Callers placing many copies of few shapes fingerprint every polygon once and shift the
+        result themselves instead of calling get_direct_nfp for every pair.
+
+        Parameters:
+        - fingerprint1, fingerprint2: Fingerprints of the stationary and sliding shape.
+        - poly1, poly2: The shapes at any position, only needed if they are not rotated copies of stored polygons.
+
+        Raises:
+        - KeyError if a shape is unknown and not given.
+        """
+        key = ('translation', self.nfp_method, fingerprint1, fingerprint2)
+        translations = self.nfps.get(key)
+        if translations is not None:
+            Instrumentation.count('nfp_assistant.hits')
+            return translations
+
+        variant1 = self.variants.get(fingerprint1)
+        variant2 = self.variants.get(fingerprint2)
+
+        if variant1 is None or variant2 is None:
+            if poly1 is None or poly2 is None:
+                raise KeyError("NFP of unknown shapes requested by fingerprint only")
+            offset1, offset2 = PolyFunc.get_fingerprint(poly1)[1], PolyFunc.get_fingerprint(poly2)[1]
+            locus = np.asarray(self._load_or_compute(poly1, poly2, 0), dtype=np.float64)
+            translations = locus - offset1 - np.subtract(PolyFunc.get_max_y_pt(poly2), offset2)
+        else:
+            (i, rotation1, variant_offset1), (j, rotation2, variant_offset2) = variant1, variant2
+            rotation = PartOrder.normalize_angle(rotation2 - rotation1)
+            locus = self._get_stored_nfp(i, j, rotation)
+            translations = PolyFunc.rotate_poly(locus, rotation1) - variant_offset1 + variant_offset2
+
+        self.nfps.put(key, translations)
+        return translations
+
+    def get_interior(self, fingerprint1: bytes, fingerprint2: bytes, distance: float, poly1: polyAsList = None, poly2: polyAsList = None) -> Tuple[List[np.ndarray], float]:
+        """
+        Returns rings of the NFP of two shapes moved to offset (0, 0) shrunk by distance, and the largest x of the NFP.
+
+        Shrinking takes a GEOS buffer, so interiors are kept in the NFPStore with the NFPs and
+        count against the same memory budget.
+
+        Parameters:
+        - fingerprint1, fingerprint2, poly1, poly2: As for get_translation_nfp.
+        - distance: Distance the NFP is shrunk by.
+
+        Raises:
+        - KeyError if a shape is unknown and not given.
+        """
+        key = ('interior', self.nfp_method, distance, fingerprint1, fingerprint2)
+        interior = self.nfps.get(key)
+        if interior is None:
+            nfp = self.get_translation_nfp(fingerprint1, fingerprint2, poly1, poly2)
+            shrunk = shapely.Polygon(nfp).buffer(-distance, join_style='mitre')
+            interior = ([shapely.get_coordinates(part.exterior)[:-1] for part in shapely.get_parts(shrunk)], float(nfp[:, 0].max()))
+            self.nfps.put(key, interior)
+        return interior
+
+    def _get_stored_nfp(self, i: int, j: int, rotation: float) -> np.ndarray:
+        """
+        Returns NFP of polygon i and polygon j rotated by rotation traced by the origin, computing it on first request.
+        """
+        locus = self.nfps.get((i, j, rotation))
+        if locus is None:
+            return self._store(i, j, rotation, self._load_or_compute(self.polygons[i], self.polygons[j], rotation))
+        Instrumentation.count('nfp_assistant.hits')
+        return locus
+
+    def _load_or_compute(self, stationary: polyAsList, sliding: polyAsList, rotation: float) -> polyAsList:
+        """
+        Returns NFP of stationary and sliding rotated by rotation from the persistent cache, computing it if missing.
+        """
+        nfp = self.cache.get(stationary, sliding, rotation, self.nfp_method, self.resolution) if self.load_history else None
+        if nfp is None:
+            Instrumentation.count('nfp_assistant.misses')
+            nfp = NFP.get_nfp(stationary, PolyFunc.rotate_poly(sliding, rotation), self.nfp_method, self.resolution)
+            if self.store_nfp:
+                self.cache.put(stationary, sliding, nfp, rotation, self.nfp_method, self.resolution)
+        else:
+            Instrumentation.count('nfp_assistant.cache_hits')
+        return nfp
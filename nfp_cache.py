@@ -0,0 +1,148 @@
+import time
+import sqlite3
+import hashlib
+import numpy as np
+
+from typing import Dict, Iterable, List, Tuple, Union
+from custom_types import polyAsList
+from nfp_method import NFPMethod
+from fixed_point import FixedPoint
+from poly_func import PolyFunc
+
+class NFPCache:
+    """
+    Persistent content-addressed store of NFPs backed by an SQLite file.
+
+    Entries are keyed by a hash of the translation-normalized geometry of the stationary
+    and sliding polygons, the rotation of the sliding polygon and the NFP engine, with its grid
+    resolution for NFPMethod.orbital_fixed, so identical parts hit the same entry regardless of
+    position, vertex order or orientation, while NFPs of different engines never mix. NFPs are stored
+    relative to the normalized stationary polygon and shifted back on lookup.
+    The file may be shared between runs and processes; once it holds more than
+    max_entries NFPs the least recently used ones are evicted. The number of entries is kept
+    in a single-row meta table updated in the same transaction as the NFPs, so writes never
+    count the whole table.
+
+    ### Parameters:
+    - path: Location of cache file, created if it does not exist.
+    - max_entries: Maximum number of stored NFPs.
+
+    ### Attributes:
+    - hits, misses: Lookup counters for this instance.
+
+    ### Examples:
+    >>> cache = NFPCache('/var/cache/packing/nfp_cache.db')
+    >>> cache.put(poly1, poly2, nfp)
+    >>> cache.get(poly1, poly2) == nfp
+    True
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS nfp (key TEXT PRIMARY KEY, data BLOB NOT NULL, last_access REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS nfp_last_access ON nfp (last_access)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL)')
+        # files written before the meta table existed are counted once
+        self._conn.execute('INSERT OR IGNORE INTO meta (id, entries) SELECT 0, COUNT(*) FROM nfp')
+        self._conn.commit()
+
+    @staticmethod
+    def get_key(stationary: polyAsList, sliding: polyAsList, rotation: float = 0, method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION) -> str:
+        """
+        Returns canonical hash of a (stationary, sliding, rotation) triple and the NFP engine, resolution only counts for NFPMethod.orbital_fixed.
+        """
+        digest = hashlib.sha256()
+        for poly in (stationary, sliding):
+            digest.update(PolyFunc.get_fingerprint(poly)[0])
+            digest.update(b'|')
+        digest.update(repr(round(float(rotation), PolyFunc.FINGERPRINT_DECIMALS)).encode())
+        digest.update(b'|' + method.name.encode())
+        if method == NFPMethod.orbital_fixed:
+            digest.update(b'|' + repr(float(resolution)).encode())
+        return digest.hexdigest()
+
+    def get(self, stationary: polyAsList, sliding: polyAsList, rotation: float = 0, method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION) -> Union[None, polyAsList]:
+        """
+        Returns stored NFP shifted to the position of the stationary polygon, None if not stored.
+        """
+        return self.get_many([(stationary, sliding, rotation)], method, resolution)[0]
+
+    def get_many(self, queries: Iterable[Tuple[polyAsList, polyAsList, float]], method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION) -> List[Union[None, polyAsList]]:
+        """
+        Looks up several (stationary, sliding, rotation) triples in one transaction.
+
+        Parameters:
+        - queries: Iterable of (stationary, sliding, rotation) triples.
+        - method: Engine the NFPs were computed with.
+        - resolution: Grid spacing of NFPMethod.orbital_fixed.
+
+        Returns:
+        List of NFPs in list format, None for triples not in the cache.
+        """
+        queries = list(queries)
+        keys = [NFPCache.get_key(stationary, sliding, rotation, method, resolution) for stationary, sliding, rotation in queries]
+        found: Dict[str, bytes] = {}
+
+        # stay below SQLite's limit on number of bound parameters
+        unique_keys = list(set(keys))
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            rows = self._conn.execute(f'SELECT key, data FROM nfp WHERE key IN ({",".join("?" * len(chunk))})', chunk)
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self._conn.executemany('UPDATE nfp SET last_access = ? WHERE key = ?', [(now, key) for key in found])
+            self._conn.commit()
+
+        res = []
+        for (stationary, _, _), key in zip(queries, keys):
+            if key not in found:
+                self.misses += 1
+                res.append(None)
+                continue
+            self.hits += 1
+            _, offset = PolyFunc.normalize(stationary)
+            nfp = np.frombuffer(found[key], dtype=np.float64).reshape(-1, 2) + offset
+            res.append(nfp.tolist())
+        return res
+
+    def put(self, stationary: polyAsList, sliding: polyAsList, nfp: polyAsList, rotation: float = 0, method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION):
+        """
+        Stores NFP of a (stationary, sliding, rotation) triple computed with method.
+        """
+        self.put_many([(stationary, sliding, rotation, nfp)], method, resolution)
+
+    def put_many(self, entries: Iterable[Tuple[polyAsList, polyAsList, float, polyAsList]], method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION):
+        """
+        Stores several (stationary, sliding, rotation, nfp) entries computed with method in one transaction and evicts least recently used entries above the size cap.
+        """
+        now = time.time()
+        rows = []
+        for stationary, sliding, rotation, nfp in entries:
+            _, offset = PolyFunc.normalize(stationary)
+            data = (np.asarray(nfp, dtype=np.float64).reshape(-1, 2) - offset).tobytes()
+            rows.append((NFPCache.get_key(stationary, sliding, rotation, method, resolution), data, now))
+        if not rows:
+            return
+
+        # a key already stored holds the same NFP, possibly written by another process, only new rows are counted
+        inserted = self._conn.executemany('INSERT OR IGNORE INTO nfp (key, data, last_access) VALUES (?, ?, ?)', rows).rowcount
+        entries = self._conn.execute('UPDATE meta SET entries = entries + ? WHERE id = 0 RETURNING entries', (inserted,)).fetchone()[0]
+        excess = entries - self.max_entries
+        if excess > 0:
+            deleted = self._conn.execute('DELETE FROM nfp WHERE key IN (SELECT key FROM nfp ORDER BY last_access ASC LIMIT ?)', (excess,)).rowcount
+            self._conn.execute('UPDATE meta SET entries = entries - ? WHERE id = 0', (deleted,))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT entries FROM meta WHERE id = 0').fetchone()[0]
@@ -0,0 +1,12 @@
+import enum
+
+class NFPMethod(enum.Enum):
+    """
+    Enum for NFP computation engines:
+    orbital = 0 (sliding the polygons around each other),
+    minkowski = 1 (Minkowski sum with convex decomposition),
+    orbital_fixed = 2 (orbital with exact integer predicates on a grid, of FixedPoint.RESOLUTION unless a resolution is given)
+    """
+    orbital = 0
+    minkowski = 1
+    orbital_fixed = 2
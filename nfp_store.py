@@ -0,0 +1,106 @@
+import threading
+import numpy as np
+
+from collections import OrderedDict
+from typing import Any, Hashable, Union
+
+class NFPStore:
+    """
+    In-memory map of NFPs as float64 arrays with a memory budget.
+
+    Entries are only created when an NFP is first computed or loaded, so memory grows with the
+    number of pairs actually used rather than with the square of the number of shapes. Once
+    the stored arrays take more than max_bytes the least recently used ones are evicted and
+    computed again if requested later. Access is guarded by a lock, so background threads may
+    fill the store while it is read.
+
+    ### Parameters:
+    - max_bytes: Memory budget in bytes, unbounded if None.
+
+    ### Attributes:
+    - nbytes: Bytes taken by stored NFPs, including a fixed overhead per entry.
+    - hits, misses, evictions: Lookup and eviction counters.
+
+    ### Examples:
+    >>> store = NFPStore(max_bytes=64 * 2 ** 20)
+    >>> store.put((0, 1, 90.0), nfp)
+    >>> store.get((0, 1, 90.0)) is nfp
+    True
+    """
+
+    ENTRY_OVERHEAD: int = 256  # approximate bytes of key, array header and map entry
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._nfps: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Union[None, np.ndarray, tuple]:
+        """
+        Returns stored NFP, None if it was never stored or has been evicted.
+        """
+        with self._lock:
+            nfp = self._nfps.get(key)
+            if nfp is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._nfps.move_to_end(key)
+            return nfp
+
+    def put(self, key: Hashable, nfp: Union[np.ndarray, tuple]):
+        """
+        Stores NFP and evicts least recently used entries above the memory budget, never the new entry.
+
+        Data derived from an NFP may be stored as a tuple of arrays, lists of arrays and numbers.
+        """
+        if not isinstance(nfp, tuple):
+            nfp = np.ascontiguousarray(nfp, dtype=np.float64)
+        with self._lock:
+            old = self._nfps.pop(key, None)
+            if old is not None:
+                self.nbytes -= NFPStore.get_nbytes(old) + NFPStore.ENTRY_OVERHEAD
+            self._nfps[key] = nfp
+            self.nbytes += NFPStore.get_nbytes(nfp) + NFPStore.ENTRY_OVERHEAD
+            while self.max_bytes is not None and self.nbytes > self.max_bytes and len(self._nfps) > 1:
+                _, evicted = self._nfps.popitem(last=False)
+                self.nbytes -= NFPStore.get_nbytes(evicted) + NFPStore.ENTRY_OVERHEAD
+                self.evictions += 1
+
+    @staticmethod
+    def get_nbytes(value: Any) -> int:
+        """
+        Returns bytes taken by the arrays of a stored value, nested in tuples and lists.
+        """
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(NFPStore.get_nbytes(item) for item in value)
+        return 0
+
+    def clear(self):
+        with self._lock:
+            self._nfps.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._nfps
+
+    def __len__(self) -> int:
+        return len(self._nfps)
+
+    def __getstate__(self):
+        # locks cannot be pickled, copies get a fresh one
+        with self._lock:
+            state = self.__dict__.copy()
+            state['_nfps'] = OrderedDict(self._nfps)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import socket
+import multiprocessing
+import asyncio
+import argparse
+import concurrent.futures
+import numpy as np
+
+from typing import Dict, List, Set, Tuple, Union
+from custom_types import polyAsList
+from nfp import NFP
+from nfp_method import NFPMethod
+from fixed_point import FixedPoint
+from poly_func import PolyFunc
+from part_order import PartOrder
+from nfp_assistant import NFPAssistant
+from incremental_packer import IncrementalPacker
+from instrumentation import Instrumentation
+
+# state of pool worker processes, set once per worker by _init_worker and kept warm across jobs
+_worker_nfp_assistant: NFPAssistant = None
+_worker_method: NFPMethod = NFPMethod.orbital
+_worker_resolution: float = FixedPoint.RESOLUTION
+_worker_store_path: str = None
+_worker_max_nfp_bytes: int = None
+_worker_max_shapes: int = None
+
+def _init_worker(store_path: str, method: NFPMethod, resolution: float, max_nfp_bytes: int, max_shapes: int):
+    global _worker_method, _worker_resolution, _worker_store_path, _worker_max_nfp_bytes, _worker_max_shapes
+    _worker_method = method
+    _worker_resolution = resolution
+    _worker_store_path = store_path
+    _worker_max_nfp_bytes = max_nfp_bytes
+    _worker_max_shapes = max_shapes
+    _reset_worker_assistant()
+
+def _reset_worker_assistant():
+    global _worker_nfp_assistant
+    _worker_nfp_assistant = NFPAssistant([], store_path=_worker_store_path, load_history=True, nfp_method=_worker_method, resolution=_worker_resolution, max_nfp_bytes=_worker_max_nfp_bytes)
+
+def _compute_nfps(tasks: List[Tuple[np.ndarray, np.ndarray, float]]) -> List[polyAsList]:
+    return [NFP.get_nfp(stationary, PolyFunc.rotate_poly(sliding, rotation), _worker_method, _worker_resolution) for stationary, sliding, rotation in tasks]
+
+def _run_job(job: dict, deadline: float) -> dict:
+    """
+    Packs a job on the worker and returns its response, with the placements made so far if the deadline passes.
+    """
+    start = time.time()
+    order = PartOrder.from_polygons(job['polygons'], job.get('allowed_rotations'))
+    # shapes of earlier jobs are forgotten once there are too many, their NFPs stay in the shared cache
+    if len(_worker_nfp_assistant.polygons) > _worker_max_shapes:
+        _worker_nfp_assistant.cache.close()
+        _reset_worker_assistant()
+    _worker_nfp_assistant.add_polygons(order)
+    # NFPs the server computed for this job are read from the shared cache in one query
+    _worker_nfp_assistant.load_nfp_history([_worker_nfp_assistant.get_poly_index(shape) for shape in order.shapes])
+
+    packer = IncrementalPacker(job['width'], job.get('sheet_length'), NFPAssistant=_worker_nfp_assistant)
+    packer.add_parts(order)
+    placements, status = [], 'done'
+    for part_id, sheet, translation, rotation in packer.placements():
+        placements.append([part_id, sheet, list(translation), rotation])
+        if time.time() > deadline and len(placements) < len(order):
+            status = 'timeout'
+            break
+
+    return {'status': status, 'placements': placements, 'sheets': len(packer.sheets),
+            'length': packer.sheets[-1].get_length(), 'placement_seconds': time.time() - start}
+
+
+class PackingServer:
+    """
+    Long-lived local packing service sharing one warm NFP cache between all jobs.
+
+    Jobs arrive as JSON lines over a Unix socket or localhost TCP and are answered with one
+    JSON line each, carrying the id of the job if it had one. A job is packed in two stages:
+    - NFPs of all shape pairs of the job missing from the shared cache are computed on the
+    process pool, in chunks. Pairs already being computed for another job are awaited rather
+    than computed again, and results are written to the persistent NFPCache, so every job and
+    every later server run profits from them.
+    - Parts are placed by IncrementalPacker on a pool worker. Workers keep their NFPAssistant
+    and bottom-left fill caches between jobs and read the precomputed NFPs in one query.
+
+    The server and every worker remember the shapes of past jobs up to max_shapes. Beyond
+    that they start over with the shapes of the next job, whose NFPs are then read from the
+    persistent cache, so memory stays bounded however many different shapes arrive.
+
+    Admission control keeps small jobs responsive: jobs above max_parts and jobs arriving
+    while max_jobs are in progress are rejected, at most max_large_jobs jobs above
+    large_job_parts run at once, and a job never has more than one chunk per worker queued
+    on the pool, so chunks of different jobs interleave. Every job has a time limit; NFP
+    computation stopped by it keeps running for later jobs, placement stops after the
+    current part and the parts placed so far are returned with status 'timeout'.
+
+    ### Parameters:
+    - store_path: Location of the persistent NFP cache shared by all jobs.
+    - workers: Number of pool processes, all cores if None.
+    - nfp_method: Engine used for NFP computation.
+    - resolution: Grid spacing of NFPMethod.orbital_fixed.
+    - max_nfp_bytes: Memory budget of NFPs held by the server and by every worker, unbounded if None.
+    - max_shapes: Distinct shapes the server and every worker remember between jobs.
+    - max_jobs: Jobs queued or running at once.
+    - max_parts: Parts per job.
+    - large_job_parts: Parts above which a job counts as large.
+    - max_large_jobs: Large jobs running at once.
+    - time_limit: Default and maximum seconds per job.
+
+    ### Examples:
+    >>> python packing_server.py --socket /tmp/packing.sock --store-path /var/cache/packing/nfp_cache.db --workers 4
+    >>> PackingServer.send({'id': 7, 'polygons': polygons, 'width': 1000, 'time_limit': 30}, socket_path='/tmp/packing.sock')
+    {'id': 7, 'status': 'done', 'placements': [[0, 0, [12.0, 0.0], 0.0], ...], 'sheets': 1, 'length': 412.5, ...}
+    """
+
+    CHUNK_SIZE: int = 8  # NFPs sent to a worker at once
+    MAX_REQUEST_BYTES: int = 2 ** 26  # longest accepted job line
+
+    def __init__(self, store_path: str, workers: int = None, nfp_method: NFPMethod = NFPMethod.orbital, resolution: float = FixedPoint.RESOLUTION, max_nfp_bytes: int = None, max_shapes: int = 10000,
+                 max_jobs: int = 32, max_parts: int = 10000, large_job_parts: int = 500, max_large_jobs: int = 1, time_limit: float = 300):
+        self.workers = workers or os.cpu_count()
+        self.max_jobs = max_jobs
+        self.max_parts = max_parts
+        self.large_job_parts = large_job_parts
+        self.max_large_jobs = max_large_jobs
+        self.time_limit = time_limit
+        self.store_path = store_path
+        self.nfp_method = nfp_method
+        self.resolution = resolution
+        self.max_nfp_bytes = max_nfp_bytes
+        self.max_shapes = max_shapes
+
+        self.nfp_assistant = self._new_nfp_assistant()
+        # forked workers would inherit the open SQLite connection of the server, which SQLite does not support
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker, initargs=(store_path, nfp_method, resolution, max_nfp_bytes, max_shapes))
+        self.pending: Dict[Tuple[int, int, float], asyncio.Future] = {}  # NFP triples being computed -> future of their chunk
+        self.preparing: int = 0  # jobs inside _prepare_nfps, holding shape indices of nfp_assistant
+        self.active_jobs: int = 0
+        self.large_jobs: asyncio.Semaphore = asyncio.Semaphore(max_large_jobs)
+        self.server: Union[None, asyncio.AbstractServer] = None
+
+    async def start(self, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765):
+        """
+        Starts listening on a Unix socket if socket_path is given, on host and port otherwise.
+        """
+        if socket_path is not None:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=socket_path, limit=PackingServer.MAX_REQUEST_BYTES)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port, limit=PackingServer.MAX_REQUEST_BYTES)
+
+    async def serve(self, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765):
+        """
+        Starts the server and handles connections until cancelled.
+        """
+        await self.start(socket_path, host, port)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stops listening and shuts down the pool, abandoning queued NFP chunks.
+        """
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # jobs on one connection run concurrently and are answered as they finish
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.ensure_future(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter):
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            job, response = {}, {'status': 'error', 'message': f"Invalid JSON: {e}"}
+        else:
+            try:
+                response = await self.submit(job)
+            except Exception as e:
+                response = {'status': 'error', 'message': f"Job failed: {e!r}"}
+        if isinstance(job, dict) and 'id' in job:
+            response['id'] = job['id']
+        writer.write((json.dumps(response) + '\n').encode())
+        await writer.drain()
+
+    async def submit(self, job: dict) -> dict:
+        """
+        Packs a job and returns its response.
+
+        Parameters:
+        - job: Dictionary with 'polygons' (list of polygons in list format) and 'width', optionally
+        'sheet_length', 'allowed_rotations' (shared list or list per polygon) and 'time_limit' in seconds.
+
+        Returns:
+        Dictionary with 'status' ('done', 'timeout', 'rejected' or 'error'), for packed jobs 'placements'
+        as [part id, sheet, translation, rotation] lists, 'sheets', 'length' of the last sheet and timings.
+        """
+        start = time.time()
+        try:
+            order = PartOrder.from_polygons(job['polygons'], job.get('allowed_rotations'))
+            width = float(job['width'])
+            time_limit = min(float(job.get('time_limit', self.time_limit)), self.time_limit)
+        except (KeyError, TypeError, ValueError) as e:
+            return {'status': 'error', 'message': f"Invalid job: {e!r}"}
+
+        if len(order) > self.max_parts:
+            Instrumentation.count('server.rejected')
+            return {'status': 'rejected', 'message': f"Job has {len(order)} parts, at most {self.max_parts} are accepted"}
+        if self.active_jobs >= self.max_jobs:
+            Instrumentation.count('server.rejected')
+            return {'status': 'rejected', 'message': f"Server busy with {self.active_jobs} jobs"}
+
+        Instrumentation.count('server.jobs')
+        self.active_jobs += 1
+        deadline = start + time_limit
+        try:
+            if len(order) > self.large_job_parts:
+                async with self.large_jobs:
+                    response = await self._pack(job, order, width, deadline)
+            else:
+                response = await self._pack(job, order, width, deadline)
+        except concurrent.futures.BrokenExecutor as e:
+            response = {'status': 'error', 'message': f"Worker failed: {e}"}
+        except Exception as e:
+            Instrumentation.count('server.failed')
+            response = {'status': 'error', 'message': f"Job failed: {e!r}"}
+        finally:
+            self.active_jobs -= 1
+        response['seconds'] = time.time() - start
+        return response
+
+    async def _pack(self, job: dict, order: PartOrder, width: float, deadline: float) -> dict:
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._prepare_nfps(order), deadline - time.time())
+        except asyncio.TimeoutError:
+            return {'status': 'timeout', 'placements': [], 'message': 'Time limit reached while computing NFPs'}
+
+        job = {'polygons': order, 'width': width, 'sheet_length': job.get('sheet_length')}
+        return await loop.run_in_executor(self.pool, _run_job, job, deadline)
+
+    def _new_nfp_assistant(self) -> NFPAssistant:
+        return NFPAssistant([], store_nfp=True, load_history=True, store_path=self.store_path, nfp_method=self.nfp_method, resolution=self.resolution, max_nfp_bytes=self.max_nfp_bytes)
+
+    async def _prepare_nfps(self, order: PartOrder):
+        """
+        Makes sure NFPs of all shape pairs of order are in the shared cache, computing missing ones on the pool.
+        """
+        # pending chunks and jobs being prepared refer to shapes by index, the assistant is only replaced without them
+        if len(self.nfp_assistant.polygons) > self.max_shapes and self.preparing == 0 and not self.pending:
+            self.nfp_assistant.cache.close()
+            self.nfp_assistant = self._new_nfp_assistant()
+        self.preparing += 1
+        try:
+            await self._compute_missing(order)
+        finally:
+            self.preparing -= 1
+
+    async def _compute_missing(self, order: PartOrder):
+        loop = asyncio.get_running_loop()
+        self.nfp_assistant.add_polygons(order)
+        shapes = [self.nfp_assistant.get_poly_index(shape) for shape in order.shapes]
+        self.nfp_assistant.load_nfp_history(shapes)
+
+        missing = self.nfp_assistant.get_missing(shapes)
+        shared = {self.pending[task] for task in missing if task in self.pending}
+        tasks = [task for task in missing if task not in self.pending]
+        Instrumentation.count('server.nfp_shared', len(missing) - len(tasks))
+        Instrumentation.count('server.nfp_computed', len(tasks))
+
+        # at most one chunk per worker in flight, so chunks of concurrent jobs take turns on the pool
+        window = self.workers * PackingServer.CHUNK_SIZE
+        for start in range(0, len(tasks), window):
+            futures = []
+            for k in range(start, min(start + window, len(tasks)), PackingServer.CHUNK_SIZE):
+                chunk = tasks[k:k + PackingServer.CHUNK_SIZE]
+                polys = self.nfp_assistant.polygons
+                future = loop.run_in_executor(self.pool, _compute_nfps, [(polys[i], polys[j], rotation) for i, j, rotation in chunk])
+                # results are stored even if the job that asked for them timed out
+                future.add_done_callback(lambda done, chunk=chunk: self._store_chunk(chunk, done))
+                self.pending.update((task, future) for task in chunk)
+                futures.append(future)
+            # shielded, a job running out of time must not cancel chunks other jobs wait for
+            await asyncio.gather(*map(asyncio.shield, futures))
+
+        if shared:
+            await asyncio.gather(*map(asyncio.shield, shared))
+
+    def _store_chunk(self, chunk: List[Tuple[int, int, float]], future: asyncio.Future):
+        for task in chunk:
+            self.pending.pop(task, None)
+        if not future.cancelled() and future.exception() is None:
+            self.nfp_assistant.add_nfps((i, j, rotation, nfp) for (i, j, rotation), nfp in zip(chunk, future.result()))
+
+    @staticmethod
+    def send(job: dict, socket_path: str = None, host: str = '127.0.0.1', port: int = 8765, timeout: float = None) -> dict:
+        """
+        Sends a job to a running server and waits for its response.
+        """
+        if socket_path is not None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(timeout)
+            connection.connect(socket_path)
+        else:
+            connection = socket.create_connection((host, port), timeout)
+        with connection, connection.makefile('rwb') as stream:
+            stream.write((json.dumps(job, default=lambda value: np.asarray(value).tolist()) + '\n').encode())
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local packing service sharing one warm NFP cache between jobs.')
+    parser.add_argument('--socket', help='path of Unix socket, localhost TCP if omitted')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--store-path', required=True, help='path of persistent NFP cache')
+    parser.add_argument('--method', default=NFPMethod.orbital.name, choices=[m.name for m in NFPMethod])
+    parser.add_argument('--resolution', type=float, default=FixedPoint.RESOLUTION, help='grid spacing of the orbital_fixed method')
+    parser.add_argument('--max-jobs', type=int, default=32)
+    parser.add_argument('--max-parts', type=int, default=10000)
+    parser.add_argument('--max-shapes', type=int, default=10000, help='distinct shapes remembered between jobs')
+    parser.add_argument('--time-limit', type=float, default=300, help='default and maximum seconds per job')
+    args = parser.parse_args()
+
+    server = PackingServer(args.store_path, args.workers, NFPMethod[args.method], args.resolution, max_shapes=args.max_shapes, max_jobs=args.max_jobs, max_parts=args.max_parts, time_limit=args.time_limit)
+    try:
+        asyncio.run(server.serve(args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
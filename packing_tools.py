@@ -1,6 +1,8 @@
 from typing import List, Tuple
 import numpy as np
 from shapely.geometry import Polygon, Point
+from segment_func import SegmentFunc
+from fixed_point import FixedPoint
 
 '''
     required direct imports from algo:
@@ -10,6 +12,14 @@ from shapely.geometry import Polygon, Point
 
 class GeoFunc:
 
+    """
+    Functional class for geometric predicates.
+
+    almost_contains tests a single shapely point against a line, the other predicates take
+    coordinate arrays and answer for all points, segments or polygons in one call, with
+    floating point tolerances or exactly on a FixedPoint grid.
+    """
+
     TOLERANCE: float = .01  # some arbitrary value
 
     @staticmethod
@@ -39,7 +49,92 @@ class GeoFunc:
         else:
             return False
 
+    @staticmethod
+    def points_on_segments(pts: np.ndarray, starts: np.ndarray, ends: np.ndarray, tolerance: float = TOLERANCE, resolution: float = None) -> np.ndarray:
+        """
+        Tests every point against every closed segment in one pass.
 
+        Parameters:
+        - pts: (k, 2) array of points.
+        - starts, ends: (m, 2) arrays describing the segments.
+        - tolerance: Largest distance of a point counted as lying on a segment.
+        - resolution: Grid spacing for exact tests of coordinates snapped to the grid, tolerance is ignored if set.
 
+        Returns:
+        (k, m) boolean array, True where point i lies on segment j.
+        """
+        pts, starts, ends = (np.asarray(a, dtype=np.float64).reshape(-1, 2) for a in (pts, starts, ends))
+        if resolution is not None:
+            pts, starts, ends = (FixedPoint.to_grid(a, resolution) for a in (pts, starts, ends))
+            return FixedPoint.on_segment(pts[:, None], starts[None, :], ends[None, :])
+        return GeoFunc._segment_distance(pts[:, None], starts[None, :], ends[None, :]) <= tolerance
+
+    @staticmethod
+    def points_in_polygons(pts: np.ndarray, polys: np.ndarray, tolerance: float = TOLERANCE, resolution: float = None) -> np.ndarray:
+        """
+        Tests every point against one or more polygons in one pass, points on the boundary count as inside.
 
-    
\ No newline at end of file
+        Parameters:
+        - pts: (k, 2) array of points.
+        - polys: (v, 2) array of one polygon or (m, v, 2) array of polygons with the same vertex count, in any orientation.
+        - tolerance: Largest distance to the boundary of a point counted as lying on it.
+        - resolution: Grid spacing for exact tests of coordinates snapped to the grid, tolerance is ignored if set.
+
+        Returns:
+        (k,) boolean array for one polygon, (k, m) boolean array for several.
+        """
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        starts = np.asarray(polys, dtype=np.float64)
+        if resolution is not None:
+            pts, starts = FixedPoint.to_grid(pts, resolution), FixedPoint.to_grid(starts, resolution)
+        ends = np.roll(starts, -1, axis=-2)
+        # one axis per polygon dimension, the vertex axis of the polygons is reduced
+        p = pts.reshape((len(pts),) + (1,) * (starts.ndim - 1) + (2,))
+
+        side = np.sign(SegmentFunc._cross(ends - starts, p - starts))
+        upward = (starts[..., 1] <= p[..., 1]) & (ends[..., 1] > p[..., 1])
+        downward = (ends[..., 1] <= p[..., 1]) & (starts[..., 1] > p[..., 1])
+        winding = np.sum(upward & (side > 0), axis=-1) - np.sum(downward & (side < 0), axis=-1)
+
+        if resolution is not None:
+            on_boundary = FixedPoint.on_segment(p, starts, ends)
+        else:
+            on_boundary = GeoFunc._segment_distance(p, starts, ends) <= tolerance
+        return (winding != 0) | np.any(on_boundary, axis=-1)
+
+    @staticmethod
+    def segments_intersect(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray, tolerance: float = TOLERANCE, resolution: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds all pairs of intersecting closed segments between two sets, touching and collinear overlaps included.
+
+        Parameters:
+        - starts1, ends1: (n, 2) arrays describing the first set of segments.
+        - starts2, ends2: (m, 2) arrays describing the second set of segments.
+        - tolerance: Distance under which segments are considered touching.
+        - resolution: Grid spacing for exact tests of coordinates snapped to the grid, tolerance is ignored if set.
+
+        Returns:
+        Tuple of (idx1, idx2) index arrays of intersecting pairs, sorted by idx1, then idx2.
+        """
+        starts1, ends1, starts2, ends2 = (np.asarray(a, dtype=np.float64).reshape(-1, 2) for a in (starts1, ends1, starts2, ends2))
+        if resolution is None:
+            idx1, idx2, _, _ = SegmentFunc.get_intersections(starts1, ends1, starts2, ends2, tolerance)
+            return idx1, idx2
+
+        starts1, ends1, starts2, ends2 = (FixedPoint.to_grid(a, resolution) for a in (starts1, ends1, starts2, ends2))
+        if len(starts1) * len(starts2) <= SegmentFunc.DENSE_PAIRS:
+            idx1, idx2 = np.divmod(np.arange(len(starts1) * len(starts2)), len(starts2))
+        else:
+            idx1, idx2 = SegmentFunc.get_candidate_pairs(starts1, ends1, starts2, ends2, 0)
+        hit = FixedPoint.segments_intersect(starts1[idx1], ends1[idx1], starts2[idx2], ends2[idx2])
+        return idx1[hit], idx2[hit]
+
+    @staticmethod
+    def _segment_distance(pts: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        Distance of points to closed segments, for broadcastable (..., 2) arrays.
+        """
+        d = ends - starts
+        sq_len = np.sum(d * d, axis=-1)
+        t = np.clip(np.sum((pts - starts) * d, axis=-1) / np.where(sq_len > 0, sq_len, 1.0), 0.0, 1.0)
+        return np.hypot(*np.moveaxis(pts - starts - t[..., None] * d, -1, 0))
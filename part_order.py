@@ -0,0 +1,164 @@
+import itertools
+import numpy as np
+
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+from custom_types import polyAsList
+from poly_func import PolyFunc
+from poly_store import PolyStore
+
+class PartOrder:
+    """
+    Parts to pack as distinct shapes, each with a quantity and a set of allowed rotations.
+
+    Translated copies of a shape are one shape, so NFPs, areas and centroids are computed once
+    per shape and memory grows with the number of distinct shapes rather than pieces. Pieces
+    are numbered in input order and indexing returns the shape of a piece, so an order can be
+    passed wherever a list of polygons is expected.
+
+    ### Parameters:
+    - shapes: Distinct shapes in list or array format or a PolyStore.
+    - piece_shapes: Shape index of every piece.
+    - rotations: Allowed rotations in degrees of every shape, only unrotated placement if None.
+
+    ### Attributes:
+    - shapes: PolyStore of distinct shapes.
+    - piece_shapes: (n,) integer array of shape index per piece.
+    - rotations: Sorted allowed rotations per shape, normalized to [0, 360).
+    - quantities: Number of pieces per shape.
+
+    ### Examples:
+    >>> order = PartOrder.from_items([(square, 12, [0, 90]), (triangle, 3, None)])
+    >>> len(order), len(order.shapes)
+    (15, 2)
+    >>> order.get_rotations(14)
+    [0.0]
+    """
+    __slots__ = ('shapes', 'piece_shapes', 'rotations')
+
+    def __init__(self, shapes: Union[List[polyAsList], PolyStore], piece_shapes: Iterable[int], rotations: List[List[float]] = None):
+        self.shapes: PolyStore = PolyStore.from_polygons(shapes)
+        PartOrder._check_shapes(self.shapes)
+        self.piece_shapes: np.ndarray = np.asarray(piece_shapes, dtype=np.int64).reshape(-1)
+        if rotations is None:
+            rotations = [[0]] * len(self.shapes)
+        if len(rotations) != len(self.shapes):
+            raise ValueError(f"Got allowed rotations for {len(rotations)} of {len(self.shapes)} shapes")
+        self.rotations: List[List[float]] = [sorted({PartOrder.normalize_angle(angle) for angle in angles}) for angles in rotations]
+
+    @staticmethod
+    def from_items(items: Iterable[Tuple[polyAsList, int, Union[None, List[float]]]]) -> 'PartOrder':
+        """
+        Builds order from (polygon, quantity, allowed rotations) items.
+
+        Items with the same shape become one shape whose quantity is the sum of their
+        quantities and whose allowed rotations are the union of theirs. Rotations of None
+        allow unrotated placement only.
+        """
+        shape_index: Dict[bytes, int] = {}
+        shapes: List[polyAsList] = []
+        rotation_sets: List[set] = []
+        piece_shapes: List[int] = []
+
+        for poly, quantity, rotations in items:
+            fingerprint = PolyFunc.get_fingerprint(poly)[0]
+            k = shape_index.get(fingerprint)
+            if k is None:
+                k = shape_index[fingerprint] = len(shapes)
+                shapes.append(poly)
+                rotation_sets.append(set())
+            rotation_sets[k].update([0] if rotations is None else rotations)
+            piece_shapes.extend([k] * quantity)
+
+        return PartOrder(shapes, piece_shapes, [list(angles) for angles in rotation_sets])
+
+    @staticmethod
+    def from_polygons(polygons: Union[List[polyAsList], PolyStore, 'PartOrder'], allowed_rotations: Union[None, List[float], List[List[float]]] = None) -> 'PartOrder':
+        """
+        Builds order with one piece per polygon, returns polygons unchanged if they already are an order.
+
+        Parameters:
+        - polygons: List of polygons in list format, PolyStore or PartOrder.
+        - allowed_rotations: Rotations in degrees shared by all polygons, a list per polygon or None.
+
+        Raises:
+        - ValueError if a list of rotations per polygon is given for a different number of polygons.
+        - ValueError if a polygon has fewer than 3 vertices or zero area.
+        """
+        if isinstance(polygons, PartOrder):
+            return polygons
+        rotations = PartOrder._expand_rotations(allowed_rotations, len(polygons))
+        return PartOrder.from_items(zip(polygons, itertools.repeat(1), rotations))
+
+    @staticmethod
+    def _check_shapes(shapes: PolyStore):
+        """
+        Raises ValueError for shapes no part can have, with fewer than 3 vertices or zero area.
+        """
+        few_vertices = np.flatnonzero(shapes.sizes() < 3)
+        if len(few_vertices):
+            raise ValueError(f"Shape {few_vertices[0]} has {shapes.sizes()[few_vertices[0]]} vertices, at least 3 are needed")
+        zero_area = np.flatnonzero(shapes.areas == 0)
+        if len(zero_area):
+            raise ValueError(f"Shape {zero_area[0]} has zero area")
+
+    @staticmethod
+    def _expand_rotations(allowed_rotations: Union[None, List[float], List[List[float]]], n: int) -> List[Union[None, List[float]]]:
+        """
+        Returns allowed rotations of each of n polygons.
+        """
+        if allowed_rotations is None:
+            return [None] * n
+        if len(allowed_rotations) == 0 or np.ndim(allowed_rotations[0]) == 0:
+            return [list(allowed_rotations)] * n
+        if len(allowed_rotations) != n:
+            raise ValueError(f"Got allowed rotations for {len(allowed_rotations)} of {n} polygons")
+        return [list(rotations) for rotations in allowed_rotations]
+
+    @staticmethod
+    def normalize_angle(angle: float) -> float:
+        """
+        Maps angle in degrees to [0, 360), rounded so that equal rotations compare equal.
+        """
+        return round(float(angle) % 360, PolyFunc.FINGERPRINT_DECIMALS) % 360
+
+    def __len__(self) -> int:
+        return len(self.piece_shapes)
+
+    def __getitem__(self, k: int) -> np.ndarray:
+        return self.shapes[self.piece_shapes[k]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for k in self.piece_shapes:
+            yield self.shapes[k]
+
+    def __getstate__(self):
+        return self.shapes, self.piece_shapes, self.rotations
+
+    def __setstate__(self, state):
+        self.shapes, self.piece_shapes, self.rotations = state
+
+    @property
+    def quantities(self) -> np.ndarray:
+        return np.bincount(self.piece_shapes, minlength=len(self.shapes))
+
+    @property
+    def total_area(self) -> float:
+        return float(self.quantities @ self.shapes.areas)
+
+    def get_rotations(self, k: int) -> List[float]:
+        """
+        Returns allowed rotations of piece k.
+        """
+        return self.rotations[self.piece_shapes[k]]
+
+    def is_rotatable(self) -> bool:
+        """
+        Checks if any piece may be placed at a rotation other than 0.
+        """
+        return any(angles != [0] for angles in self.rotations)
+
+    def get_shape_sequence(self, sequence: List[int]) -> np.ndarray:
+        """
+        Returns shape indices of a sequence of pieces, equal for sequences that only swap identical pieces.
+        """
+        return self.piece_shapes[np.asarray(sequence, dtype=np.int64)]
@@ -0,0 +1,12 @@
+import enum
+
+class PlotMode(enum.Enum):
+    """
+    Enum for handling of packing results:
+    show = 0 (interactive pyplot window),
+    skip = 1 (no plotting),
+    background = 2 (render to file on a background thread)
+    """
+    show = 0
+    skip = 1
+    background = 2
@@ -1,11 +1,20 @@
 import os
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.collections import PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+from typing import List
 from custom_types import polyAsList, lineAsList
 
 class PltUtil:
     """
     Utility class for interacting with matplotlib to visualize polygons and lines.
+
+    add_polygon/add_line draw on the current pyplot figure one edge at a time. Whole layouts
+    should use add_polygons, which draws all outlines as a single collection, or save_layout,
+    which writes an SVG or image file without pyplot or an interactive backend.
     """
 
     @staticmethod
@@ -22,6 +31,79 @@ class PltUtil:
             else:
                 PltUtil.add_line([poly[i], poly[i+1]])
 
+    @staticmethod
+    def add_polygons(polys: List[polyAsList]):
+        """
+        Add all polygons to the plot as one collection.
+
+        Parameters:
+        - polys: List of polygons in list or array format.
+        """
+        plt.gca().add_collection(PltUtil._get_collection(polys))
+
+    @staticmethod
+    def save_layout(polys: List[polyAsList], filepath: str, width: float = None, height: float = None, dpi: int = 100):
+        """
+        Render polygons straight to a file, safe to call from a background thread or on a headless server.
+
+        Parameters:
+        - polys: List of polygons in list or array format.
+        - filepath: Output path, .svg files are written directly, other extensions (.png, .pdf, ...) through matplotlib's Agg renderer.
+        - width, height: Size of the drawn area starting at the origin, bounding box of the polygons if None.
+        - dpi: Resolution of raster images.
+        """
+        if os.path.splitext(filepath)[1].lower() == '.svg':
+            PltUtil.write_svg(polys, filepath, width, height)
+            return
+
+        min_x, min_y, max_x, max_y = PltUtil._get_extent(polys, width, height)
+        fig = Figure(figsize=(8, 8 * (max_y - min_y) / max(max_x - min_x, 1e-9)))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.add_collection(PltUtil._get_collection(polys))
+        ax.set_xlim(min_x, max_x)
+        ax.set_ylim(min_y, max_y)
+        ax.set_aspect('equal')
+        fig.savefig(filepath, dpi=dpi)
+
+    @staticmethod
+    def write_svg(polys: List[polyAsList], filepath: str, width: float = None, height: float = None, stroke_width: float = .5):
+        """
+        Write polygons as a single SVG path, without matplotlib.
+
+        Parameters:
+        - polys: List of polygons in list or array format.
+        - filepath: Path of SVG file to create.
+        - width, height: Size of the drawn area starting at the origin, bounding box of the polygons if None.
+        - stroke_width: Width of outlines in drawing units.
+        """
+        min_x, min_y, max_x, max_y = PltUtil._get_extent(polys, width, height)
+        path = ' '.join('M' + ' L'.join(f'{x:.6g} {y:.6g}' for x, y in np.asarray(poly, dtype=np.float64).reshape(-1, 2).tolist()) + ' Z'
+                        for poly in polys)
+
+        with open(filepath, 'w') as f:
+            f.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{min_x:.6g} {-max_y:.6g} {max_x - min_x:.6g} {max_y - min_y:.6g}">\n')
+            # svg y axis points down, flip it to match the plot
+            f.write(f'<path transform="scale(1,-1)" fill="none" stroke="black" stroke-width="{stroke_width}" d="{path}"/>\n')
+            f.write('</svg>\n')
+
+    @staticmethod
+    def _get_collection(polys: List[polyAsList]) -> PolyCollection:
+        return PolyCollection([np.asarray(poly, dtype=np.float64).reshape(-1, 2) for poly in polys], facecolors='none', edgecolors='black', linewidths=.5)
+
+    @staticmethod
+    def _get_extent(polys: List[polyAsList], width: float, height: float) -> tuple:
+        """
+        Returns (min x, min y, max x, max y) of the drawn area.
+        """
+        coords = np.concatenate([np.asarray(poly, dtype=np.float64).reshape(-1, 2) for poly in polys]) if len(polys) else np.zeros((1, 2))
+        (min_x, min_y), (max_x, max_y) = coords.min(axis=0), coords.max(axis=0)
+        if width is not None:
+            min_x, max_x = 0, width
+        if height is not None:
+            min_y, max_y = 0, height
+        return float(min_x), float(min_y), float(max_x), float(max_y)
+
     @staticmethod
     def add_line(line: lineAsList):
         """
@@ -1,8 +1,10 @@
 import operator
+import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
 from typing import Tuple, Union
-from custom_types import pointAsTuple
+from custom_types import pointAsTuple, polyAsList
 from axis import Axis
 
 class PolyFunc:
@@ -10,6 +12,8 @@ class PolyFunc:
     """
     Functional class for performing operations on shapely polygons.
     """
+
+    FINGERPRINT_DECIMALS: int = 6  # coordinates are rounded to this many decimals in fingerprints
     @staticmethod
     def get_min_x_pt(poly: Polygon) -> pointAsTuple:
         """
@@ -21,7 +25,7 @@ class PolyFunc:
         Returns:
         Point in the form of a tuple containing two floats.
         """
-        PolyFunc._get_extreme(poly, Axis.x, min=True, idx=False)
+        return PolyFunc._get_extreme(poly, Axis.x, min=True, idx=False)
     
     @staticmethod
     def get_max_x_pt(poly: Polygon) -> pointAsTuple:
@@ -34,7 +38,7 @@ class PolyFunc:
         Returns:
         Point in the form of a tuple containing two floats.
         """
-        PolyFunc._get_extreme(poly, Axis.x, min=False, idx=False)
+        return PolyFunc._get_extreme(poly, Axis.x, min=False, idx=False)
     
     @staticmethod
     def get_min_y_pt(poly: Polygon) -> pointAsTuple:
@@ -47,7 +51,7 @@ class PolyFunc:
         Returns:
         Point in the form of a tuple containing two floats.
         """
-        PolyFunc._get_extreme(poly, Axis.y, min=True, idx=False)
+        return PolyFunc._get_extreme(poly, Axis.y, min=True, idx=False)
     
     @staticmethod
     def get_max_y_pt(poly: Polygon) -> pointAsTuple:
@@ -60,7 +64,7 @@ class PolyFunc:
         Returns:
         Point in the form of a tuple containing two floats.
         """
-        PolyFunc._get_extreme(poly, Axis.y, min=False, idx=False)
+        return PolyFunc._get_extreme(poly, Axis.y, min=False, idx=False)
 
     @staticmethod
     def get_min_x_idx(poly: Polygon) -> int:
@@ -73,7 +77,7 @@ class PolyFunc:
         Returns:
         Integer index.
         """
-        PolyFunc._get_extreme(poly, Axis.x, min=True, idx=True)
+        return PolyFunc._get_extreme(poly, Axis.x, min=True, idx=True)
     
     @staticmethod
     def get_max_x_idx(poly: Polygon) -> int:
@@ -86,7 +90,7 @@ class PolyFunc:
         Returns:
         Integer index.
         """
-        PolyFunc._get_extreme(poly, Axis.x, min=False, idx=True)
+        return PolyFunc._get_extreme(poly, Axis.x, min=False, idx=True)
     
     @staticmethod
     def get_min_y_idx(poly: Polygon) -> int:
@@ -99,7 +103,7 @@ class PolyFunc:
         Returns:
         Integer index.
         """
-        PolyFunc._get_extreme(poly, Axis.y, min=True, idx=True)
+        return PolyFunc._get_extreme(poly, Axis.y, min=True, idx=True)
     
     @staticmethod
     def get_max_y_idx(poly: Polygon) -> int:
@@ -112,7 +116,7 @@ class PolyFunc:
         Returns:
         Integer index.
         """
-        PolyFunc._get_extreme(poly, Axis.y, min=False, idx=True)
+        return PolyFunc._get_extreme(poly, Axis.y, min=False, idx=True)
 
     @staticmethod
     def _get_extreme(poly: Polygon, axis: int, min: bool, idx: bool) -> Union[int, pointAsTuple]:
@@ -136,12 +140,14 @@ class PolyFunc:
             raise ValueError(f"Invalid axis value {axis}")
 
         comparison_operator = operator.lt if min else operator.gt
-        extreme_val: float = poly[0][axis]
+        other = 1 - axis.value
+        extreme_val: float = poly[0][axis.value]
         extreme_idx: int = 0
 
         for i, point in enumerate(poly):
-            if comparison_operator(point[axis], extreme_val):
-                extreme_val = point[axis]
+            # ties are broken by the lowest value on the other axis so the result does not depend on vertex order
+            if comparison_operator(point[axis.value], extreme_val) or (point[axis.value] == extreme_val and point[other] < poly[extreme_idx][other]):
+                extreme_val = point[axis.value]
                 extreme_idx = i
         
         return extreme_idx if idx else poly[extreme_idx]
@@ -173,15 +179,102 @@ class PolyFunc:
         return (poly[1][0] - poly[0][0], poly[1][1] - poly[0][1])
 
     @staticmethod
-    def shift_poly(poly: Polygon, x: float, y: float) -> Polygon:
+    def get_signed_area(poly: polyAsList) -> float:
+        """
+        Returns signed area of polygon using the shoelace formula
+
+        Parameters:
+        - poly: Polygon in list or array format
+
+        Returns:
+        Area, positive if vertices are in counterclockwise order and negative otherwise
+        """
+        coords = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        x, y = coords[:, 0], coords[:, 1]
+        return float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+    @staticmethod
+    def to_ccw(poly: polyAsList) -> polyAsList:
+        """
+        Returns polygon with vertices in counterclockwise order
+
+        Parameters:
+        - poly: Polygon in list format
+
+        Returns:
+        Input polygon if already counterclockwise, reversed copy otherwise
+        """
+        return poly if PolyFunc.get_signed_area(poly) >= 0 else poly[::-1]
+
+    @staticmethod
+    def normalize(poly: polyAsList) -> Tuple[np.ndarray, pointAsTuple]:
+        """
+        Returns canonical form of polygon independent of position, orientation and starting vertex
+
+        Parameters:
+        - poly: Polygon in list or array format
+
+        Returns:
+        Tuple of counterclockwise (n, 2) array translated so its bounding box starts at the origin and
+        starting at its lowest (then leftmost) vertex, and the translation offset (min x, min y)
+        """
+        coords = PolyFunc.to_ccw(np.asarray(poly, dtype=np.float64).reshape(-1, 2))
+        offset = coords.min(axis=0)
+        shifted = coords - offset
+        # start is picked on rounded coordinates, float noise from rotation or translation must not change it
+        rounded = np.round(shifted, PolyFunc.FINGERPRINT_DECIMALS)
+        start = np.lexsort((rounded[:, 0], rounded[:, 1]))[0]
+        normalized = np.roll(shifted, -start, axis=0)
+        return normalized, (float(offset[0]), float(offset[1]))
+
+    @staticmethod
+    def get_fingerprint(poly: polyAsList) -> Tuple[bytes, pointAsTuple]:
+        """
+        Returns hashable identity of polygon shape, equal for all translated copies of it
+
+        Parameters:
+        - poly: Polygon in list format
+
+        Returns:
+        Tuple of fingerprint bytes of the normalized polygon and the translation offset (min x, min y)
+        """
+        normalized, offset = PolyFunc.normalize(poly)
+        # adding 0.0 turns -0.0 into 0.0 so both round to the same bytes
+        rounded = np.round(normalized, PolyFunc.FINGERPRINT_DECIMALS) + 0.0
+        return rounded.tobytes(), offset
+
+    @staticmethod
+    def shift_poly(poly: Union[Polygon, np.ndarray, polyAsList], x: float, y: float) -> Union[Polygon, np.ndarray, polyAsList]:
         """
         Returns input polygon shifted by the input vector
 
         Parameters:
-        - poly: Shapely polygon
+        - poly: Shapely polygon, (n, 2) array or polygon in list format
+
+        Returns:
+        Shifted polygon of the same type as the input
+        """
+        if isinstance(poly, Polygon):
+            return shapely.transform(poly, lambda coords: coords + (x, y))
+        if isinstance(poly, np.ndarray):
+            return poly + (x, y)
+        return [[point[0] + x, point[1] + y] for point in poly]
+
+    @staticmethod
+    def rotate_poly(poly: Union[np.ndarray, polyAsList], angle: float) -> Union[np.ndarray, polyAsList]:
+        """
+        Returns input polygon rotated counterclockwise around the origin
+
+        Parameters:
+        - poly: (n, 2) array or polygon in list format
+        - angle: Rotation angle in degrees
 
         Returns:
-        Shifted polygon
+        Rotated polygon of the same type as the input
         """
-        shifted_points = [(point.x + x, point.y + y) for point in poly.exterior.coords]
-        return Polygon(shifted_points)
+        if angle % 360 == 0:
+            return poly
+        rad = np.radians(angle)
+        cos, sin = np.cos(rad), np.sin(rad)
+        rotated = np.asarray(poly, dtype=np.float64).reshape(-1, 2) @ np.array([[cos, sin], [-sin, cos]])
+        return rotated if isinstance(poly, np.ndarray) else rotated.tolist()
@@ -0,0 +1,112 @@
+import numpy as np
+import shapely
+
+from typing import Dict, List, Union
+from custom_types import polyAsList
+from poly_func import PolyFunc
+from poly_store import PolyStore
+from part_order import PartOrder
+from instrumentation import Instrumentation
+
+class PolySimplifier:
+    """
+    Reduces vertex counts of parts before NFP computation, with outlines that always contain the original.
+
+    Outlines are built in two steps: Douglas-Peucker simplification by a step distance, which
+    moves the boundary by at most that much either way, then an outward mitre offset by the
+    same distance, which restores everything the first step cut away. The mitre limit caps how
+    far the offset moves a corner at MITRE_LIMIT times the step, so with a step of
+    tolerance / (1 + MITRE_LIMIT) every point of an outline lies within tolerance of the
+    original and every point of the original lies inside the outline. Holes closed by the
+    offset are filled. Parts packed by their outlines never overlap and keep at most twice the
+    tolerance of extra clearance to each other.
+
+    Outlines are cached per shape, so translated copies are simplified once. Shapes whose
+    outline would not be smaller, or that are not valid polygons, are kept unchanged.
+
+    ### Parameters:
+    - tolerance: Largest distance between an outline and the original part.
+
+    ### Attributes:
+    - outlines: Simplified outlines moved to offset (0, 0) keyed by fingerprint of the original shape, None for shapes kept unchanged.
+    - vertices_before, vertices_after: Vertex counts of all distinct shapes simplified so far.
+
+    ### Examples:
+    >>> simplifier = PolySimplifier(0.05)
+    >>> order = simplifier.simplify_order(PolyReader.read_part_order_from_csv('parts.csv'))
+    >>> simplifier.report()['reduction']
+    0.82
+    """
+
+    MITRE_LIMIT: float = 1.1  # low limit leaves most of the tolerance to the simplification, sharper corners are bevelled
+
+    def __init__(self, tolerance: float):
+        if tolerance <= 0:
+            raise ValueError(f"Tolerance must be positive, got {tolerance}")
+        self.tolerance = tolerance
+        self.outlines: Dict[bytes, Union[None, np.ndarray]] = {}
+        self.vertices_before: int = 0
+        self.vertices_after: int = 0
+
+    def simplify(self, poly: polyAsList) -> np.ndarray:
+        """
+        Returns outline of polygon at its position as a counterclockwise (n, 2) array.
+        """
+        fingerprint, offset = PolyFunc.get_fingerprint(poly)
+        coords = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        if fingerprint not in self.outlines:
+            outline = self.get_outline(coords - offset, self.tolerance)
+            self.outlines[fingerprint] = outline
+            self.vertices_before += len(coords)
+            self.vertices_after += len(coords) if outline is None else len(outline)
+            Instrumentation.count('simplifier.vertices_removed', 0 if outline is None else len(coords) - len(outline))
+
+        outline = self.outlines[fingerprint]
+        # unchanged shapes are returned as given, shifting them back and forth could move vertices by float noise
+        return np.array(PolyFunc.to_ccw(coords)) if outline is None else outline + offset
+
+    def simplify_all(self, polygons: Union[List[polyAsList], PolyStore]) -> List[np.ndarray]:
+        """
+        Returns outlines of all polygons.
+        """
+        return [self.simplify(poly) for poly in polygons]
+
+    def simplify_order(self, order: PartOrder) -> PartOrder:
+        """
+        Returns order with every shape replaced by its outline, quantities and allowed rotations unchanged.
+        """
+        return PartOrder(self.simplify_all(order.shapes), order.piece_shapes, order.rotations)
+
+    def report(self) -> dict:
+        """
+        Returns vertex counts before and after simplification and the fraction of vertices removed.
+        """
+        return {
+            'tolerance': self.tolerance,
+            'shapes': len(self.outlines),
+            'vertices_before': self.vertices_before,
+            'vertices_after': self.vertices_after,
+            'reduction': 1 - self.vertices_after / self.vertices_before if self.vertices_before else 0.0,
+        }
+
+    @staticmethod
+    def get_outline(coords: np.ndarray, tolerance: float) -> Union[None, np.ndarray]:
+        """
+        Returns counterclockwise outline containing the polygon within tolerance of it, None if there is no smaller one.
+
+        Parameters:
+        - coords: (n, 2) array of polygon vertices.
+        - tolerance: Largest distance between outline and polygon.
+        """
+        original = shapely.Polygon(coords)
+        if not original.is_valid:
+            return None
+
+        step = tolerance / (1 + PolySimplifier.MITRE_LIMIT)
+        grown = original.simplify(step, preserve_topology=True).buffer(step, join_style='mitre', mitre_limit=PolySimplifier.MITRE_LIMIT)
+        outline = shapely.Polygon(grown.exterior)
+
+        # containment holds by construction, checked so float noise can never let an outline cut into a part
+        if len(outline.exterior.coords) - 1 >= len(coords) or not outline.covers(original):
+            return None
+        return np.asarray(PolyFunc.to_ccw(shapely.get_coordinates(outline.exterior)[:-1]), dtype=np.float64)
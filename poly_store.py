@@ -0,0 +1,139 @@
+import numpy as np
+
+from typing import Iterable, Iterator
+from custom_types import polyAsList
+
+class PolyStore:
+    """
+    Compact collection of polygons backed by one contiguous float64 coordinate buffer.
+
+    Polygon i spans coords[offsets[i]:offsets[i + 1]]; indexing returns a view into the
+    buffer rather than a copy. Bounds, areas and centroids are computed for all polygons
+    at once on first access and cached.
+
+    ### Parameters:
+    - coords: (N, 2) array with vertices of all polygons back to back.
+    - offsets: (n + 1) integer array of polygon start positions, ending with N.
+
+    ### Attributes:
+    - bounds: (n, 4) array of (min x, min y, max x, max y) per polygon.
+    - areas: (n,) array of polygon areas.
+    - centroids: (n, 2) array of polygon centroids.
+
+    ### Examples:
+    >>> store = PolyStore.from_polygons([[[0, 0], [2, 0], [2, 2], [0, 2]]])
+    >>> store.areas[0]
+    4.0
+    """
+    __slots__ = ('coords', 'offsets', '_bounds', '_areas', '_centroids')
+
+    def __init__(self, coords: np.ndarray, offsets: np.ndarray):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._bounds = None
+        self._areas = None
+        self._centroids = None
+
+    @staticmethod
+    def from_polygons(polygons: Iterable[polyAsList]) -> 'PolyStore':
+        """
+        Packs polygons in list format (or another PolyStore) into a new store.
+        """
+        if isinstance(polygons, PolyStore):
+            return polygons
+        polygons = [np.asarray(poly, dtype=np.float64).reshape(-1, 2) for poly in polygons]
+        offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(poly) for poly in polygons])
+        coords = np.concatenate(polygons) if polygons else np.empty((0, 2))
+        return PolyStore(coords, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Polygon index {i} out of range")
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(len(self)):
+            yield self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getstate__(self):
+        return self.coords, self.offsets
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def append(self, polygons: Iterable[polyAsList]):
+        """
+        Appends polygons in list format (or another PolyStore) in place.
+
+        Bounds, areas and centroids already computed are extended with those of the new
+        polygons rather than recomputed. Views returned before stay valid.
+        """
+        added = PolyStore.from_polygons(polygons)
+        if len(added) == 0:
+            return
+        self.coords = np.concatenate((self.coords, added.coords))
+        self.offsets = np.concatenate((self.offsets, added.offsets[1:] + self.offsets[-1]))
+        if self._bounds is not None:
+            self._bounds = np.concatenate((self._bounds, added.bounds))
+        if self._areas is not None:
+            self._areas = np.concatenate((self._areas, added.areas))
+            self._centroids = np.concatenate((self._centroids, added.centroids))
+
+    def sizes(self) -> np.ndarray:
+        """
+        Returns number of vertices of every polygon.
+        """
+        return np.diff(self.offsets)
+
+    @property
+    def bounds(self) -> np.ndarray:
+        if self._bounds is None:
+            if len(self) == 0:
+                return np.empty((0, 4))
+            starts = self.offsets[:-1]
+            self._bounds = np.column_stack((np.minimum.reduceat(self.coords[:, 0], starts),
+                                            np.minimum.reduceat(self.coords[:, 1], starts),
+                                            np.maximum.reduceat(self.coords[:, 0], starts),
+                                            np.maximum.reduceat(self.coords[:, 1], starts)))
+        return self._bounds
+
+    @property
+    def areas(self) -> np.ndarray:
+        if self._areas is None:
+            self._compute_area_centroid()
+        return self._areas
+
+    @property
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            self._compute_area_centroid()
+        return self._centroids
+
+    def _compute_area_centroid(self):
+        """
+        Shoelace area and centroid of all polygons in one pass over the buffer.
+        """
+        if len(self) == 0:
+            self._areas, self._centroids = np.empty(0), np.empty((0, 2))
+            return
+        starts = self.offsets[:-1]
+        next_idx = np.arange(1, len(self.coords) + 1)
+        next_idx[self.offsets[1:] - 1] = starts
+
+        x, y = self.coords[:, 0], self.coords[:, 1]
+        x_next, y_next = x[next_idx], y[next_idx]
+        cross = x * y_next - x_next * y
+
+        signed_area = np.add.reduceat(cross, starts) / 2
+        safe_area = np.where(signed_area == 0, 1.0, signed_area)
+        cx = np.add.reduceat((x + x_next) * cross, starts) / (6 * safe_area)
+        cy = np.add.reduceat((y + y_next) * cross, starts) / (6 * safe_area)
+
+        self._areas = np.abs(signed_area)
+        self._centroids = np.column_stack((cx, cy))
@@ -1,19 +1,37 @@
 import os
 import csv
-import ast
+import numpy as np
 
-from typing import List
+from typing import List, Iterator, Tuple
 from custom_types import polyAsList
+from poly_store import PolyStore
+from part_order import PartOrder
 
 class PolyReader:
     """
-    Functional class for reading polygons from CSV files.
+    Functional class for reading polygons from CSV files and binary part libraries.
 
-    ### CSV data format: 
+    ### CSV data format:
     "[[x1, y1], [x2, y2], [x3, y3]]" // p1 \n
     "[[x1, y1], [x2, y2], [x3, y3], ... ,[xN, yN]]" // p2 \n
+
+    ### CSV order format:
+    Polygon optionally followed by quantity and allowed rotations in degrees, missing fields default
+    to 1 and to the rotations passed to the reader \n
+    "[[x1, y1], [x2, y2], [x3, y3]]",12,"[0, 90, 180, 270]" // 12 pieces of p1 \n
+    "[[x1, y1], [x2, y2], [x3, y3], ... ,[xN, yN]]",3 // 3 pieces of p2 \n
+
+    ### Binary part library format (.plib, little endian):
+    - 8 byte magic b'PLIB0001'
+    - uint64 number of polygons n, uint64 number of vertices N
+    - float64 coordinates, N rows of (x, y)
+    - int64 offsets, n + 1 values, polygon i spans rows offsets[i] to offsets[i + 1]
     """
 
+    BINARY_MAGIC: bytes = b'PLIB0001'
+    _HEADER_SIZE: int = 24
+    _STRIP_TABLE = str.maketrans('', '', '[]"')
+
     @staticmethod
     def read_polygons_from_csv(filepath: str) -> List[polyAsList]:
         """
@@ -29,30 +47,194 @@ class PolyReader:
         - FileNotFoundError if filepath is invalid.
         - ValueError if file is of wrong type.
         """
+        return [poly.tolist() for poly in PolyReader.iter_polygons_from_csv(filepath)]
+
+    @staticmethod
+    def iter_polygons_from_csv(filepath: str) -> Iterator[np.ndarray]:
+        """
+        Lazily reads CSV file containing a list of polygons, one row at a time.
+
+        Only the polygon field of each row is read, so files in the CSV order format give their polygons.
+
+        Parameters:
+        - filepath: path of CSV file.
+
+        Returns:
+        Iterator over polygons stored as (n, 2) float arrays.
+
+        Raises:
+        - FileNotFoundError if filepath is invalid.
+        - ValueError if file is of wrong type or a row is malformed.
+        """
+        PolyReader._check_file(filepath, '.csv')
+
+        with open(filepath, newline='') as csvfile:
+            for fields in csv.reader(csvfile):
+                if fields and fields[0].strip():
+                    yield PolyReader._parse_poly_string(fields[0])
+
+    @staticmethod
+    def read_part_order_from_csv(filepath: str, allowed_rotations: List[float] = None) -> PartOrder:
+        """
+        Reads CSV file of polygons with optional quantity and rotation fields into a PartOrder.
+
+        Repeated and translated copies of a shape are merged into one shape, rows of the plain
+        CSV data format are read as single pieces.
+
+        Parameters:
+        - filepath: path of CSV file.
+        - allowed_rotations: rotations of rows without a rotation field, unrotated placement only if None.
+
+        Returns:
+        PartOrder holding every distinct shape once.
+
+        Raises:
+        - FileNotFoundError if filepath is invalid.
+        - ValueError if file is of wrong type or a row is malformed.
+        """
+        PolyReader._check_file(filepath, '.csv')
+
+        with open(filepath, newline='') as csvfile:
+            rows = (PolyReader._parse_order_row(fields, allowed_rotations) for fields in csv.reader(csvfile) if fields and fields[0].strip())
+            return PartOrder.from_items(rows)
+
+    @staticmethod
+    def read_poly_store_from_csv(filepath: str) -> PolyStore:
+        """
+        Reads CSV file containing a list of polygons into a compact PolyStore.
+
+        Parameters:
+        - filepath: path of CSV file.
+
+        Returns:
+        PolyStore holding all polygons of the file.
+
+        Raises:
+        - FileNotFoundError if filepath is invalid.
+        - ValueError if file is of wrong type.
+        """
+        return PolyStore.from_polygons(PolyReader.iter_polygons_from_csv(filepath))
+
+    @staticmethod
+    def read_poly_store_from_binary(filepath: str, mmap: bool = True) -> PolyStore:
+        """
+        Loads binary part library without parsing.
+
+        Parameters:
+        - filepath: path of .plib file.
+        - mmap: True to memory-map the coordinates instead of reading them into memory.
+
+        Returns:
+        PolyStore backed by the file contents.
+
+        Raises:
+        - FileNotFoundError if filepath is invalid.
+        - ValueError if file is of wrong type or corrupt.
+        """
+        PolyReader._check_file(filepath, '.plib')
+
+        with open(filepath, 'rb') as f:
+            header = f.read(PolyReader._HEADER_SIZE)
+        if header[:8] != PolyReader.BINARY_MAGIC:
+            raise ValueError(f"Invalid part library header in {filepath}")
+        n_polys, n_coords = np.frombuffer(header[8:], dtype='<u8')
+        n_polys, n_coords = int(n_polys), int(n_coords)
+
+        coords_size = n_coords * 2 * 8
+        if os.path.getsize(filepath) != PolyReader._HEADER_SIZE + coords_size + (n_polys + 1) * 8:
+            raise ValueError(f"Truncated part library {filepath}")
+
+        if mmap:
+            coords = np.memmap(filepath, dtype='<f8', mode='r', offset=PolyReader._HEADER_SIZE, shape=(n_coords, 2))
+            offsets = np.memmap(filepath, dtype='<i8', mode='r', offset=PolyReader._HEADER_SIZE + coords_size, shape=(n_polys + 1,))
+        else:
+            data = np.fromfile(filepath, dtype=np.uint8)
+            coords = data[PolyReader._HEADER_SIZE:PolyReader._HEADER_SIZE + coords_size].view('<f8').reshape(n_coords, 2)
+            offsets = data[PolyReader._HEADER_SIZE + coords_size:].view('<i8')
+        return PolyStore(coords, offsets)
+
+    @staticmethod
+    def write_binary(polygons: Iterator[polyAsList], filepath: str) -> int:
+        """
+        Writes polygons to a binary part library, streaming coordinates to disk.
+
+        Parameters:
+        - polygons: iterable of polygons in list or array format, or a PolyStore.
+        - filepath: path of .plib file to create.
+
+        Returns:
+        Number of polygons written.
+        """
+        offsets = [0]
+        with open(filepath, 'wb') as f:
+            f.write(bytes(PolyReader._HEADER_SIZE))
+            for poly in polygons:
+                coords = np.asarray(poly, dtype='<f8').reshape(-1, 2)
+                f.write(coords.tobytes())
+                offsets.append(offsets[-1] + len(coords))
+            f.write(np.asarray(offsets, dtype='<i8').tobytes())
+
+            f.seek(0)
+            f.write(PolyReader.BINARY_MAGIC)
+            f.write(np.asarray([len(offsets) - 1, offsets[-1]], dtype='<u8').tobytes())
+        return len(offsets) - 1
+
+    @staticmethod
+    def convert_csv_to_binary(csv_filepath: str, binary_filepath: str) -> int:
+        """
+        One-time conversion of a CSV polygon file to a binary part library.
+
+        Parameters:
+        - csv_filepath: path of CSV file.
+        - binary_filepath: path of .plib file to create.
+
+        Returns:
+        Number of polygons converted.
+        """
+        return PolyReader.write_binary(PolyReader.iter_polygons_from_csv(csv_filepath), binary_filepath)
+
+    @staticmethod
+    def _check_file(filepath: str, extension: str):
+        """
+        Raises FileNotFoundError if filepath does not exist and ValueError if it has the wrong extension.
+        """
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Invalid file path {filepath}")
-        if os.path.splitext(filepath)[1] != '.csv':
+        if os.path.splitext(filepath)[1] != extension:
             raise ValueError(f"Invalid file type for {filepath}")
 
-        polygons = []
+    @staticmethod
+    def _parse_order_row(fields: List[str], allowed_rotations: List[float]) -> Tuple[np.ndarray, int, List[float]]:
+        """
+        Parses fields of a row of the CSV order format into a (polygon, quantity, allowed rotations) item.
 
-        with open(filepath, newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                polygons.append(PolyReader._eval_poly_string(row[0]))  
-        
-        return polygons
+        Raises:
+        - ValueError if the quantity is not a positive integer or a field is malformed.
+        """
+        poly = PolyReader._parse_poly_string(fields[0])
+        quantity = int(fields[1]) if len(fields) > 1 and fields[1].strip() else 1
+        if quantity < 1:
+            raise ValueError(f"Invalid quantity {quantity} in {','.join(fields)}")
+        rotations = allowed_rotations
+        if len(fields) > 2 and fields[2].strip():
+            rotations = np.array(fields[2].translate(PolyReader._STRIP_TABLE).split(','), dtype=np.float64).tolist()
+        return poly, quantity, rotations
 
     @staticmethod
-    def _eval_poly_string(poly_str: str) -> polyAsList:
+    def _parse_poly_string(poly_str: str) -> np.ndarray:
         """
-        Evaluates list stored as a string.
+        Parses polygon stored as a string without evaluating it.
 
         Parameters:
         - poly_str: polygon as a list stored in string form.
 
         Returns:
-        Polygon stored in list form.
+        Polygon stored as (n, 2) float array.
+
+        Raises:
+        - ValueError if string does not hold an even number of coordinates.
         """
-        return ast.literal_eval(poly_str)
-    
\ No newline at end of file
+        values = np.array(poly_str.translate(PolyReader._STRIP_TABLE).split(','), dtype=np.float64)
+        if len(values) % 2:
+            raise ValueError(f"Odd number of coordinates in {poly_str.strip()}")
+        return values.reshape(-1, 2)
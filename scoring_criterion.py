@@ -0,0 +1,14 @@
+import enum
+
+class ScoringCriterion(enum.Enum):
+    """
+    Enum for criteria choosing among feasible placement points:
+    border_overflow = 0 (rightmost point keeping the part inside the current borders, else least overflow),
+    bounding_length = 1 (shortest bounding box of the layout along x),
+    gravity_center = 2 (lowest centroid of the placed part),
+    border_overlap = 3 (least bounding box area of the part outside the current borders)
+    """
+    border_overflow = 0
+    bounding_length = 1
+    gravity_center = 2
+    border_overlap = 3
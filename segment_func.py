@@ -0,0 +1,206 @@
+import numpy as np
+
+from typing import Tuple
+
+class SegmentFunc:
+
+    """
+    Functional class for vectorized operations on line segments stored as coordinate arrays.
+    """
+
+    TOLERANCE: float = 1e-6
+    DENSE_PAIRS: int = 256  # up to this many segment pairs all are tested without a broadphase
+
+    @staticmethod
+    def get_edges(poly) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns start and end points of all edges of a closed polygon.
+
+        Parameters:
+        - poly: Polygon as list of points or (n, 2) array.
+
+        Returns:
+        Tuple of two (n, 2) float arrays, edge i running from starts[i] to ends[i].
+        """
+        starts = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        ends = np.roll(starts, -1, axis=0)
+        return starts, ends
+
+    @staticmethod
+    def get_intersections(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray, tolerance: float = TOLERANCE) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes intersections between every segment of the first set and every segment of the second set.
+
+        Large sets are first reduced to pairs with overlapping bounding boxes by get_candidate_pairs,
+        only those are tested exactly. Collinear overlapping segments are reported once, at the first
+        point of the overlap along the first segment.
+
+        Parameters:
+        - starts1, ends1: (n, 2) arrays describing the first set of segments.
+        - starts2, ends2: (m, 2) arrays describing the second set of segments.
+        - tolerance: distance under which points are considered coincident.
+
+        Returns:
+        Tuple of (idx1, idx2, pts, t) where idx1 and idx2 index the intersecting segment pairs (sorted by idx1, then idx2),
+        pts is a (k, 2) array of intersection points and t the position of each point along its first segment (0 to 1).
+        """
+        if len(starts1) * len(starts2) <= SegmentFunc.DENSE_PAIRS:
+            idx1, idx2 = np.divmod(np.arange(len(starts1) * len(starts2)), len(starts2))
+        else:
+            idx1, idx2 = SegmentFunc.get_candidate_pairs(starts1, ends1, starts2, ends2, tolerance)
+
+        hit, t, proper = SegmentFunc._intersect_pairs(starts1[idx1], ends1[idx1], starts2[idx2], ends2[idx2], tolerance)
+        idx1, idx2, t, proper = idx1[hit], idx2[hit], t[hit], proper[hit]
+
+        # the crossing point of nearly parallel segments drifts far from an endpoint that touches
+        # the other segment, so proper intersections are snapped to such endpoints
+        if np.any(proper):
+            t[proper] = SegmentFunc._snap_to_endpoints(starts1[idx1[proper]], ends1[idx1[proper]], starts2[idx2[proper]], ends2[idx2[proper]], t[proper], tolerance)
+
+        pts = starts1[idx1] + t[:, None] * (ends1[idx1] - starts1[idx1])
+        return idx1, idx2, pts, t
+
+    @staticmethod
+    def get_candidate_pairs(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray, tolerance: float = TOLERANCE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sweep and prune broadphase: finds all segment pairs whose bounding boxes (grown by tolerance) overlap.
+
+        Two x intervals overlap exactly when one of them starts inside the other, so both
+        directions are found with binary searches over interval starts sorted along x, then
+        pairs are pruned by y. Runs in O((n + m) log(n + m) + k) for k pairs overlapping along x.
+
+        Returns:
+        Tuple of (idx1, idx2) index arrays, sorted by idx1, then idx2.
+        """
+        min1 = np.minimum(starts1, ends1) - tolerance
+        max1 = np.maximum(starts1, ends1) + tolerance
+        min2 = np.minimum(starts2, ends2)
+        max2 = np.maximum(starts2, ends2)
+
+        a1, a2 = SegmentFunc._starts_within(min1[:, 0], max1[:, 0], min2[:, 0], strict=False)
+        b2, b1 = SegmentFunc._starts_within(min2[:, 0], max2[:, 0], min1[:, 0], strict=True)
+        idx1 = np.concatenate((a1, b1))
+        idx2 = np.concatenate((a2, b2))
+
+        keep = (min2[idx2, 1] <= max1[idx1, 1]) & (max2[idx2, 1] >= min1[idx1, 1])
+        idx1, idx2 = idx1[keep], idx2[keep]
+        order = np.lexsort((idx2, idx1))
+        return idx1[order], idx2[order]
+
+    @staticmethod
+    def _starts_within(lows: np.ndarray, highs: np.ndarray, other_lows: np.ndarray, strict: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns all (i, j) with other_lows[j] inside [lows[i], highs[i]], or (lows[i], highs[i]] if strict.
+        """
+        order = np.argsort(other_lows, kind='stable')
+        sorted_lows = other_lows[order]
+        first = np.searchsorted(sorted_lows, lows, 'right' if strict else 'left')
+        counts = np.maximum(np.searchsorted(sorted_lows, highs, 'right') - first, 0)
+
+        i = np.repeat(np.arange(len(lows)), counts)
+        # position of each pair in the sorted array: first[i] plus its rank within the run of i
+        pos = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - first, counts)
+        return i, order[pos]
+
+    @staticmethod
+    def _intersect_pairs(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray, tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Elementwise intersection test of aligned segment pairs.
+
+        Returns:
+        Tuple of hit flags, position of the intersection along the first segment (0 to 1)
+        and flags marking non-parallel (proper) intersections.
+        """
+        d1 = ends1 - starts1
+        d2 = ends2 - starts2
+        r = starts2 - starts1
+
+        denom = SegmentFunc._cross(d1, d2)
+        r_cross_d1 = SegmentFunc._cross(r, d1)
+        r_cross_d2 = SegmentFunc._cross(r, d2)
+
+        len1 = np.hypot(d1[:, 0], d1[:, 1])
+        len2 = np.hypot(d2[:, 0], d2[:, 1])
+        safe_len1 = np.where(len1 > 0, len1, 1.0)
+        safe_len2 = np.where(len2 > 0, len2, 1.0)
+
+        # sin of the angle between the segments scaled by both lengths; parallel when it vanishes
+        parallel = np.abs(denom) <= tolerance * safe_len1 * safe_len2
+        safe_denom = np.where(parallel, 1.0, denom)
+
+        t = r_cross_d2 / safe_denom
+        u = r_cross_d1 / safe_denom
+        t_tol = tolerance / safe_len1
+        u_tol = tolerance / safe_len2
+        proper = ~parallel & (t >= -t_tol) & (t <= 1 + t_tol) & (u >= -u_tol) & (u <= 1 + u_tol)
+
+        # parallel segments only meet when collinear, i.e. start of segment 2 lies on the line of segment 1
+        collinear = parallel & (np.abs(r_cross_d1) <= tolerance * safe_len1)
+        sq_len1 = safe_len1 ** 2
+        t0 = np.einsum('ij,ij->i', r, d1) / sq_len1
+        t1 = np.einsum('ij,ij->i', r + d2, d1) / sq_len1
+        overlap_start = np.maximum(np.minimum(t0, t1), 0.0)
+        overlap_end = np.minimum(np.maximum(t0, t1), 1.0)
+        collinear &= overlap_start <= overlap_end + t_tol
+
+        t = np.where(collinear, np.minimum(overlap_start, 1.0), np.clip(t, 0.0, 1.0))
+        degenerate = (len1 <= tolerance) | (len2 <= tolerance)
+        return (proper | collinear) & ~degenerate, t, proper
+
+    @staticmethod
+    def _snap_to_endpoints(starts1: np.ndarray, ends1: np.ndarray, starts2: np.ndarray, ends2: np.ndarray, t: np.ndarray, tolerance: float) -> np.ndarray:
+        """
+        Moves intersections of segment pairs to the first endpoint along segment 1 that lies on the other segment.
+
+        Returns:
+        Position of each intersection along its first segment (0 to 1).
+        """
+        # all four endpoint to segment distances in one batch
+        dist, pos = SegmentFunc.point_segment_distance(np.concatenate((starts1, starts2, ends2, ends1)),
+                                                       np.concatenate((starts2, starts1, starts1, starts2)),
+                                                       np.concatenate((ends2, ends1, ends1, ends2)))
+        dist_start1, dist_start2, dist_end2, dist_end1 = np.split(dist, 4)
+        _, t_start2, t_end2, _ = np.split(pos, 4)
+
+        t_other = np.minimum(np.where(dist_start2 < tolerance, t_start2, np.inf), np.where(dist_end2 < tolerance, t_end2, np.inf))
+        snapped = np.where(dist_end1 < tolerance, 1.0, t)
+        snapped = np.where(np.isfinite(t_other), t_other, snapped)
+        return np.where(dist_start1 < tolerance, 0.0, snapped)
+
+    @staticmethod
+    def point_segment_distance(pts: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Elementwise distance of points to segments.
+
+        Parameters:
+        - pts: (k, 2) array of points.
+        - starts, ends: (k, 2) arrays describing the segments.
+
+        Returns:
+        Tuple of distances and position of the closest point along each segment (0 to 1).
+        """
+        d = ends - starts
+        sq_len = np.einsum('ij,ij->i', d, d)
+        t = np.clip(np.einsum('ij,ij->i', pts - starts, d) / np.where(sq_len > 0, sq_len, 1.0), 0.0, 1.0)
+        closest = starts + t[:, None] * d
+        return np.hypot(*(pts - closest).T), t
+
+    @staticmethod
+    def almost_equal(pts1: np.ndarray, pts2: np.ndarray, tolerance: float = TOLERANCE) -> np.ndarray:
+        """
+        Elementwise check whether pairs of points are within a certain threshold on both axes.
+
+        Parameters:
+        - pts1, pts2: (k, 2) arrays of points.
+
+        Returns:
+        Boolean array of length k.
+        """
+        return np.all(np.abs(pts1 - pts2) < tolerance, axis=-1)
+
+    @staticmethod
+    def _cross(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+        """
+        z component of the cross product of broadcastable arrays of 2D vectors.
+        """
+        return v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import shapely
+
+from benchmark import Benchmark
+from nfp import NFP
+from nfp_assistant import NFPAssistant
+from nfp_method import NFPMethod
+from poly_func import PolyFunc
+
+BLAZ = NFPAssistant.delete_redundancy(Benchmark.get_dataset('blaz', None))
+
+def assert_same_nfp(nfp: shapely.Polygon, expected: shapely.Polygon):
+    assert nfp.symmetric_difference(expected).area <= 1e-9 * expected.area
+
+@pytest.mark.parametrize('rotation', [0, 90])
+def test_minkowski_matches_orbital_on_blaz(rotation):
+    for stationary in BLAZ:
+        for sliding in BLAZ:
+            sliding = PolyFunc.rotate_poly(sliding, rotation)
+            expected = shapely.Polygon(NFP.get_nfp(stationary, sliding, NFPMethod.orbital))
+            assert_same_nfp(shapely.Polygon(NFP.get_nfp(stationary, sliding, NFPMethod.minkowski)), expected)
+
+def test_minkowski_of_squares():
+    nfp = np.array(NFP.get_nfp([[0, 0], [2, 0], [2, 2], [0, 2]], [[0, 0], [1, 0], [1, 1], [0, 1]], NFPMethod.minkowski))
+    assert_same_nfp(shapely.Polygon(nfp), shapely.box(-1, 0, 2, 3))
+
+@pytest.mark.parametrize('rotation', [0, 90])
+@pytest.mark.parametrize('resolution', [1e-6, 1e-3])
+def test_orbital_fixed_matches_orbital_on_blaz(rotation, resolution):
+    for stationary in BLAZ:
+        for sliding in BLAZ:
+            sliding = PolyFunc.rotate_poly(sliding, rotation)
+            expected = shapely.Polygon(NFP.get_nfp(stationary, sliding, NFPMethod.orbital))
+            assert_same_nfp(shapely.Polygon(NFP.get_nfp(stationary, sliding, NFPMethod.orbital_fixed, resolution)), expected)
+
+@pytest.mark.parametrize('resolution', [1e-6, 1e-3])
+def test_orbital_fixed_far_from_origin(resolution):
+    # snapping absolute coordinates to a 1e-6 grid overflows int64 cross products beyond about 1073
+    stationary = [[1100, 2000], [1102, 2000], [1102, 2002], [1100, 2002]]
+    nfp = NFP.get_nfp(stationary, [[0, 0], [1, 0], [1, 1], [0, 1]], NFPMethod.orbital_fixed, resolution)
+    assert_same_nfp(shapely.Polygon(nfp), shapely.box(1099, 2000, 1102, 2003))
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import shapely
+
+from benchmark import Benchmark
+from nfp import NFP
+from nfp_assistant import NFPAssistant
+from nfp_method import NFPMethod
+from poly_func import PolyFunc
+from instrumentation import Instrumentation
+
+BLAZ = NFPAssistant.delete_redundancy(Benchmark.get_dataset('blaz', None))
+ROTATIONS = [0, 90, 180, 270]
+
+def assert_same_nfp(nfp: np.ndarray, expected: np.ndarray):
+    nfp, expected = shapely.Polygon(nfp), shapely.Polygon(expected)
+    assert nfp.symmetric_difference(expected).area <= 1e-9 * expected.area
+
+@pytest.mark.parametrize('nfp_method', [NFPMethod.orbital, NFPMethod.minkowski])
+def test_rotated_nfps_match_direct(nfp_method):
+    assistant = NFPAssistant(BLAZ, allowed_rotations=ROTATIONS, nfp_method=nfp_method)
+    rng = np.random.default_rng(0)
+    # rotated copies at other positions, each pair is derived from the NFP stored for its relative rotation
+    reports = []
+    with Instrumentation.record(callback=reports.append):
+        for stationary in BLAZ:
+            for sliding in BLAZ:
+                for rotation1 in ROTATIONS:
+                    for rotation2 in ROTATIONS:
+                        poly1 = (np.asarray(PolyFunc.rotate_poly(stationary, rotation1)) + rng.uniform(-50, 50, 2)).tolist()
+                        poly2 = (np.asarray(PolyFunc.rotate_poly(sliding, rotation2)) + rng.uniform(-50, 50, 2)).tolist()
+                        assert_same_nfp(assistant.get_direct_nfp(poly1, poly2), NFP.get_nfp(poly1, poly2, nfp_method))
+
+    # at most one NFP is computed per relative rotation, not one per pair of absolute rotations
+    assert reports[0]['counters']['nfp_assistant.misses'] <= len(BLAZ) ** 2 * len(ROTATIONS)
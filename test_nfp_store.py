@@ -0,0 +1,55 @@
+import numpy as np
+
+from benchmark import Benchmark
+from nfp_assistant import NFPAssistant
+from nfp_store import NFPStore
+
+ENTRY_BYTES = 10 * 2 * 8 + NFPStore.ENTRY_OVERHEAD  # one 10-vertex NFP
+
+def make_nfp(k: int) -> np.ndarray:
+    return np.full((10, 2), float(k))
+
+def test_eviction_is_least_recently_used():
+    store = NFPStore(max_bytes=3 * ENTRY_BYTES)
+    for k in range(3):
+        store.put(k, make_nfp(k))
+    assert store.get(0) is not None  # 1 is now the least recently used entry
+
+    store.put(3, make_nfp(3))
+    assert 1 not in store
+    assert [k in store for k in (0, 2, 3)] == [True, True, True]
+    assert store.evictions == 1
+    assert store.nbytes == 3 * ENTRY_BYTES <= store.max_bytes
+
+    # replacing an entry does not count it twice
+    store.put(3, make_nfp(4))
+    assert store.nbytes == 3 * ENTRY_BYTES
+    assert store.get(3)[0, 0] == 4.0
+
+def test_new_entry_is_never_evicted():
+    store = NFPStore(max_bytes=ENTRY_BYTES // 2)
+    store.put('a', make_nfp(0))
+    store.put('b', (make_nfp(1), [make_nfp(2)], 1.5))
+    assert len(store) == 1
+    assert 'b' in store
+    assert store.nbytes == 2 * 10 * 2 * 8 + NFPStore.ENTRY_OVERHEAD
+
+def test_unbounded_store_keeps_everything():
+    store = NFPStore()
+    for k in range(100):
+        store.put(k, make_nfp(k))
+    assert len(store) == 100
+    assert store.evictions == 0
+    assert store.nbytes == 100 * ENTRY_BYTES
+
+def test_evicted_nfps_are_recomputed_identically():
+    polygons = Benchmark.get_dataset('blaz', None)
+    unbounded = NFPAssistant(polygons)
+    bounded = NFPAssistant(polygons, max_nfp_bytes=4 * ENTRY_BYTES)
+    for _ in range(2):
+        for poly1 in polygons:
+            for poly2 in polygons:
+                assert np.array_equal(bounded.get_direct_nfp(poly1, poly2), unbounded.get_direct_nfp(poly1, poly2))
+
+    assert bounded.nfps.evictions > 0
+    assert bounded.nfps.nbytes <= 4 * ENTRY_BYTES or len(bounded.nfps) == 1
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import shapely
+
+from packing_tools import GeoFunc
+
+SQUARE = np.array([[0.0, 0.0], [2.0, 0.0], [4.0, 0.0], [4.0, 4.0], [0.0, 4.0]])  # collinear vertex, batched polygons share a vertex count
+NOTCH = np.array([[0.0, 0.0], [4.0, 0.0], [4.0, 4.0], [2.0, 1.0], [0.0, 4.0]])
+
+def grid_points():
+    # integer and half-integer points hit vertices, edges and the notch exactly
+    x, y = np.meshgrid(np.arange(-1.0, 5.5, 0.5), np.arange(-1.0, 5.5, 0.5))
+    return np.column_stack((x.ravel(), y.ravel()))
+
+@pytest.mark.parametrize('resolution', [None, 1e-6])
+def test_points_in_polygons_match_shapely_covers(resolution):
+    pts = np.concatenate((grid_points(), np.random.default_rng(0).uniform(-1, 5, (200, 2))))
+    polys = np.stack((SQUARE, NOTCH[::-1]))  # either orientation
+    inside = GeoFunc.points_in_polygons(pts, polys, resolution=resolution)
+
+    expected = shapely.covers(shapely.polygons(polys)[None, :], shapely.points(pts)[:, None])
+    assert np.array_equal(inside, expected)
+    assert np.array_equal(GeoFunc.points_in_polygons(pts, NOTCH, resolution=resolution), expected[:, 1])
+
+@pytest.mark.parametrize('resolution', [None, 1e-6])
+def test_points_on_segments_match_shapely(resolution):
+    pts = grid_points()
+    starts, ends = NOTCH, np.roll(NOTCH, -1, axis=0)
+    on_segment = GeoFunc.points_on_segments(pts, starts, ends, resolution=resolution)
+
+    lines = shapely.linestrings(np.stack((starts, ends), axis=1))
+    assert np.array_equal(on_segment, shapely.intersects(shapely.points(pts)[:, None], lines[None, :]))
+
+@pytest.mark.parametrize('resolution', [None, 1e-6])
+def test_segments_intersect_match_shapely(resolution):
+    rng = np.random.default_rng(1)
+    # rounded coordinates give touching endpoints and collinear overlaps
+    starts1, starts2 = np.round(rng.uniform(0, 10, (40, 2))), np.round(rng.uniform(0, 10, (30, 2)))
+    ends1, ends2 = starts1 + np.round(rng.uniform(-3, 3, (40, 2))), starts2 + np.round(rng.uniform(-3, 3, (30, 2)))
+    idx1, idx2 = GeoFunc.segments_intersect(starts1, ends1, starts2, ends2, resolution=resolution)
+
+    lines1 = shapely.linestrings(np.stack((starts1, ends1), axis=1))
+    lines2 = shapely.linestrings(np.stack((starts2, ends2), axis=1))
+    expected1, expected2 = np.nonzero(shapely.intersects(lines1[:, None], lines2[None, :]))
+    assert np.array_equal(idx1, expected1)
+    assert np.array_equal(idx2, expected2)
@@ -0,0 +1,22 @@
+import numpy as np
+
+from reader import PolyReader
+
+ORDER_CSV = '"[[0, 0], [1, 0], [1, 1]]",3,"[0, 90, 180]"\n"[[0, 0], [4, 0], [4, 2], [0, 2]]",1\n"[[0, 0], [2, 0], [2, 2]]"\n'
+
+def test_polygons_from_order_csv(tmp_path):
+    path = tmp_path / 'order.csv'
+    path.write_text(ORDER_CSV)
+
+    polygons = PolyReader.read_polygons_from_csv(str(path))
+    assert polygons == [[[0, 0], [1, 0], [1, 1]], [[0, 0], [4, 0], [4, 2], [0, 2]], [[0, 0], [2, 0], [2, 2]]]
+    assert np.array_equal(PolyReader.read_poly_store_from_csv(str(path))[1], [[0, 0], [4, 0], [4, 2], [0, 2]])
+
+def test_part_order_from_csv(tmp_path):
+    path = tmp_path / 'order.csv'
+    path.write_text(ORDER_CSV)
+
+    order = PolyReader.read_part_order_from_csv(str(path), allowed_rotations=[0, 270])
+    assert len(order) == 5
+    assert order.quantities.tolist() == [3, 1, 1]
+    assert order.rotations == [[0.0, 90.0, 180.0], [0.0, 270.0], [0.0, 270.0]]
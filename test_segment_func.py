@@ -0,0 +1,51 @@
+import numpy as np
+import shapely
+
+from segment_func import SegmentFunc
+
+def random_segments(rng, n, scale=10.0):
+    starts = rng.uniform(0, scale, (n, 2))
+    return starts, starts + rng.uniform(-2, 2, (n, 2))
+
+def test_intersections_match_shapely():
+    rng = np.random.default_rng(0)
+    # 10 x 20 pairs are tested densely, 120 x 150 pairs go through the broadphase
+    for n, m in [(10, 20), (120, 150)]:
+        starts1, ends1 = random_segments(rng, n)
+        starts2, ends2 = random_segments(rng, m)
+        idx1, idx2, pts, t = SegmentFunc.get_intersections(starts1, ends1, starts2, ends2)
+
+        lines1 = shapely.linestrings(np.stack((starts1, ends1), axis=1))
+        lines2 = shapely.linestrings(np.stack((starts2, ends2), axis=1))
+        expected = shapely.intersects(lines1[:, None], lines2[None, :])
+        assert sorted(zip(idx1.tolist(), idx2.tolist())) == sorted(zip(*np.nonzero(expected)))
+
+        assert np.all(shapely.distance(shapely.points(pts), lines1[idx1]) < 1e-9)
+        assert np.all(shapely.distance(shapely.points(pts), lines2[idx2]) < 1e-9)
+        assert np.allclose(pts, starts1[idx1] + t[:, None] * (ends1[idx1] - starts1[idx1]))
+
+def test_touching_and_collinear_segments():
+    starts1, ends1 = np.array([[0.0, 0.0], [0.0, 2.0]]), np.array([[4.0, 0.0], [4.0, 2.0]])
+    # endpoint touching the first segment, collinear overlap with the second, and a miss
+    starts2, ends2 = np.array([[2.0, 0.0], [1.0, 2.0], [0.0, 1.0]]), np.array([[2.0, -1.0], [6.0, 2.0], [4.0, 1.5]])
+    idx1, idx2, pts, t = SegmentFunc.get_intersections(starts1, ends1, starts2, ends2)
+
+    assert idx1.tolist() == [0, 1]
+    assert idx2.tolist() == [0, 1]
+    assert np.allclose(pts, [[2.0, 0.0], [1.0, 2.0]])
+    assert np.allclose(t, [0.5, 0.25])
+
+def test_candidate_pairs_match_brute_force():
+    rng = np.random.default_rng(1)
+    # integer coordinates give shared interval ends, plus vertical and horizontal segments
+    starts1, ends1 = (np.round(a) for a in random_segments(rng, 200, scale=20.0))
+    starts2, ends2 = (np.round(a) for a in random_segments(rng, 300, scale=20.0))
+    for tolerance in [0.0, 0.5]:
+        idx1, idx2 = SegmentFunc.get_candidate_pairs(starts1, ends1, starts2, ends2, tolerance)
+
+        min1, max1 = np.minimum(starts1, ends1) - tolerance, np.maximum(starts1, ends1) + tolerance
+        min2, max2 = np.minimum(starts2, ends2), np.maximum(starts2, ends2)
+        overlap = np.all((min1[:, None] <= max2[None, :]) & (max1[:, None] >= min2[None, :]), axis=2)
+        expected1, expected2 = np.nonzero(overlap)
+        assert np.array_equal(idx1, expected1)
+        assert np.array_equal(idx2, expected2)